@@ -20,3 +20,6 @@
 from .sample import *
 from .alignment import *
 from .summary import *
+from .features import *
+from .codons import *
+from .encoding import *
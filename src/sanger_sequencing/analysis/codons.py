@@ -0,0 +1,234 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide precomputed codon maps and translation tables for coding sequences."""
+
+
+import logging
+from itertools import product
+from typing import Iterable, List, Optional, Tuple
+
+from Bio.Data.CodonTable import TranslationError, ambiguous_dna_by_name
+from Bio.Data.IUPACData import ambiguous_dna_complement
+from Bio.SeqRecord import SeqRecord
+from numpy import (
+    arange,
+    argsort,
+    array,
+    asarray,
+    empty,
+    frombuffer,
+    full,
+    isnan,
+    uint8,
+    unique,
+    zeros,
+)
+
+
+__all__ = ("CodonIndex",)
+
+
+logger = logging.getLogger(__name__)
+
+CODON_TABLE = ambiguous_dna_by_name["Standard"].forward_table
+START_CODONS = frozenset(ambiguous_dna_by_name["Standard"].start_codons)
+STOP_CODONS = frozenset(ambiguous_dna_by_name["Standard"].stop_codons)
+# The IUPAC nucleotide alphabet; any other character is encoded as invalid.
+ALPHABET = "ACGTRYSWKMBDHVNX"
+INVALID = len(ALPHABET)
+# Encode ASCII characters to indeces into the translation table.
+ENCODING = full(256, INVALID, dtype=uint8)
+ENCODING[frombuffer(ALPHABET.encode("ascii"), dtype=uint8)] = arange(
+    len(ALPHABET), dtype=uint8
+)
+DECODING = array(list(ALPHABET) + ["?"], dtype=object)
+COMPLEMENT = array(
+    [ALPHABET.index(ambiguous_dna_complement[base]) for base in ALPHABET] + [INVALID],
+    dtype=uint8,
+)
+
+
+def translate_codon(codon: str) -> str:
+    """Translate a single codon including start, stop, and ambiguous codons."""
+    try:
+        return CODON_TABLE[codon]
+    except (KeyError, ValueError, TranslationError):
+        if codon in START_CODONS:
+            return "START"
+        elif codon in STOP_CODONS:
+            return "STOP"
+        else:
+            return "UNKNOWN"
+
+
+def _build_translation_table():
+    """Translate every possible codon of encoded characters once."""
+    size = len(ALPHABET) + 1
+    table = empty((size, size, size), dtype=object)
+    letters = list(ALPHABET) + ["?"]
+    for i, j, k in product(range(size), repeat=3):
+        table[i, j, k] = translate_codon(letters[i] + letters[j] + letters[k])
+    return table
+
+
+TRANSLATION_TABLE = _build_translation_table()
+
+
+def encode(sequence: str):
+    """Encode a nucleotide sequence as indeces into the translation table."""
+    return ENCODING[frombuffer(str(sequence).encode("ascii", "replace"), dtype=uint8)]
+
+
+class _CodingSequence:
+    """Map plasmid positions to codons of a single coding sequence."""
+
+    __slots__ = ("codes", "positions", "offsets", "reverse")
+
+    def __init__(self, feature, plasmid: SeqRecord):
+        # The extracted sequence is already reverse complemented when the
+        # feature lies on the reverse strand.
+        self.codes = encode(feature.extract(plasmid.seq))
+        self.reverse = feature.location.strand == -1
+        # Zero-based plasmid coordinate of each nucleotide of the extracted
+        # coding sequence.
+        coordinates = array(list(feature.location), dtype=int)
+        order = argsort(coordinates, kind="stable")
+        self.positions = coordinates[order]
+        self.offsets = order
+
+
+class CodonIndex:
+    """
+    Precompute the codon maps of all coding sequences (CDS) of a plasmid.
+
+    For every CDS the extracted coding sequence is stored as an encoded array
+    together with a map from plasmid positions to positions in the coding
+    sequence. Amino acid changes caused by conflicts can then be resolved for
+    many conflicts at once using a complete translation table that covers
+    ambiguous, start, and stop codons.
+
+    """
+
+    def __init__(self, plasmid: SeqRecord, feature_indices: Iterable[int] = None):
+        """
+        Build the codon maps of a plasmid's coding sequences.
+
+        Parameters
+        ----------
+        plasmid : Bio.SeqRecord.SeqRecord
+            The plasmid sequence record.
+        feature_indices : iterable, optional
+            Only build the codon maps for these features (default all).
+
+        """
+        if feature_indices is None:
+            feature_indices = range(len(plasmid.features))
+        self._cds = {
+            i: _CodingSequence(plasmid.features[i], plasmid)
+            for i in feature_indices
+            if plasmid.features[i].type == "CDS"
+        }
+
+    @classmethod
+    def from_record(cls, plasmid: SeqRecord) -> "CodonIndex":
+        """Build the codon maps of all coding sequences of a plasmid."""
+        return cls(plasmid)
+
+    def __contains__(self, feature_index: int) -> bool:
+        """Test whether a feature is an indexed coding sequence."""
+        return feature_index in self._cds
+
+    def translate(
+        self,
+        feature_indices: Iterable[int],
+        positions: Iterable[float],
+        characters: Iterable[str],
+    ) -> List[Optional[Tuple[str, str, str, str]]]:
+        """
+        Determine the amino acid changes caused by many conflicts at once.
+
+        Parameters
+        ----------
+        feature_indices : iterable
+            The index of the coding sequence feature hit by each conflict.
+        positions : iterable
+            The one-based plasmid position of each conflict.
+        characters : iterable
+            The sample character at each conflict.
+
+        Returns
+        -------
+        list
+            For each conflict, either a tuple with the plasmid codon and amino
+            acid followed by the sample codon and amino acid, or ``None`` if
+            the conflict does not lie within a complete codon of the coding
+            sequence.
+
+        """
+        feature_indices = asarray(feature_indices, dtype=int)
+        positions = asarray(positions, dtype=float)
+        sample_codes = encode("".join(characters))
+        num = len(feature_indices)
+        if not (len(positions) == len(sample_codes) == num):
+            raise ValueError(
+                "There must be exactly one position and one character per feature."
+            )
+        plasmid_codons = full((num, 3), INVALID, dtype=uint8)
+        frame = zeros(num, dtype=int)
+        valid = zeros(num, dtype=bool)
+        for feat_idx in unique(feature_indices):
+            cds = self._cds[feat_idx]
+            if len(cds.positions) == 0:
+                continue
+            (rows,) = ((feature_indices == feat_idx) & ~isnan(positions)).nonzero()
+            # Transform to zero-based indexing.
+            coords = positions[rows].astype(int) - 1
+            found = cds.positions.searchsorted(coords).clip(max=len(cds.positions) - 1)
+            inside = cds.positions[found] == coords
+            rows = rows[inside]
+            offsets = cds.offsets[found[inside]]
+            # Conflicts within an incomplete last codon have unknown effect.
+            codon_start = offsets - offsets % 3
+            complete = codon_start + 3 <= len(cds.codes)
+            rows = rows[complete]
+            codon_start = codon_start[complete]
+            frame[rows] = offsets[complete] % 3
+            valid[rows] = True
+            plasmid_codons[rows] = cds.codes[codon_start[:, None] + arange(3)]
+            if cds.reverse:
+                sample_codes[rows] = COMPLEMENT[sample_codes[rows]]
+        sample_codons = plasmid_codons.copy()
+        sample_codons[arange(num), frame] = sample_codes
+        plasmid_aa = TRANSLATION_TABLE[
+            plasmid_codons[:, 0], plasmid_codons[:, 1], plasmid_codons[:, 2]
+        ]
+        sample_aa = TRANSLATION_TABLE[
+            sample_codons[:, 0], sample_codons[:, 1], sample_codons[:, 2]
+        ]
+        return [
+            (
+                (
+                    "".join(DECODING[plasmid_codons[i]]),
+                    plasmid_aa[i],
+                    "".join(DECODING[sample_codons[i]]),
+                    sample_aa[i],
+                )
+                if valid[i]
+                else None
+            )
+            for i in range(num)
+        ]
@@ -0,0 +1,48 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide compact encodings of sequence characters."""
+
+
+from typing import Iterable
+
+from numpy import frombuffer, uint8
+
+
+__all__ = ("encode_characters", "decode_characters")
+
+
+def encode_characters(characters: Iterable[str]):
+    """
+    Encode single characters as their ASCII code.
+
+    Parameters
+    ----------
+    characters : iterable
+        Single character strings such as the columns of an alignment table.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array of ``uint8`` codes with one element per character.
+
+    """
+    return frombuffer("".join(characters).encode("ascii"), dtype=uint8)
+
+
+def decode_characters(codes) -> str:
+    """Decode ASCII codes into a single string."""
+    return codes.astype(uint8, copy=False).tobytes().decode("ascii")
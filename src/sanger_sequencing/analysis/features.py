@@ -0,0 +1,227 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide an interval index over the features of a plasmid sequence record."""
+
+
+from typing import Iterable, List, Optional
+
+from Bio.SeqFeature import SeqFeature
+from Bio.SeqRecord import SeqRecord
+from numpy import (
+    arange,
+    argsort,
+    array,
+    asarray,
+    bincount,
+    concatenate,
+    cumsum,
+    empty,
+    isnan,
+    lexsort,
+    maximum,
+    median,
+    repeat,
+    sort,
+    split,
+)
+
+
+__all__ = ("FeatureIndex",)
+
+
+class _Node:
+    """Define a node of a centered interval tree."""
+
+    __slots__ = (
+        "center",
+        "by_start",
+        "starts",
+        "by_end",
+        "ends",
+        "left",
+        "right",
+    )
+
+    def __init__(self, center, by_start, starts, by_end, ends, left, right):
+        self.center = center
+        self.by_start = by_start
+        self.starts = starts
+        self.by_end = by_end
+        self.ends = ends
+        self.left = left
+        self.right = right
+
+
+class FeatureIndex:
+    """
+    Index the features of a plasmid by their location for fast overlap queries.
+
+    The index is a centered interval tree. Each node stores the features that
+    contain its center sorted once by start and once by end position such that
+    the overlapping features of a node can be found by binary search. An
+    overlap query thus takes logarithmic time plus the number of hits.
+
+    Batches of queries are answered without the tree by binary search over
+    the features sorted by start position and the running maximum of their
+    end positions.
+
+    Attributes
+    ----------
+    features : list
+        The indexed sequence features in their original order.
+
+    """
+
+    def __init__(self, features: Iterable[SeqFeature]):
+        """
+        Build the index over the given sequence features.
+
+        Parameters
+        ----------
+        features : iterable
+            A collection of ``Bio.SeqFeature.SeqFeature`` with a location.
+
+        """
+        self.features = list(features)
+        starts = array([int(feat.location.start) for feat in self.features], dtype=int)
+        ends = array([int(feat.location.end) for feat in self.features], dtype=int)
+        self._root = self._build(starts, ends, array(range(len(starts)), dtype=int))
+        self._start_order = argsort(starts, kind="stable")
+        self._sorted_starts = starts[self._start_order]
+        self._sorted_ends = ends[self._start_order]
+        # Features before the first position where the running maximum end
+        # reaches a query's start all end before it.
+        self._max_ends = maximum.accumulate(self._sorted_ends)
+
+    @classmethod
+    def from_record(cls, plasmid: SeqRecord) -> "FeatureIndex":
+        """Build the index over all features of a plasmid sequence record."""
+        return cls(plasmid.features)
+
+    def __len__(self) -> int:
+        """Return the number of indexed features."""
+        return len(self.features)
+
+    @classmethod
+    def _build(cls, starts, ends, indices) -> Optional[_Node]:
+        """Recursively construct a centered interval tree."""
+        if len(indices) == 0:
+            return None
+        center = median(concatenate([starts, ends]))
+        left_mask = ends < center
+        right_mask = starts > center
+        here = ~(left_mask | right_mask)
+        here_starts = starts[here]
+        here_ends = ends[here]
+        here_indices = indices[here]
+        start_order = argsort(here_starts, kind="stable")
+        end_order = argsort(here_ends, kind="stable")
+        return _Node(
+            center=center,
+            by_start=here_indices[start_order],
+            starts=here_starts[start_order],
+            by_end=here_indices[end_order],
+            ends=here_ends[end_order],
+            left=cls._build(starts[left_mask], ends[left_mask], indices[left_mask]),
+            right=cls._build(starts[right_mask], ends[right_mask], indices[right_mask]),
+        )
+
+    def overlap(self, start: float, end: float):
+        """
+        Find all features that overlap with the closed interval [start, end].
+
+        Parameters
+        ----------
+        start : number
+            The first position of the query interval.
+        end : number
+            The last position of the query interval.
+
+        Returns
+        -------
+        numpy.ndarray
+            The indeces of the overlapping features in ascending order.
+
+        """
+        if isnan(start) or isnan(end) or start > end:
+            return empty(0, dtype=int)
+        hits = []
+        stack = [self._root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if end < node.center:
+                # All intervals here end after the query, so only the start
+                # position needs to be tested.
+                hits.append(node.by_start[: node.starts.searchsorted(end, "right")])
+                stack.append(node.left)
+            elif start > node.center:
+                # All intervals here begin before the query, so only the end
+                # position needs to be tested.
+                hits.append(node.by_end[node.ends.searchsorted(start, "left") :])
+                stack.append(node.right)
+            else:
+                hits.append(node.by_start)
+                stack.append(node.left)
+                stack.append(node.right)
+        if not hits:
+            return empty(0, dtype=int)
+        return sort(concatenate(hits))
+
+    def overlap_many(self, starts: Iterable[float], ends: Iterable[float]) -> List:
+        """
+        Find the overlapping features for many query intervals at once.
+
+        Parameters
+        ----------
+        starts : iterable
+            The first positions of the query intervals.
+        ends : iterable
+            The last positions of the query intervals.
+
+        Returns
+        -------
+        list
+            For each query interval, an array of the overlapping feature indeces
+            in ascending order.
+
+        """
+        starts = asarray(starts, dtype=float)
+        ends = asarray(ends, dtype=float)
+        if starts.shape != ends.shape:
+            raise ValueError(
+                "The query start and end positions must be of the same length."
+            )
+        if len(starts) == 0:
+            return []
+        valid = ~(isnan(starts) | isnan(ends)) & (starts <= ends)
+        # Only features in the window [low, high) of the start order may
+        # overlap a query interval.
+        low = self._max_ends.searchsorted(starts, "left")
+        high = self._sorted_starts.searchsorted(ends, "right")
+        counts = (high - low).clip(0)
+        counts[~valid] = 0
+        queries = repeat(arange(len(starts)), counts)
+        offsets = arange(counts.sum()) - repeat(cumsum(counts) - counts, counts)
+        positions = repeat(low, counts) + offsets
+        keep = self._sorted_ends[positions] >= starts[queries]
+        queries = queries[keep]
+        hits = self._start_order[positions[keep]]
+        order = lexsort((hits, queries))
+        bounds = cumsum(bincount(queries, minlength=len(starts)))[:-1]
+        return split(hits[order], bounds)
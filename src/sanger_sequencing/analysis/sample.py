@@ -18,45 +18,325 @@
 
 
 import logging
+from itertools import chain
+from typing import Dict, Iterable, Mapping, NamedTuple, Optional, Tuple
 
 from Bio.SeqRecord import SeqRecord
-from numpy import arange, array, asarray, nanmedian
+from numpy import (
+    arange,
+    array,
+    concatenate,
+    cumsum,
+    fromiter,
+    full,
+    inf,
+    isnan,
+    minimum,
+    nan,
+    nan_to_num,
+    ndarray,
+    sort,
+    where,
+    zeros,
+)
+from pandas import DataFrame
 
 from ..config import Configuration
 
 
-__all__ = ("trim_sample",)
+__all__ = ("trim_sample", "trim_samples", "compare_trim_methods", "SampleTrim")
 
 
 logger = logging.getLogger(__name__)
 
 
-def trim_sample(seq: SeqRecord) -> (int, SeqRecord, array, int, float):
-    """Cut off low quality ends of a Sanger sequencing record."""
-    logger.debug("Trim sample.")
+class SampleTrim(NamedTuple):
+    """
+    Describe how a sample read is trimmed.
+
+    Attributes
+    ----------
+    start : int
+        The index of the first nucleotide kept.
+    stop : int
+        The index after the last nucleotide kept.
+    median : float
+        The median Phred quality of the untrimmed read.
+    scores : numpy.ndarray
+        A view on the Phred quality scores of the kept nucleotides.
+    error : str or None
+        A description of why the read cannot be used if it was rejected.
+
+    """
+
+    start: int
+    stop: int
+    median: float
+    scores: array
+    error: Optional[str] = None
+
+
+def quality_matrix(qualities: Iterable) -> Tuple[array, array, array]:
+    """
+    Stack many Phred quality sequences of varying length.
+
+    Parameters
+    ----------
+    qualities : iterable
+        Phred quality score sequences, for example, the
+        ``letter_annotations["phred_quality"]`` of sample sequence records.
+
+    Returns
+    -------
+    numpy.ndarray
+        All qualities concatenated into one flat buffer.
+    numpy.ndarray
+        The offsets of each sequence into the flat buffer. There is one more
+        offset than there are sequences marking the end of the last one.
+    numpy.ndarray
+        A two-dimensional matrix with one row per sequence that is padded
+        with ``NaN`` at the end.
+
+    """
+    qualities = list(qualities)
+    lengths = array([len(qual) for qual in qualities], dtype=int)
+    offsets = concatenate([[0], cumsum(lengths)]).astype(int)
+    if qualities and all(isinstance(qual, ndarray) for qual in qualities):
+        # Compact reads already provide their qualities as arrays.
+        flat = concatenate(qualities).astype(int)
+    else:
+        flat = fromiter(
+            chain.from_iterable(qualities), dtype=int, count=int(offsets[-1])
+        )
+    if len(qualities) == 0:
+        return flat, offsets, full((0, 0), nan)
+    matrix = full((len(qualities), lengths.max(initial=0)), nan)
+    # Scatter the flat buffer into the padded matrix in one operation.
+    rows = arange(len(qualities)).repeat(lengths)
+    columns = arange(len(flat)) - offsets[:-1].repeat(lengths)
+    matrix[rows, columns] = flat
+    return flat, offsets, matrix
+
+
+def padded_median(matrix: array, lengths: array) -> array:
+    """Compute the median of each row of a matrix padded with ``NaN``."""
+    medians = full(len(lengths), nan)
+    if matrix.size == 0:
+        return medians
+    # Sorting moves the `NaN` padding to the end of each row.
+    ordered = sort(matrix, axis=1)
+    rows = (lengths > 0).nonzero()[0]
+    upper = ordered[rows, lengths[rows] // 2]
+    lower = ordered[rows, (lengths[rows] - 1) // 2]
+    medians[rows] = (lower + upper) / 2
+    return medians
+
+
+def threshold_bounds(matrix: array, lengths: array, threshold: float):
+    """Find the first and after the last nucleotide at or above the threshold."""
+    # Comparisons with the `NaN` padding are always false.
+    mask = matrix >= threshold
+    starts = mask.argmax(axis=1)
+    stops = matrix.shape[1] - mask[:, ::-1].argmax(axis=1)
+    stops[~mask.any(axis=1)] = 0
+    return starts, stops
+
+
+def window_bounds(matrix: array, lengths: array, threshold: float, window: int):
+    """Find the outermost windows whose mean quality is at or above the threshold."""
+    num_rows, num_columns = matrix.shape
+    starts = zeros(num_rows, dtype=int)
+    stops = zeros(num_rows, dtype=int)
+    if num_columns < window:
+        return starts, stops
+    totals = concatenate(
+        [zeros((num_rows, 1)), cumsum(nan_to_num(matrix), axis=1)], axis=1
+    )
+    means = (totals[:, window:] - totals[:, :-window]) / window
+    # Windows must lie completely within a read.
+    position = arange(num_columns - window + 1)
+    mask = (means >= threshold) & (position[None, :] + window <= lengths[:, None])
+    passing = mask.any(axis=1)
+    last_window = len(position) - 1 - mask[passing, ::-1].argmax(axis=1)
+    starts[passing] = mask[passing].argmax(axis=1)
+    stops[passing] = last_window + window
+    return starts, stops
+
+
+def mott_bounds(matrix: array, lengths: array, threshold: float):
+    """
+    Find the read segment with the maximal cumulative Mott score.
+
+    Each nucleotide scores the difference between the error probability
+    corresponding to the threshold and its own error probability, such that
+    the segment with the largest sum balances high and low quality calls.
+
+    """
+    num_rows, num_columns = matrix.shape
+    limit = 10.0 ** (-threshold / 10.0)
+    scores = nan_to_num(limit - 10.0 ** (-matrix / 10.0))
+    totals = concatenate([zeros((num_rows, 1)), cumsum(scores, axis=1)], axis=1)
+    # The best segment ends where the cumulative score rises the most above
+    # its preceding minimum and starts at that minimum.
+    gains = totals - minimum.accumulate(totals, axis=1)
+    stops = gains.argmax(axis=1)
+    column = arange(num_columns + 1)
+    starts = where(column[None, :] <= stops[:, None], totals, inf).argmin(axis=1)
+    return starts, stops
+
+
+TRIM_METHODS = ("threshold", "window", "mott")
+
+
+def trim_samples(
+    samples: Mapping[str, SeqRecord],
+    threshold: Optional[float] = None,
+    method: Optional[str] = None,
+    window: Optional[int] = None,
+) -> Dict[str, SampleTrim]:
+    """
+    Determine how to cut off the low quality ends of many Sanger reads at once.
+
+    The Phred qualities of all reads are stacked into one padded matrix such
+    that medians and trimming bounds are computed for all reads together.
+
+    Parameters
+    ----------
+    samples : dict
+        A mapping from sample identifiers to sequence records with Phred
+        quality annotations.
+    threshold : float, optional
+        Threshold on the Phred quality (default from the configuration).
+    method : {'threshold', 'window', 'mott'}, optional
+        The trimming method (default from the configuration). 'threshold'
+        keeps everything from the first to the last nucleotide at or above the
+        threshold. 'window' keeps everything from the first to the last
+        sliding window whose mean quality is at or above the threshold. 'mott'
+        keeps the segment with the maximal sum of differences between the
+        error probability at the threshold and each nucleotide's error
+        probability.
+    window : int, optional
+        The size of the sliding window (default from the configuration).
+
+    Returns
+    -------
+    dict
+        A mapping from sample identifiers to their trimming description.
+
+    """
     config = Configuration()
-    scores = asarray(seq.letter_annotations["phred_quality"])
-    median = float(nanmedian(scores))
-    if median < config.threshold:
-        message = (
-            f"The median Phred quality ({median}) is below the "
-            f"required threshold ({config.threshold})."
+    if threshold is None:
+        threshold = config.threshold
+    if method is None:
+        method = config.trim_method
+    if window is None:
+        window = config.trim_window
+    if method not in TRIM_METHODS:
+        raise ValueError(
+            f"Unknown trimming method '{method}'. Please choose one of "
+            f"{', '.join(TRIM_METHODS)}."
+        )
+    identifiers = list(samples)
+    flat, offsets, matrix = quality_matrix(
+        samples[sample_id].letter_annotations["phred_quality"]
+        for sample_id in identifiers
+    )
+    lengths = offsets[1:] - offsets[:-1]
+    medians = padded_median(matrix, lengths)
+    if method == "threshold":
+        starts, stops = threshold_bounds(matrix, lengths, threshold)
+    elif method == "window":
+        starts, stops = window_bounds(matrix, lengths, threshold, window)
+    else:
+        starts, stops = mott_bounds(matrix, lengths, threshold)
+    result = {}
+    for i, sample_id in enumerate(identifiers):
+        median = float(medians[i])
+        start = int(starts[i])
+        stop = int(stops[i])
+        if isnan(median) or median < threshold:
+            message = (
+                f"The median Phred quality ({median}) is below the "
+                f"required threshold ({threshold})."
+            )
+        elif stop <= start:
+            message = (
+                f"No high quality region was found using the '{method}' "
+                f"trimming method."
+            )
+        else:
+            message = None
+        if message is not None:
+            logger.error(message)
+            result[sample_id] = SampleTrim(
+                start=0,
+                stop=0,
+                median=median,
+                scores=flat[offsets[i] : offsets[i]],
+                error=message,
+            )
+            continue
+        logger.debug(
+            "Cutting %d nucleotides at the beginning and %d at the end of '%s'.",
+            start,
+            lengths[i] - stop,
+            sample_id,
         )
-        logger.error(message)
-        raise ValueError(message)
-    mask = scores >= config.threshold
-    index = arange(len(mask), dtype=int)
-    min_i = index[mask][0]
-    max_i = index[mask][-1] + 1  # Since Python excludes upper range limit.
-    logger.debug(
-        "Cutting %d nucleotides at the beginning and %d at the end.",
-        min_i + 1,
-        len(seq) - max_i,
+        result[sample_id] = SampleTrim(
+            start=start,
+            stop=stop,
+            median=median,
+            scores=flat[offsets[i] + start : offsets[i] + stop],
+        )
+    return result
+
+
+def compare_trim_methods(
+    samples: Mapping[str, SeqRecord],
+    threshold: Optional[float] = None,
+    window: Optional[int] = None,
+) -> DataFrame:
+    """
+    Compare the read lengths that remain after trimming with each method.
+
+    Parameters
+    ----------
+    samples : dict
+        A mapping from sample identifiers to sequence records with Phred
+        quality annotations.
+    threshold : float, optional
+        Threshold on the Phred quality (default from the configuration).
+    window : int, optional
+        The size of the sliding window (default from the configuration).
+
+    Returns
+    -------
+    pandas.DataFrame
+        A table with one row per sample containing the untrimmed read length
+        and the trimmed read length for each method. Rejected reads have a
+        trimmed length of zero.
+
+    """
+    table = DataFrame(
+        {"length": [len(samples[sample_id]) for sample_id in samples]},
+        index=list(samples),
     )
+    for method in TRIM_METHODS:
+        trims = trim_samples(samples, threshold=threshold, method=method, window=window)
+        table[method] = [trim.stop - trim.start for trim in trims.values()]
+    return table
+
+
+def trim_sample(seq: SeqRecord) -> (int, SeqRecord, array, int, float):
+    """Cut off low quality ends of a Sanger sequencing record."""
+    logger.debug("Trim sample.")
+    trim = trim_samples({seq.id: seq})[seq.id]
+    if trim.error is not None:
+        raise ValueError(trim.error)
     return (
-        min_i,
-        seq[min_i:max_i],
-        scores[min_i:max_i],
-        len(seq) - max_i,
-        median,
+        trim.start,
+        seq[trim.start : trim.stop],
+        trim.scores,
+        len(seq) - trim.stop,
+        trim.median,
     )
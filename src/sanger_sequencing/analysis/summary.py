@@ -18,12 +18,24 @@
 
 
 import logging
-from typing import List, Tuple
+from typing import List, Optional, Tuple
 
-from Bio.Data.CodonTable import TranslationError, ambiguous_dna_by_name
 from Bio.SeqRecord import SeqRecord
-from numpy import isnan, nanmean
-from pandas import DataFrame, concat
+from numpy import (
+    arange,
+    concatenate,
+    empty,
+    int32,
+    isnan,
+    nan,
+    nanmax,
+    nanmin,
+    repeat,
+    uint8,
+    where,
+)
+from pandas import Categorical, DataFrame, isna, notna
+from pandas.arrays import IntegerArray
 
 from ..config import Configuration
 from ..model import (
@@ -36,6 +48,9 @@ from ..model import (
     SampleReportInternal,
     SequenceFeature,
 )
+from .codons import CodonIndex
+from .encoding import encode_characters
+from .features import FeatureIndex
 
 
 __all__ = ("summarize_plasmid_conflicts", "concatenate_sample_reports")
@@ -43,47 +58,79 @@ __all__ = ("summarize_plasmid_conflicts", "concatenate_sample_reports")
 
 logger = logging.getLogger(__name__)
 
-CODON_TABLE = ambiguous_dna_by_name["Standard"].forward_table
-START_CODONS = frozenset(ambiguous_dna_by_name["Standard"].start_codons)
-STOP_CODONS = frozenset(ambiguous_dna_by_name["Standard"].stop_codons)
-
 
 def concatenate_sample_reports(reports: List[SampleReportInternal]) -> DataFrame:
-    """Concatenate many data frames into one."""
-    data = []
-    for sample in reports:
-        df = sample.details
-        if df is None:
-            continue
-        df["sample"] = sample.id
-        df["primer"] = sample.primer
-        data.append(df)
-    if len(data) == 0:
-        return DataFrame(
-            columns=["plasmid_pos", "sample_pos", "snp", "plasmid_chr", "sample_chr",]
-        )
-    else:
-        return concat(data, ignore_index=True, copy=False)
+    """
+    Concatenate the detailed tables of many sample reports into one.
+
+    The input tables are not modified. The combined table uses compact types:
+    categorical sample and primer identifiers, nullable 32-bit integer
+    positions, ASCII codes of the characters, and nullable 8-bit qualities.
+
+    Parameters
+    ----------
+    reports : list
+        The sample reports of one plasmid.
+
+    Returns
+    -------
+    pandas.DataFrame
+        The combined detailed table of all samples with the additional columns
+        'sample' and 'primer'.
+
+    """
+    data = [sample for sample in reports if sample.details is not None]
+    lengths = [len(sample.details) for sample in data]
+    primers = list(dict.fromkeys(sample.primer for sample in data))
+
+    def combine(column):
+        if not data:
+            return empty(0)
+        return concatenate([sample.details[column].to_numpy() for sample in data])
+
+    def nullable(values, dtype):
+        mask = isnan(values)
+        return IntegerArray(where(mask, 0, values).astype(dtype), mask)
+
+    return DataFrame(
+        {
+            "plasmid_pos": nullable(combine("plasmid_pos").astype(float), int32),
+            "sample_pos": nullable(combine("sample_pos").astype(float), int32),
+            "snp": combine("snp").astype(bool),
+            "plasmid_chr": encode_characters(combine("plasmid_chr")),
+            "sample_chr": encode_characters(combine("sample_chr")),
+            "quality": nullable(combine("quality").astype(float), uint8),
+            "sample": Categorical.from_codes(
+                repeat(arange(len(data)), lengths),
+                categories=[sample.id for sample in data],
+            ),
+            "primer": Categorical.from_codes(
+                repeat([primers.index(sample.primer) for sample in data], lengths),
+                categories=primers,
+            ),
+        }
+    )
 
 
 def determine_type(row) -> ConflictTypeEnum:
-    if isnan(row.plasmid_pos) and isnan(row.sample_pos):
+    if isna(row.plasmid_pos) and isna(row.sample_pos):
         msg = (
             "Detected a gap in the alignment. Only expecting single "
             "position conflicts."
         )
         logger.error(msg)
         raise ValueError(msg)
-    elif isnan(row.plasmid_pos):
+    elif isna(row.plasmid_pos):
         return ConflictTypeEnum.INSERTION
-    elif isnan(row.sample_pos):
+    elif isna(row.sample_pos):
         return ConflictTypeEnum.DELETION
     else:
         return ConflictTypeEnum.CHANGE
 
 
 def determine_quality(region, threshold: float) -> QualityEnum:
-    if nanmean(region["quality"]) >= threshold:
+    mean = region["quality"].mean()
+    if notna(mean) and mean >= threshold:
         return QualityEnum.HIGH
     else:
         return QualityEnum.LOW
@@ -92,7 +139,9 @@ def determine_quality(region, threshold: float) -> QualityEnum:
 def confirm_conflict(conflict_type, row, cover, threshold) -> Tuple[int, int]:
     num_confirmed = 0
     num_invalidated = 0
-    for sample_id, sub in cover.groupby("sample", as_index=False, sort=False):
+    for sample_id, sub in cover.groupby(
+        "sample", as_index=False, sort=False, observed=True
+    ):
         if determine_quality(sub, threshold) == "low":
             logger.debug(
                 "Ignoring low quality sample region for conflict confirmation."
@@ -115,7 +164,9 @@ def confirm_conflict(conflict_type, row, cover, threshold) -> Tuple[int, int]:
             logger.debug("Different type of conflict site.")
             num_invalidated += 1
             continue
-        if (cmp.sample_chr == row.sample_chr) and (cmp.plasmid_chr == row.plasmid_chr):
+        if (chr(cmp.sample_chr) == row.sample_chr) and (
+            chr(cmp.plasmid_chr) == row.plasmid_chr
+        ):
             num_confirmed += 1
         else:
             num_invalidated += 1
@@ -123,7 +174,7 @@ def confirm_conflict(conflict_type, row, cover, threshold) -> Tuple[int, int]:
 
 
 def determine_effects(
-    row, plasmid, previous, following
+    row, plasmid, previous, following, hits=None, translations=None
 ) -> Tuple[List[SequenceFeature], List[Effect]]:
     """
     Post-process conflicts and categorize them.
@@ -134,6 +185,14 @@ def determine_effects(
     plasmid
     previous
     following
+    hits : iterable, optional
+        The indeces of the plasmid features that overlap with the conflict
+        region as determined by a ``FeatureIndex``. They are computed here if
+        not given.
+    translations : dict, optional
+        A mapping from the indeces of hit coding sequences to the codon
+        translations determined by a ``CodonIndex``. They are computed here if
+        not given.
 
     Returns
     -------
@@ -142,66 +201,73 @@ def determine_effects(
     """
     features = []
     effects = []
-    for feat in plasmid.features:
-        # Process only features if the conflict position overlaps.
-        if not (
-            previous <= feat.location.end.position
-            and feat.location.start.position <= following
-        ):
-            continue
+    if hits is None:
+        hits = FeatureIndex.from_record(plasmid).overlap(previous, following)
+    # Potential frame shift (usually rather a sequencing error).
+    frame_shift = isnan(row.plasmid_pos) or isnan(row.sample_pos)
+    if translations is None and not frame_shift:
+        cds_hits = [i for i in hits if plasmid.features[i].type == "CDS"]
+        translations = dict(
+            zip(
+                cds_hits,
+                CodonIndex(plasmid, cds_hits).translate(
+                    cds_hits,
+                    [row.plasmid_pos] * len(cds_hits),
+                    [row.sample_chr] * len(cds_hits),
+                ),
+            )
+        )
+    for i in hits:
+        feat = plasmid.features[i]
         features.append(
             SequenceFeature(type=feat.type, labels=feat.qualifiers.get("label", []))
         )
-        if feat.type == "CDS":
-            # Potential frame shift (usually rather a sequencing error).
-            if isnan(row.plasmid_pos) or isnan(row.sample_pos):
-                effects.append(Effect(type=EffectTypeEnum.FRAME_SHIFT))
-                continue
-            # Does the new codon cause an amino acid change?
-            seq = feat.extract(plasmid)
-            # Translate plasmid position into feature position.
-            feat_pos = int(row.plasmid_pos) - feat.location.start.position
-            feat_pos -= 1  # Transform to 0-indexing.
-            codon_pos = feat_pos % 3
-            codon = list(seq[(feat_pos - codon_pos) : (feat_pos - codon_pos + 3)])
-            if len(codon) < 3:
-                logger.error("SNP at the beginning or end of CDS. " "Unknown effect.")
-                effects.append(Effect(type=EffectTypeEnum.UKNOWN))
-                continue
-            effect = Effect(type=EffectTypeEnum.AA_CHANGE)
-            cdn = "".join(codon)
-            try:
-                effect.plasmid_aa = CODON_TABLE[cdn]
-            except (KeyError, ValueError, TranslationError):
-                if cdn in START_CODONS:
-                    logger.warning("Start codon hit on plasmid.")
-                    effect.plasmid_aa = "START"
-                elif cdn in STOP_CODONS:
-                    logger.warning("Stop codon hit on plasmid.")
-                    effect.plasmid_aa = "STOP"
-                else:
-                    logger.error("Unknown codon '%s' on plasmid.", cdn)
-                    effect.plasmid_aa = "UNKNOWN"
-            codon[codon_pos] = row.sample_chr
-            cdn = "".join(codon)
-            try:
-                effect.sample_aa = CODON_TABLE[cdn]
-            except (KeyError, ValueError, TranslationError):
-                if cdn in START_CODONS:
-                    logger.warning("Change to start codon on sample.")
-                    effect.sample_aa = "START"
-                elif cdn in STOP_CODONS:
-                    logger.warning("Change to stop codon on sample.")
-                    effect.sample_aa = "STOP"
-                else:
-                    logger.error("Unknown codon '%s' on sample.", cdn)
-                    effect.sample_aa = "UNKNOWN"
-            effects.append(effect)
+        if feat.type != "CDS":
+            continue
+        if frame_shift:
+            effects.append(Effect(type=EffectTypeEnum.FRAME_SHIFT))
+            continue
+        # Does the new codon cause an amino acid change?
+        translation = translations[i]
+        if translation is None:
+            logger.error("SNP at the beginning or end of CDS. Unknown effect.")
+            effects.append(Effect(type=EffectTypeEnum.UKNOWN))
+            continue
+        plasmid_codon, plasmid_aa, sample_codon, sample_aa = translation
+        if plasmid_aa == "START":
+            logger.warning("Start codon hit on plasmid.")
+        elif plasmid_aa == "STOP":
+            logger.warning("Stop codon hit on plasmid.")
+        elif plasmid_aa == "UNKNOWN":
+            logger.error("Unknown codon '%s' on plasmid.", plasmid_codon)
+        if sample_aa == "START":
+            logger.warning("Change to start codon on sample.")
+        elif sample_aa == "STOP":
+            logger.warning("Change to stop codon on sample.")
+        elif sample_aa == "UNKNOWN":
+            logger.error("Unknown codon '%s' on sample.", sample_codon)
+        effect = Effect(type=EffectTypeEnum.AA_CHANGE)
+        effect.plasmid_aa = plasmid_aa
+        effect.sample_aa = sample_aa
+        effects.append(effect)
     return features, effects
 
 
+def _position_range(positions) -> Tuple[float, float]:
+    """Return the minimum and maximum of nullable positions as floats."""
+    values = positions.to_numpy(dtype=float, na_value=nan)
+    if isnan(values).all():
+        return nan, nan
+    return nanmin(values), nanmax(values)
+
+
 def summarize_plasmid_conflicts(
-    sample: DataFrame, total: DataFrame, plasmid: SeqRecord
+    sample: DataFrame,
+    total: DataFrame,
+    plasmid: SeqRecord,
+    feature_index: Optional[FeatureIndex] = None,
+    codon_index: Optional[CodonIndex] = None,
+    sample_id: Optional[str] = None,
 ) -> List[ConflictReportInternal]:
     """
     Add useful information on sequence conflicts and their surroundings.
@@ -216,11 +282,35 @@ def summarize_plasmid_conflicts(
     samples, each conflict may be (highly) likely, unresolved (i.e.,
     an unclear situation), or resolved (invalidated by other samples).
 
+    The plasmid features hit by conflicts are looked up in the given feature
+    index and amino acid changes are resolved using the given codon index.
+    Both should be built only once per plasmid.
+
+    The sample identifier is used to distinguish the sample from others in
+    the combined table. If it is not given, the 'sample' column of each
+    conflict row is used as before. Without such a column, the rows of the
+    combined table that the sample table's index refers to are excluded.
+
     """
     config = Configuration()
     conflicts = []
     if sample is None:
         return conflicts
+    if not sample["snp"].any():
+        return conflicts
+    if feature_index is None:
+        feature_index = FeatureIndex.from_record(plasmid)
+    if codon_index is None:
+        codon_index = CodonIndex.from_record(plasmid)
+    others = None
+    if sample_id is not None:
+        others = total["sample"] != sample_id
+    elif "sample" not in sample.columns:
+        others = ~total.index.isin(sample.index)
+    # Collect the conflict regions such that overlapping features can be
+    # queried for all of them at once.
+    rows = []
+    regions = []
     # Show what happens around a mismatch location on all samples.
     logger.info("Assessing %d conflicts.", total["snp"].sum())
     for row in sample.loc[sample["snp"], :].itertuples():
@@ -246,10 +336,9 @@ def summarize_plasmid_conflicts(
         # Due to a potential gap we take the plasmid index position before and
         # check rows in the total in-between that index and index + 2 which
         # should cover the gap.
-        index = total[
-            (total["sample"] != row.sample)
-            & (total["plasmid_pos"] == region["plasmid_pos"].min())
-        ].index
+        previous, following = _position_range(region["plasmid_pos"])
+        other = total["sample"] != row.sample if others is None else others
+        index = total[other & total["plasmid_pos"].eq(previous).fillna(False)].index
         index = [j for i in index for j in range(i, i + 3)]
         cover = total.loc[index, :]
         conflict.num_confirmed, conflict.num_invalidated = confirm_conflict(
@@ -261,9 +350,36 @@ def summarize_plasmid_conflicts(
             conflict.status = ConflictStatusEnum.RESOLVED
         else:
             conflict.status = ConflictStatusEnum.POTENTIAL
-        # Add feature data.
+        rows.append(row)
+        regions.append((previous, following))
+        conflicts.append(conflict)
+    if not conflicts:
+        return conflicts
+    # Add feature data.
+    previous, following = zip(*regions)
+    all_hits = feature_index.overlap_many(previous, following)
+    # Resolve the codons of all conflicts within coding sequences at once.
+    pairs = [
+        (j, i)
+        for j, (row, hits) in enumerate(zip(rows, all_hits))
+        if not (isnan(row.plasmid_pos) or isnan(row.sample_pos))
+        for i in hits
+        if i in codon_index
+    ]
+    all_translations = [{} for _ in rows]
+    if pairs:
+        conflict_indices, feature_indices = zip(*pairs)
+        translated = codon_index.translate(
+            feature_indices,
+            [rows[j].plasmid_pos for j in conflict_indices],
+            [rows[j].sample_chr for j in conflict_indices],
+        )
+        for j, i, translation in zip(conflict_indices, feature_indices, translated):
+            all_translations[j][i] = translation
+    for conflict, row, (prev, follow), hits, translations in zip(
+        conflicts, rows, regions, all_hits, all_translations
+    ):
         conflict.features_hit, conflict.effects = determine_effects(
-            row, plasmid, region["plasmid_pos"].min(), region["plasmid_pos"].max(),
+            row, plasmid, prev, follow, hits, translations
         )
-        conflicts.append(conflict)
     return conflicts
@@ -33,6 +33,7 @@ from . import analysis, validation
 from .config import Configuration
 from .helpers import log_errors
 from .model import PlasmidReportInternal, SampleReportInternal, SangerReportInternal
+from .samples import Read
 
 
 __all__ = ("sanger_report", "plasmid_report", "sample_report")
@@ -44,9 +45,10 @@ logger = logging.getLogger(__name__)
 def sanger_report(
     template: DataFrame,
     plasmids: typing.Dict[str, SeqRecord],
-    samples: typing.Dict[str, SeqRecord],
+    samples: typing.Dict[str, typing.Union[SeqRecord, Read]],
     threshold: typing.Optional[float] = None,
     output: typing.Optional[typing.Union[str, Path]] = None,
+    trim_method: typing.Optional[str] = None,
 ) -> SangerReportInternal:
     """
     Perform a complete Sanger verification for many plasmids and sample reads.
@@ -59,7 +61,8 @@ def sanger_report(
     plasmids : dict
         A mapping from plasmid identifiers to sequence records.
     samples : dict
-        A mapping from sample identifiers to sequence records.
+        A mapping from sample identifiers to sequence records or compact
+        reads.
     threshold : float, optional
         Threshold on the Phred quality score used to ignore low quality regions
         at the beginning and end of a sample read (default 50). The Phred score
@@ -68,6 +71,10 @@ def sanger_report(
     output : PathLike, optional
         Output directory for alignment files (default current working
         directory).
+    trim_method : {'threshold', 'window', 'mott'}, optional
+        The method used to trim low quality ends of sample reads (default
+        'threshold'). See ``sanger_sequencing.analysis.trim_samples`` for
+        details.
 
     Returns
     -------
@@ -90,8 +97,11 @@ def sanger_report(
     if output is not None:
         kwargs["output"] = output
     report = SangerReportInternal(**kwargs)
+    config_kwargs = {}
+    if trim_method is not None:
+        config_kwargs["trim_method"] = trim_method
     # Initialize global singleton with parameters.
-    Configuration(threshold=report.threshold, output=report.output)
+    Configuration(threshold=report.threshold, output=report.output, **config_kwargs)
     logger.info("Validate template.")
     errors = validation.validate_template(template)
     if errors:
@@ -100,15 +110,23 @@ def sanger_report(
             "Invalid analysis template. Please see errors above for details."
         )
     logger.info("Validate plasmids.")
-    for plasmid in plasmids.values():
-        validation.validate_plasmid(plasmid, [])
+    errors = validation.validate_plasmids(plasmids, [])
     logger.info("Validate samples.")
-    for sample in samples.values():
-        validation.validate_sample(sample)
+    errors.extend(validation.validate_samples(samples))
+    if errors:
+        log_errors(errors)
+        raise AssertionError(
+            "Invalid sequence records. Please see errors above for details."
+        )
     template = validation.drop_missing_records(template, plasmids, samples)
+    logger.info("Trim samples.")
+    trims = analysis.trim_samples(
+        {sample_id: samples[sample_id] for sample_id in template["sample"]},
+        method=trim_method,
+    )
     logger.info("Generate reports.")
     report.plasmids = [
-        plasmid_report(plasmid_id, plasmids[plasmid_id], sub, samples)
+        plasmid_report(plasmid_id, plasmids[plasmid_id], sub, samples, trims)
         for plasmid_id, sub in template.groupby("plasmid", as_index=False, sort=False)
     ]
     return report
@@ -118,7 +136,8 @@ def plasmid_report(
     plasmid_id: str,
     sequence: SeqRecord,
     template: DataFrame,
-    samples: typing.Dict[str, SeqRecord],
+    samples: typing.Dict[str, typing.Union[SeqRecord, Read]],
+    trims: typing.Optional[typing.Dict[str, analysis.SampleTrim]] = None,
 ) -> PlasmidReportInternal:
     """
     Create an analysis report for a single plasmid and one or more reads.
@@ -136,7 +155,10 @@ def plasmid_report(
     template : pandas.DataFrame
         A part of the template table concerning this plasmid only.
     samples : dict
-        A mapping from sample identifiers to sequence records.
+        A mapping from sample identifiers to sequence records or compact
+        reads.
+    trims : dict, optional
+        A mapping from sample identifiers to precomputed trimming results.
 
     Returns
     -------
@@ -150,7 +172,12 @@ def plasmid_report(
         name=sequence.name,
         samples=[
             sample_report(
-                row.sample, samples[row.sample], row.primer, plasmid_id, sequence,
+                row.sample,
+                samples[row.sample],
+                row.primer,
+                plasmid_id,
+                sequence,
+                None if trims is None else trims.get(row.sample),
             )
             for row in template.itertuples(index=False)
         ],
@@ -158,19 +185,26 @@ def plasmid_report(
     # Post-process reports in order to classify conflicts.
     logger.debug("Concatenate the detailed sample reports.")
     total = analysis.concatenate_sample_reports(report.samples)
+    # Only plasmids with conflicts need their features, which may be parsed
+    # lazily on first access.
+    feature_index = codon_index = None
+    if total["snp"].any():
+        feature_index = analysis.FeatureIndex.from_record(sequence)
+        codon_index = analysis.CodonIndex.from_record(sequence)
     for rep in report.samples:
         rep.conflicts = analysis.summarize_plasmid_conflicts(
-            rep.details, total, sequence
+            rep.details, total, sequence, feature_index, codon_index, rep.id
         )
     return report
 
 
 def sample_report(
     sample_id: str,
-    sample_sequence: SeqRecord,
+    sample_sequence: typing.Union[SeqRecord, Read],
     primer_id: str,
     plasmid_id: str,
     plasmid_sequence: SeqRecord,
+    trim: typing.Optional[analysis.SampleTrim] = None,
 ) -> SampleReportInternal:
     """
     Create an analysis report for a single sample read.
@@ -179,14 +213,16 @@ def sample_report(
     ----------
     sample_id : str
         The sample identifier.
-    sample_sequence :  Bio.SeqRecord.SeqRecord
-        The sample's sequence record.
+    sample_sequence :  Bio.SeqRecord.SeqRecord or Read
+        The sample's sequence record or compact read.
     primer_id : str
         The primer identifier.
     plasmid_id : str
         The plasmid identifier.
     plasmid_sequence : Bio.SeqRecord.SeqRecord
         The plasmid's sequence record.
+    trim : sanger_sequencing.analysis.SampleTrim, optional
+        The precomputed trimming of the sample read (default computed here).
 
     Returns
     -------
@@ -198,19 +234,24 @@ def sample_report(
     report = SampleReportInternal(
         id=sample_id, primer=primer_id, readLength=len(sample_sequence),
     )
-    # Convert to base `float` for JSON compatibility.
-    try:
-        start, trimmed_seq, quality_scores, end, median = analysis.trim_sample(
-            sample_sequence
-        )
-    except ValueError as err:
-        report.errors.append(str(err))
+    if trim is None:
+        trim = analysis.trim_samples({sample_id: sample_sequence})[sample_id]
+    if trim.error is not None:
+        report.errors.append(trim.error)
         return report
-    report.median_quality = median
-    report.trim_start = int(start)
-    report.trim_end = int(end)
+    report.median_quality = trim.median
+    report.trim_start = trim.start
+    report.trim_end = len(sample_sequence) - trim.stop
+    # Only the sequence itself is needed for the alignment. Compact reads
+    # provide the trimmed region as a view.
+    if isinstance(sample_sequence, Read):
+        trimmed_seq = sample_sequence[trim.start : trim.stop]
+    else:
+        trimmed_seq = SeqRecord(
+            sample_sequence.seq[trim.start : trim.stop], id=sample_sequence.id
+        )
     align = analysis.emboss_alignment(
         sample_id, trimmed_seq, plasmid_id, plasmid_sequence
     )
-    report.details = analysis.alignment_to_table(align, quality_scores, start)
+    report.details = analysis.alignment_to_table(align, trim.scores, trim.start)
     return report
@@ -17,6 +17,15 @@
 """Provide clients that consume specific APIs for sequence record retrieval."""
 
 
+from .cache import *
+from .directory import *
+from .disk_cache import *
+from .federated import *
 from .labcollector import *
 from .ice import *
 from .benchling import *
+from .rate_limit import *
+from .mirror import *
+from .streaming import *
+from .lazy_record import *
+from .packed import *
@@ -17,27 +17,392 @@
 """A basic client for the Benchling API."""
 
 
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+from Bio.Seq import Seq
+from Bio.SeqFeature import CompoundLocation, FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+from requests import RequestException
+
+from .cache import CacheStatistics, RecordCache
+from .rate_limit import AdaptiveLimiter
 from .repository_client import RepositoryClient
+from .session import create_session
 
 
 __all__ = ("BenchlingClient",)
 
 
+logger = logging.getLogger(__name__)
+
+
 class BenchlingClient(RepositoryClient):
     """Provide a pythonic interface to the Benchling API."""
 
-    def __init__(self):
-        """Initialize a Benchling client."""
+    def __init__(
+        self,
+        api: str,
+        token: str,
+        timeout: float = 10.0,
+        cache_size: int = 10_000,
+        cache_ttl: Optional[float] = None,
+        ids_ttl: Optional[float] = 600.0,
+        pool_size: int = 16,
+        initial_concurrency: int = 4,
+        max_retries: int = 5,
+        backoff_factor: float = 0.5,
+        page_size: int = 100,
+        bulk_size: int = 100,
+        folder_id: Optional[str] = None,
+        schema_id: Optional[str] = None,
+        primer_folder_id: Optional[str] = None,
+        id_field: str = "id",
+        **kwargs,
+    ):
+        """
+        Initialize a Benchling client.
+
+        Parameters
+        ----------
+        api : str
+            The base Benchling API URL; typically similar to
+            https://your-tenant.benchling.com/api/v2/.
+        token : str
+            An API key that has read access to DNA sequences and oligos.
+        timeout : float
+            A timeout in seconds for the GET requests.
+        cache_size : int, optional
+            The maximal number of sequence records kept in memory.
+        cache_ttl : float, optional
+            The time in seconds after which cached sequence records expire
+            (default never).
+        ids_ttl : float, optional
+            The time in seconds after which the cached identifiers expire.
+        pool_size : int, optional
+            The number of connections to the API that are kept alive and the
+            upper bound of concurrent requests.
+        initial_concurrency : int, optional
+            The number of concurrent requests before adapting to the rate
+            limit of the API.
+        max_retries : int, optional
+            The maximum number of retries for requests that were rejected due
+            to rate limiting or failed due to server errors.
+        backoff_factor : float, optional
+            The backoff factor in seconds between retries without a rate limit
+            reset time that grows exponentially with each retry.
+        page_size : int, optional
+            The number of entities requested per page when listing.
+        bulk_size : int, optional
+            The number of DNA sequences requested at once.
+        folder_id : str, optional
+            Only list plasmids in this folder.
+        schema_id : str, optional
+            Only list plasmids with this schema.
+        primer_folder_id : str, optional
+            Only list primers in this folder.
+        id_field : str, optional
+            The identifier of plasmids, either the API 'id' or the
+            'entityRegistryId'.
+        kwargs : optional
+            Additional keyword arguments are used to update the default
+            header for making requests to the API.
+
+        """
         super().__init__()
+        self.api = api
+        if not self.api.endswith("/"):
+            self.api += "/"
+        self.timeout = timeout
+        self.host = urlsplit(self.api).netloc
+        self.max_concurrency = int(pool_size)
+        self.max_retries = int(max_retries)
+        self.backoff_factor = backoff_factor
+        self.page_size = int(page_size)
+        self.bulk_size = int(bulk_size)
+        self.folder_id = folder_id
+        self.schema_id = schema_id
+        self.primer_folder_id = primer_folder_id
+        if id_field not in ("id", "entityRegistryId"):
+            raise ValueError(f"Unknown identifier field '{id_field}'.")
+        self.id_field = id_field
+        self.headers = {"Accept": "application/json"}
+        self.headers.update(kwargs)
+        # Rate limiting is handled by the limiter rather than the session.
+        self.session = create_session(
+            pool_size=pool_size,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(500, 502, 503, 504),
+            respect_retry_after=False,
+        )
+        # Benchling expects the API key as the user name of basic auth.
+        self.session.auth = (token, "")
+        self.session.headers.update(self.headers)
+        self.limiter = AdaptiveLimiter(
+            initial=initial_concurrency, maximum=self.max_concurrency
+        )
+        # Concurrent requests for the same resource share a single fetch.
+        self.record_cache = RecordCache(maxsize=cache_size, ttl=cache_ttl)
+        self.ids_cache = RecordCache(maxsize=2, ttl=ids_ttl)
 
-    def get_plasmid_ids(self):
-        """Return a frozenset of all accessible plasmid identifiers."""
-        raise NotImplementedError("Coming soon.")
+    def cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """Return the usage statistics of the record and identifier caches."""
+        return {
+            "records": self.record_cache.statistics(),
+            "ids": self.ids_cache.statistics(),
+        }
+
+    def close(self):
+        """Close all pooled connections to the API."""
+        self.session.close()
+
+    def __enter__(self):
+        """Use the client as a context manager that closes its connections."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Close all pooled connections to the API."""
+        self.close()
+
+    def _reset_delay(self, response, attempt: int) -> float:
+        """Return the time in seconds until the rate limit resets."""
+        for header in ("Retry-After", "x-rate-limit-reset"):
+            try:
+                return max(0.0, float(response.headers[header]))
+            except (KeyError, ValueError):
+                continue
+        return self.backoff_factor * 2**attempt
+
+    def _get(self, path: str, params: Optional[Dict] = None) -> Dict:
+        """Request a resource while adapting to the rate limit."""
+        # Do not use `urljoin` since paths such as 'dna-sequences:bulk-get'
+        # would be mistaken for a URL scheme.
+        endpoint = self.api + path
+        for attempt in range(self.max_retries + 1):
+            with self.limiter:
+                response = self.session.get(
+                    endpoint, params=params, timeout=self.timeout
+                )
+            if response.status_code != 429:
+                break
+            self.limiter.on_throttle(self._reset_delay(response, attempt))
+        response.raise_for_status()
+        try:
+            remaining = int(response.headers["x-rate-limit-remaining"])
+            total = int(response.headers["x-rate-limit-limit"])
+        except (KeyError, ValueError):
+            remaining = total = None
+        self.limiter.on_success(remaining, total)
+        return response.json()
+
+    def _list(self, path: str, key: str, params: Dict) -> Tuple[Dict, ...]:
+        """Return all entities of a listing by following the cursor."""
+        params = dict(params, pageSize=self.page_size)
+        params["returning"] = f"{key}.id,{key}.entityRegistryId,nextToken"
+        entities = []
+        while True:
+            body = self._get(path, params)
+            entities.extend(body.get(key, []))
+            token = body.get("nextToken")
+            if not token:
+                break
+            params["nextToken"] = token
+        logger.debug("Listed %d entities of '%s'.", len(entities), path)
+        return tuple(entities)
+
+    def _ids(self, entities: Iterable[Dict]) -> FrozenSet:
+        return frozenset(
+            entity[self.id_field]
+            for entity in entities
+            if entity.get(self.id_field) is not None
+        )
 
-    def get_plasmid_record(self, plasmid_id):
-        """Return the name and sequence record for a specific plasmid."""
-        raise NotImplementedError("Coming soon.")
+    def get_plasmid_ids(self) -> FrozenSet:
+        """Return a frozenset of all accessible plasmid identifiers."""
+        params = {}
+        if self.folder_id is not None:
+            params["folderId"] = self.folder_id
+        if self.schema_id is not None:
+            params["schemaId"] = self.schema_id
+        return self._ids(
+            self.ids_cache.get(
+                "plasmids", partial(self._list, "dna-sequences", "dnaSequences", params)
+            )
+        )
 
-    def get_primer_ids(self):
+    def get_primer_ids(self) -> FrozenSet:
         """Return a frozenset of all accessible primer identifiers."""
-        raise NotImplementedError("Coming soon.")
+        params = {}
+        if self.primer_folder_id is not None:
+            params["folderId"] = self.primer_folder_id
+        return self._ids(
+            self.ids_cache.get(
+                "primers", partial(self._list, "dna-oligos", "dnaOligos", params)
+            )
+        )
+
+    @staticmethod
+    def _to_record(sequence: Dict) -> Tuple[str, SeqRecord]:
+        """Convert a Benchling DNA sequence into a sequence record."""
+        length = len(sequence["bases"])
+        features = []
+        for annotation in sequence.get("annotations", []):
+            start = int(annotation["start"])
+            end = int(annotation["end"])
+            strand = int(annotation.get("strand") or 0) or None
+            if end > start:
+                location = FeatureLocation(start, end, strand)
+            else:
+                # The annotation wraps around the origin of a circular plasmid.
+                parts = [FeatureLocation(start, length, strand)]
+                if end > 0:
+                    parts.append(FeatureLocation(0, end, strand))
+                location = CompoundLocation(parts) if len(parts) > 1 else parts[0]
+            features.append(
+                SeqFeature(
+                    location,
+                    type=annotation.get("type") or "misc_feature",
+                    qualifiers={"label": [annotation.get("name", "")]},
+                )
+            )
+        record = SeqRecord(
+            Seq(sequence["bases"].upper()),
+            id=sequence["id"],
+            name=sequence["name"],
+            description=sequence["name"],
+            features=features,
+            annotations={
+                "molecule_type": "DNA",
+                "topology": "circular" if sequence.get("isCircular") else "linear",
+            },
+        )
+        return sequence["name"], record
+
+    def _fetch_sequences(self, plasmid_ids: List[str]) -> Dict[str, Dict]:
+        """Request many DNA sequences at once by their identifiers."""
+        joined = ",".join(plasmid_ids)
+        if self.id_field == "id":
+            body = self._get("dna-sequences:bulk-get", {"dnaSequenceIds": joined})
+        else:
+            body = self._get(
+                "dna-sequences",
+                {"entityRegistryIds.anyOf": joined, "pageSize": len(plasmid_ids)},
+            )
+        return {
+            sequence[self.id_field]: sequence
+            for sequence in body.get("dnaSequences", [])
+        }
+
+    def _get_sequence_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        if self.id_field == "id":
+            sequence = self._get(f"dna-sequences/{quote(plasmid_id, safe='')}")
+        else:
+            sequence = self._fetch_sequences([plasmid_id]).get(plasmid_id)
+            if sequence is None:
+                raise KeyError(f"The plasmid '{plasmid_id}' does not exist.")
+        return self._to_record(sequence)
+
+    def get_plasmid_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        """
+        Return the name and sequence record for a specific plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier of interest.
+
+        Returns
+        -------
+        (str, Bio.SeqRecord.SeqRecord)
+            The plasmid name and sequence record if any.
+
+        """
+        return self.record_cache.get(
+            plasmid_id, partial(self._get_sequence_record, plasmid_id)
+        )
+
+    def get_plasmid_records(
+        self, plasmid_ids: Iterable[str], max_workers: Optional[int] = None
+    ) -> Tuple[Dict[str, Tuple[str, SeqRecord]], List[Dict]]:
+        """
+        Return the names and sequence records for many plasmids.
+
+        The records are requested in chunks from the bulk endpoints of the
+        API. Plasmids of chunks that failed, for example, because one of the
+        identifiers does not exist, are retrieved one by one.
+
+        Parameters
+        ----------
+        plasmid_ids : iterable
+            The plasmid identifiers of interest.
+        max_workers : int, optional
+            The number of threads used (default the maximum concurrency).
+
+        Returns
+        -------
+        dict
+            A mapping from plasmid identifiers to their name and sequence
+            record for all successfully retrieved plasmids.
+        list
+            List of errors that are themselves dictionaries with the keys
+            'code', 'message', and 'id' for all failed plasmids.
+
+        """
+        plasmid_ids = list(dict.fromkeys(plasmid_ids))
+        records = {}
+        failed = {}
+        for pid in plasmid_ids:
+            cached = self.record_cache.peek(pid)
+            if cached is not None:
+                records[pid] = cached
+        uncached = [pid for pid in plasmid_ids if pid not in records]
+        chunks = [
+            uncached[i : i + self.bulk_size]
+            for i in range(0, len(uncached), self.bulk_size)
+        ]
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        if chunks:
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(chunks))
+            ) as executor:
+                futures = [
+                    executor.submit(self._fetch_sequences, chunk) for chunk in chunks
+                ]
+                for future in futures:
+                    try:
+                        sequences = future.result()
+                    except RequestException:
+                        logger.debug("Bulk retrieval failed.", exc_info=True)
+                        continue
+                    for pid, sequence in sequences.items():
+                        try:
+                            records[pid] = self._to_record(sequence)
+                        except Exception as error:
+                            logger.debug("Failed to convert '%s'.", pid, exc_info=True)
+                            failed[pid] = {
+                                "code": "retrieval-error",
+                                "message": f"Failed to retrieve the record for "
+                                f"plasmid '{pid}': {error}",
+                                "id": pid,
+                            }
+                            continue
+                        self.record_cache.put(pid, records[pid])
+        missing = [
+            pid for pid in plasmid_ids if pid not in records and pid not in failed
+        ]
+        if missing:
+            logger.debug("Retrieving %d plasmids individually.", len(missing))
+        retrieved, errors = super().get_plasmid_records(missing, max_workers)
+        records.update(retrieved)
+        errors.extend(failed.values())
+        return {pid: records[pid] for pid in plasmid_ids if pid in records}, errors
+
+    def _host_semaphore(self):
+        """Return a no-op context since every request passes the limiter."""
+        return nullcontext()
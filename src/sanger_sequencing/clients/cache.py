@@ -0,0 +1,213 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide a thread-safe cache with single-flight semantics for clients."""
+
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, NamedTuple, Optional
+
+
+__all__ = ("RecordCache", "CacheStatistics")
+
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStatistics(NamedTuple):
+    """Summarize the usage of a record cache."""
+
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+    size: int
+
+
+class _Flight:
+    """Represent a fetch in progress that concurrent callers wait for."""
+
+    __slots__ = ("event", "value", "error")
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.value = None
+        self.error = None
+
+
+class RecordCache:
+    """
+    Cache fetched values in memory with LRU eviction and optional expiry.
+
+    Concurrent requests for a key that is not cached yet share a single
+    fetch, i.e., only the first caller fetches the value while all others
+    wait for its result. Failed fetches are not cached; their error is
+    raised in all waiting callers.
+
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 10_000,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize an empty record cache.
+
+        Parameters
+        ----------
+        maxsize : int, optional
+            The maximum number of cached values. The least recently used
+            values are evicted first.
+        ttl : float, optional
+            The time in seconds after which cached values expire (default
+            never).
+        timer : callable, optional
+            A function returning the current time in seconds.
+
+        """
+        super().__init__()
+        self.maxsize = int(maxsize)
+        self.ttl = ttl
+        self._timer = timer
+        self._entries = OrderedDict()
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._expirations = 0
+
+    def __len__(self) -> int:
+        """Return the number of cached values."""
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Test whether a value that has not expired is cached for the key."""
+        with self._lock:
+            return self._lookup(key) is not None
+
+    def _lookup(self, key: Hashable) -> Optional[tuple]:
+        """Return an entry that has not expired. Requires the lock."""
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= self._timer():
+            del self._entries[key]
+            self._expirations += 1
+            return None
+        return entry
+
+    def _store(self, key: Hashable, value: Any) -> None:
+        """Store a value and evict the least recently used. Requires the lock."""
+        expires = None if self.ttl is None else self._timer() + self.ttl
+        self._entries[key] = (value, expires)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def get(self, key: Hashable, fetch: Callable[[], Any]) -> Any:
+        """
+        Return the cached value for the key or fetch it.
+
+        Parameters
+        ----------
+        key : hashable
+            The key under which the value is cached.
+        fetch : callable
+            A function without arguments that returns the value.
+
+        Returns
+        -------
+        object
+            The cached or fetched value.
+
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return entry[0]
+            flight = self._flights.get(key)
+            if flight is not None:
+                # Another caller is already fetching the value.
+                self._hits += 1
+                owner = False
+            else:
+                self._misses += 1
+                flight = self._flights[key] = _Flight()
+                owner = True
+        if not owner:
+            flight.event.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        try:
+            flight.value = fetch()
+        except BaseException as error:
+            flight.error = error
+            raise
+        else:
+            with self._lock:
+                self._store(key, flight.value)
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.event.set()
+        return flight.value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Cache a value for the key."""
+        with self._lock:
+            self._store(key, value)
+
+    def peek(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for the key without fetching it."""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                return default
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[0]
+
+    def invalidate(self, key: Hashable) -> None:
+        """Remove the cached value for the key if any."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Remove all cached values and reset the statistics."""
+        with self._lock:
+            self._entries.clear()
+            self._hits = self._misses = self._evictions = self._expirations = 0
+
+    def statistics(self) -> CacheStatistics:
+        """Return the hits, misses, evictions, and expirations so far."""
+        with self._lock:
+            return CacheStatistics(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                expirations=self._expirations,
+                size=len(self._entries),
+            )
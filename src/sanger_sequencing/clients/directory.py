@@ -0,0 +1,287 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""A client serving sequence records from a directory of GenBank files."""
+
+
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+from functools import partial
+from pathlib import Path
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from Bio.SeqRecord import SeqRecord
+
+from .cache import RecordCache
+from .repository_client import RepositoryClient
+from .streaming import parse_genbank
+
+
+__all__ = ("DirectoryClient", "IndexEntry")
+
+
+logger = logging.getLogger(__name__)
+
+
+LOCUS = re.compile(rb"^LOCUS[ \t]+(\S+)", re.MULTILINE)
+
+
+class IndexEntry(NamedTuple):
+    """Locate a GenBank record within a file."""
+
+    path: str
+    offset: int
+    length: int
+
+
+class DirectoryClient(RepositoryClient):
+    """
+    Serve plasmid records from a directory of GenBank files.
+
+    All files are indexed once and the index is stored alongside them. Only
+    files whose modification time or size changed are read again on
+    refresh. Records are parsed on demand and the most recently used ones are
+    kept in memory.
+
+    A file with a single record is identified by its name without extension.
+    Records of files with multiple records are identified by their LOCUS
+    names.
+
+    """
+
+    VERSION = 1
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        patterns: Iterable[str] = ("*.gb", "*.gbk", "*.genbank"),
+        recursive: bool = False,
+        index_path: Optional[Union[str, Path]] = None,
+        cache_size: int = 1_000,
+        primer_directory: Optional[Union[str, Path]] = None,
+        lazy: bool = True,
+    ):
+        """
+        Index a directory of GenBank files.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            The directory containing plasmid GenBank files.
+        patterns : iterable of str, optional
+            Glob patterns of the files to index.
+        recursive : bool, optional
+            Whether to include files in sub-directories.
+        index_path : str or pathlib.Path, optional
+            Where to store the index (default a hidden file in the directory).
+        cache_size : int, optional
+            The maximal number of parsed records kept in memory.
+        primer_directory : str or pathlib.Path, optional
+            A directory whose file names, without extension, are the primer
+            identifiers.
+        lazy : bool, optional
+            Whether to parse the features of records only when they are
+            accessed.
+
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        self.patterns = tuple(patterns)
+        self.recursive = recursive
+        self.index_path = (
+            self.directory / ".genbank-index.json"
+            if index_path is None
+            else Path(index_path)
+        )
+        self.primer_directory = (
+            None if primer_directory is None else Path(primer_directory)
+        )
+        self.lazy = lazy
+        self.record_cache = RecordCache(maxsize=cache_size)
+        self._files: Dict[str, Dict] = {}
+        self._entries: Dict[str, IndexEntry] = {}
+        self._lock = threading.Lock()
+        self._load()
+        self.refresh()
+
+    def _load(self) -> None:
+        """Read a previously stored index if it is compatible."""
+        try:
+            with self.index_path.open() as file:
+                index = json.load(file)
+        except (OSError, ValueError):
+            return
+        if index.get("version") == self.VERSION:
+            self._files = index["files"]
+
+    def _save(self) -> None:
+        """Store the index atomically if the location is writable."""
+        index = {"version": self.VERSION, "files": self._files}
+        try:
+            handle, tmp = tempfile.mkstemp(dir=str(self.index_path.parent))
+        except OSError:
+            logger.warning("Cannot store the index at '%s'.", self.index_path)
+            return
+        try:
+            with os.fdopen(handle, "w") as file:
+                json.dump(index, file)
+            os.replace(tmp, str(self.index_path))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _glob(self, directory: Path) -> List[Path]:
+        paths = set()
+        for pattern in self.patterns:
+            paths.update(
+                directory.rglob(pattern) if self.recursive else directory.glob(pattern)
+            )
+        return sorted(path for path in paths if path.is_file())
+
+    @staticmethod
+    def _scan(content: bytes, path: Path) -> List[Tuple[str, int, int]]:
+        """Locate all records in the content of a file."""
+        starts = [(match.start(), match.group(1)) for match in LOCUS.finditer(content)]
+        if len(starts) == 1:
+            return [(path.stem, starts[0][0], len(content) - starts[0][0])]
+        ends = [start for start, _ in starts[1:]] + [len(content)]
+        return [
+            (name.decode("ascii"), start, end - start)
+            for (start, name), end in zip(starts, ends)
+        ]
+
+    def refresh(self) -> Set[str]:
+        """
+        Update the index for added, changed, and removed files.
+
+        Returns
+        -------
+        set
+            The identifiers of records that were added, changed, or removed.
+
+        """
+        with self._lock:
+            files = {}
+            changed = set()
+            dirty = False
+            for path in self._glob(self.directory):
+                key = path.relative_to(self.directory).as_posix()
+                stat = path.stat()
+                previous = self._files.get(key)
+                if (
+                    previous is not None
+                    and previous["mtime_ns"] == stat.st_mtime_ns
+                    and previous["size"] == stat.st_size
+                ):
+                    files[key] = previous
+                    continue
+                dirty = True
+                content = path.read_bytes()
+                digest = hashlib.sha256(content).hexdigest()
+                if previous is not None and previous["digest"] == digest:
+                    # Only the modification time changed.
+                    files[key] = dict(previous, mtime_ns=stat.st_mtime_ns)
+                    continue
+                records = self._scan(content, path)
+                if not records:
+                    logger.warning("No GenBank records found in '%s'.", path)
+                files[key] = {
+                    "mtime_ns": stat.st_mtime_ns,
+                    "size": stat.st_size,
+                    "digest": digest,
+                    "records": records,
+                }
+                changed.update(name for name, _, _ in records)
+                if previous is not None:
+                    changed.update(name for name, _, _ in previous["records"])
+            for key in set(self._files) - set(files):
+                dirty = True
+                changed.update(name for name, _, _ in self._files[key]["records"])
+            self._files = files
+            if dirty:
+                self._save()
+            entries = {}
+            for key, info in files.items():
+                for name, offset, length in info["records"]:
+                    if name in entries:
+                        logger.warning(
+                            "Ignoring the duplicate record '%s' in '%s'.", name, key
+                        )
+                        continue
+                    entries[name] = IndexEntry(key, offset, length)
+            self._entries = entries
+        for name in changed:
+            self.record_cache.invalidate(name)
+        if changed:
+            logger.info("Re-indexed %d records in '%s'.", len(changed), self.directory)
+        return changed
+
+    def entry(self, plasmid_id: str) -> IndexEntry:
+        """Return the location of a plasmid record."""
+        try:
+            return self._entries[plasmid_id]
+        except KeyError:
+            raise KeyError(f"The plasmid '{plasmid_id}' is not indexed.") from None
+
+    def get_plasmid_ids(self) -> FrozenSet:
+        """Return a frozenset of all indexed plasmid identifiers."""
+        return frozenset(self._entries)
+
+    def get_primer_ids(self) -> FrozenSet:
+        """Return a frozenset of all primer identifiers."""
+        if self.primer_directory is None:
+            return frozenset()
+        return frozenset(path.stem for path in self._glob(self.primer_directory))
+
+    def _read_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        entry = self.entry(plasmid_id)
+        path = self.directory / entry.path
+        with path.open("rb") as file:
+            file.seek(entry.offset)
+            content = file.read(entry.length)
+        return path.name, parse_genbank(content, lazy=self.lazy)
+
+    def get_plasmid_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        """
+        Return the name and sequence record for a specific plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier of interest.
+
+        Returns
+        -------
+        (str, Bio.SeqRecord.SeqRecord)
+            The file name and sequence record of the plasmid.
+
+        """
+        return self.record_cache.get(plasmid_id, partial(self._read_record, plasmid_id))
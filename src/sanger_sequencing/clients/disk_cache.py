@@ -0,0 +1,370 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide a persistent on-disk cache for sequence records."""
+
+
+import hashlib
+import logging
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, Iterator, NamedTuple, Optional, Union
+
+from Bio.SeqRecord import SeqRecord
+
+from .streaming import parse_genbank
+
+
+__all__ = ("DiskRecordCache", "CachedRecord")
+
+
+logger = logging.getLogger(__name__)
+
+
+class CachedRecord(NamedTuple):
+    """Describe a sequence record stored on disk."""
+
+    name: str
+    record: SeqRecord
+    digest: str
+    etag: Optional[str]
+    last_modified: Optional[str]
+    fetched: float
+    fresh: bool
+
+    @property
+    def validators(self) -> Dict[str, str]:
+        """Return the headers for a conditional request of the record."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class DiskRecordCache:
+    """
+    Store sequence records on disk so that they survive process restarts.
+
+    The raw GenBank payload and a pickled sequence record are stored once per
+    content hash. A SQLite index maps record keys to content hashes together
+    with the validators (ETag and Last-Modified) needed to revalidate them.
+    When the total size exceeds the limit, the least recently used records
+    are evicted.
+
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS records (
+        key TEXT PRIMARY KEY,
+        name TEXT NOT NULL,
+        digest TEXT NOT NULL,
+        size INTEGER NOT NULL,
+        etag TEXT,
+        last_modified TEXT,
+        fetched REAL NOT NULL,
+        accessed REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS records_accessed ON records (accessed);
+    CREATE INDEX IF NOT EXISTS records_digest ON records (digest);
+    """
+
+    def __init__(
+        self,
+        directory: Union[str, Path],
+        max_size: int = 1024**3,
+        ttl: Optional[float] = None,
+        timer: Callable[[], float] = time.time,
+    ):
+        """
+        Initialize a cache in the given directory.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            The directory containing the cache. It is created if necessary.
+        max_size : int, optional
+            The maximum total size in bytes of the stored payloads and pickles.
+        ttl : float, optional
+            The time in seconds after which records need to be revalidated
+            (default always revalidate).
+        timer : callable, optional
+            A function returning the current time in seconds.
+
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        self.objects = self.directory / "objects"
+        self.objects.mkdir(parents=True, exist_ok=True)
+        self.max_size = int(max_size)
+        self.ttl = ttl
+        self._timer = timer
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(
+            str(self.directory / "index.sqlite"),
+            timeout=30,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._connection.executescript(self.SCHEMA)
+
+    def close(self) -> None:
+        """Close the index database."""
+        with self._lock:
+            self._connection.close()
+
+    def __len__(self) -> int:
+        """Return the number of stored records."""
+        with self._lock:
+            row = self._connection.execute("SELECT COUNT(*) FROM records").fetchone()
+        return row[0]
+
+    @staticmethod
+    def hash(payload: bytes) -> str:
+        """Return the content hash of a raw payload."""
+        return hashlib.sha256(payload).hexdigest()
+
+    def _path(self, digest: str, suffix: str) -> Path:
+        return self.objects / digest[:2] / f"{digest}{suffix}"
+
+    def _write(self, path: Path, content: bytes) -> None:
+        """Write a file atomically such that readers never see partial files."""
+        path.parent.mkdir(exist_ok=True)
+        handle, tmp = tempfile.mkstemp(dir=str(path.parent))
+        try:
+            with os.fdopen(handle, "wb") as file:
+                file.write(content)
+            os.replace(tmp, str(path))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def _load(self, digest: str) -> SeqRecord:
+        """Unpickle a record and fall back to parsing the raw payload."""
+        try:
+            with self._path(digest, ".pickle").open("rb") as file:
+                return pickle.load(file)
+        except Exception:
+            logger.debug("Re-parsing the payload of '%s'.", digest, exc_info=True)
+        payload = self._path(digest, ".gb").read_bytes()
+        record = parse_genbank(payload)
+        self._write(
+            self._path(digest, ".pickle"),
+            pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL),
+        )
+        return record
+
+    def get(self, key: str) -> Optional[CachedRecord]:
+        """
+        Return the stored record for the key if any.
+
+        Parameters
+        ----------
+        key : str
+            The key under which the record is stored, for example, its URL.
+
+        Returns
+        -------
+        CachedRecord or None
+            The stored record and whether it is still fresh.
+
+        """
+        now = self._timer()
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT name, digest, etag, last_modified, fetched FROM records "
+                "WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            self._connection.execute(
+                "UPDATE records SET accessed = ? WHERE key = ?", (now, key)
+            )
+        name, digest, etag, last_modified, fetched = row
+        try:
+            record = self._load(digest)
+        except OSError:
+            logger.warning("The cached files of '%s' are missing.", key)
+            self.invalidate(key)
+            return None
+        fresh = self.ttl is not None and now < fetched + self.ttl
+        return CachedRecord(name, record, digest, etag, last_modified, fetched, fresh)
+
+    def raw(self, key: str) -> Optional[bytes]:
+        """Return the raw payload stored for the key if any."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT digest FROM records WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return self._path(row[0], ".gb").read_bytes()
+        except OSError:
+            logger.warning("The cached files of '%s' are missing.", key)
+            self.invalidate(key)
+            return None
+
+    def put(
+        self,
+        key: str,
+        name: str,
+        payload: bytes,
+        record: Optional[SeqRecord] = None,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> CachedRecord:
+        """
+        Store a record and its raw payload.
+
+        Parameters
+        ----------
+        key : str
+            The key under which the record is stored.
+        name : str
+            The name of the record, for example, its file name.
+        payload : bytes
+            The raw GenBank payload.
+        record : Bio.SeqRecord.SeqRecord, optional
+            The parsed record (default parse the payload).
+        etag : str, optional
+            The ETag header of the response.
+        last_modified : str, optional
+            The Last-Modified header of the response.
+
+        Returns
+        -------
+        CachedRecord
+            The stored record.
+
+        """
+        if record is None:
+            record = parse_genbank(payload)
+        digest = self.hash(payload)
+        pickled = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        now = self._timer()
+        # Files are written within the transaction such that no concurrent
+        # writer can collect them before the new row references them.
+        with self._transaction():
+            if not self._path(digest, ".gb").exists():
+                self._write(self._path(digest, ".gb"), payload)
+            self._write(self._path(digest, ".pickle"), pickled)
+            previous = self._connection.execute(
+                "SELECT digest FROM records WHERE key = ?", (key,)
+            ).fetchone()
+            self._connection.execute(
+                "INSERT OR REPLACE INTO records (key, name, digest, size, etag, "
+                "last_modified, fetched, accessed) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    name,
+                    digest,
+                    len(payload) + len(pickled),
+                    etag,
+                    last_modified,
+                    now,
+                    now,
+                ),
+            )
+            if previous is not None and previous[0] != digest:
+                self._collect(previous[0])
+            self._evict()
+        return CachedRecord(name, record, digest, etag, last_modified, now, True)
+
+    def touch(
+        self,
+        key: str,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+    ) -> None:
+        """Mark a record as revalidated and update its validators if given."""
+        now = self._timer()
+        with self._lock:
+            self._connection.execute(
+                "UPDATE records SET fetched = ?, accessed = ?, "
+                "etag = COALESCE(?, etag), "
+                "last_modified = COALESCE(?, last_modified) WHERE key = ?",
+                (now, now, etag, last_modified, key),
+            )
+
+    def invalidate(self, key: str) -> None:
+        """Remove the record stored for the key if any."""
+        with self._transaction():
+            row = self._connection.execute(
+                "SELECT digest FROM records WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return
+            self._connection.execute("DELETE FROM records WHERE key = ?", (key,))
+            self._collect(row[0])
+
+    def size(self) -> int:
+        """Return the total size in bytes of all stored records."""
+        with self._lock:
+            return self._total_size()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[None]:
+        """Hold the lock and the write lock of the index across processes."""
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+            self._connection.execute("COMMIT")
+
+    def _total_size(self) -> int:
+        """Sum the sizes of distinct payloads. Requires the lock."""
+        return self._connection.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM "
+            "(SELECT MAX(size) AS size FROM records GROUP BY digest)"
+        ).fetchone()[0]
+
+    def _collect(self, digest: str) -> None:
+        """Remove files no longer referenced by any key. Requires a transaction."""
+        if self._connection.execute(
+            "SELECT 1 FROM records WHERE digest = ? LIMIT 1", (digest,)
+        ).fetchone():
+            return
+        for suffix in (".gb", ".pickle"):
+            try:
+                self._path(digest, suffix).unlink()
+            except FileNotFoundError:
+                pass
+
+    def _evict(self) -> None:
+        """Remove the least recently used records. Requires a transaction."""
+        total = self._total_size()
+        while total > self.max_size:
+            row = self._connection.execute(
+                "SELECT key, digest FROM records ORDER BY accessed LIMIT 1"
+            ).fetchone()
+            if row is None:
+                break
+            logger.debug("Evicting '%s' from the disk cache.", row[0])
+            self._connection.execute("DELETE FROM records WHERE key = ?", (row[0],))
+            self._collect(row[1])
+            total = self._total_size()
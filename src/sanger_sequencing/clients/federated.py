@@ -0,0 +1,416 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Combine several repository clients with hedged requests."""
+
+
+import logging
+import threading
+import time
+from bisect import bisect_left
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Dict, FrozenSet, List, Optional, Sequence, Tuple
+
+from Bio.SeqRecord import SeqRecord
+from requests import HTTPError
+
+from .repository_client import RepositoryClient
+
+
+__all__ = ("FederatedClient", "LatencyHistogram", "CircuitBreaker")
+
+
+logger = logging.getLogger(__name__)
+
+
+class LatencyHistogram:
+    """Count latencies in logarithmically spaced buckets."""
+
+    # Bucket bounds grow by a factor of sqrt(2) from 1 ms to about 90 s.
+    BOUNDS = tuple(0.001 * 2 ** (i / 2) for i in range(34))
+
+    def __init__(self):
+        """Initialize an empty histogram."""
+        super().__init__()
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float) -> None:
+        """Add a latency in seconds."""
+        with self._lock:
+            self.counts[bisect_left(self.BOUNDS, seconds)] += 1
+            self.count += 1
+            self.total += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Return an upper bound of the given quantile or None if empty."""
+        with self._lock:
+            if not self.count:
+                return None
+            rank = q * self.count
+            cumulative = 0
+            for index, count in enumerate(self.counts):
+                cumulative += count
+                if cumulative >= rank and count:
+                    break
+        if index < len(self.BOUNDS):
+            return self.BOUNDS[index]
+        return float("inf")
+
+    @property
+    def mean(self) -> Optional[float]:
+        """Return the mean latency or None if empty."""
+        return self.total / self.count if self.count else None
+
+
+class CircuitBreaker:
+    """
+    Stop calling a backend after repeated failures.
+
+    After a number of consecutive failures the circuit opens and no calls are
+    allowed. Once the reset timeout has passed, a single trial call is let
+    through; its success closes the circuit while a failure opens it again.
+
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize a closed circuit breaker.
+
+        Parameters
+        ----------
+        failure_threshold : int, optional
+            The number of consecutive failures that open the circuit.
+        reset_timeout : float, optional
+            The time in seconds after which an open circuit allows a trial.
+        timer : callable, optional
+            A function returning the current time in seconds.
+
+        """
+        super().__init__()
+        self.failure_threshold = int(failure_threshold)
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self._timer = timer
+        self._opened: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Return 'closed', 'open', or 'half-open'."""
+        with self._lock:
+            if self._opened is None:
+                return "closed"
+            if self._timer() - self._opened < self.reset_timeout:
+                return "open"
+            return "half-open"
+
+    def allow(self) -> bool:
+        """Return whether a call may be made now."""
+        with self._lock:
+            if self._opened is None:
+                return True
+            if self._trial or self._timer() - self._opened < self.reset_timeout:
+                return False
+            self._trial = True
+            return True
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful call."""
+        with self._lock:
+            self.failures = 0
+            self._opened = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        """Count a failed call and open the circuit if necessary."""
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                if self._opened is None or self._trial:
+                    logger.warning("Opening circuit after %d failures.", self.failures)
+                self._opened = self._timer()
+            self._trial = False
+
+
+def is_miss(error: Exception) -> bool:
+    """Return whether an error means that a backend does not know a record."""
+    if isinstance(error, KeyError):
+        return True
+    if isinstance(error, HTTPError) and error.response is not None:
+        return error.response.status_code == 404
+    return False
+
+
+class _Backend:
+    """Wrap a client with its latency histogram and circuit breaker."""
+
+    def __init__(self, name, client, breaker, slow_call):
+        self.name = name
+        self.client = client
+        self.breaker = breaker
+        self.slow_call = slow_call
+        self.histogram = LatencyHistogram()
+        self.hedged = 0
+
+    def call(self, method: str, *args):
+        start = time.monotonic()
+        try:
+            result = getattr(self.client, method)(*args)
+        except Exception as error:
+            self.histogram.record(time.monotonic() - start)
+            if is_miss(error):
+                self.breaker.record_success()
+            else:
+                self.breaker.record_failure()
+            raise
+        latency = time.monotonic() - start
+        self.histogram.record(latency)
+        if self.slow_call is not None and latency > self.slow_call:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return result
+
+
+class FederatedClient(RepositoryClient):
+    """
+    Query several repository clients in order of priority.
+
+    A record is requested from the first available backend. If it has not
+    answered within the hedge delay, the next backend is queried as well and
+    the first successful answer is used. A backend that does not know a
+    record or fails is skipped right away. Backends that fail repeatedly or
+    are too slow are not queried until their circuit breaker allows a trial.
+
+    """
+
+    def __init__(
+        self,
+        clients: Sequence[RepositoryClient],
+        names: Optional[Sequence[str]] = None,
+        hedge_delay: Optional[float] = None,
+        hedge_quantile: float = 0.95,
+        default_hedge_delay: float = 0.5,
+        slow_call: Optional[float] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        max_workers: Optional[int] = None,
+    ):
+        """
+        Initialize a federated client.
+
+        Parameters
+        ----------
+        clients : sequence of RepositoryClient
+            The backends in order of priority.
+        names : sequence of str, optional
+            Names of the backends used in statistics and logs (default the
+            class names).
+        hedge_delay : float, optional
+            A fixed time in seconds after which the next backend is queried
+            (default adapt to the latency of each backend).
+        hedge_quantile : float, optional
+            The latency quantile of a backend that is used as its hedge delay
+            unless a fixed delay is given.
+        default_hedge_delay : float, optional
+            The hedge delay of backends without enough latency measurements.
+        slow_call : float, optional
+            Calls taking longer than this many seconds count as failures for
+            the circuit breaker.
+        failure_threshold : int, optional
+            The number of consecutive failures that open the circuit of a
+            backend.
+        reset_timeout : float, optional
+            The time in seconds before a backend with an open circuit is tried
+            again.
+        max_workers : int, optional
+            The number of threads making first requests and, separately, the
+            number of threads making hedge requests (default four per
+            backend each).
+
+        """
+        super().__init__()
+        if not clients:
+            raise ValueError("At least one repository client is required.")
+        if names is None:
+            names = [type(client).__name__ for client in clients]
+        self.backends = [
+            _Backend(
+                name,
+                client,
+                CircuitBreaker(
+                    failure_threshold=failure_threshold, reset_timeout=reset_timeout
+                ),
+                slow_call,
+            )
+            for name, client in zip(names, clients)
+        ]
+        self.hedge_delay = hedge_delay
+        self.hedge_quantile = hedge_quantile
+        self.default_hedge_delay = default_hedge_delay
+        # Hedges run on their own threads such that they never queue behind
+        # the slow first requests that they are meant to bypass.
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers or 4 * len(self.backends)
+        )
+        self._hedge_executor = ThreadPoolExecutor(
+            max_workers=max_workers or 4 * len(self.backends)
+        )
+
+    def close(self):
+        """Stop the threads making requests."""
+        self._executor.shutdown(wait=False)
+        self._hedge_executor.shutdown(wait=False)
+
+    def __enter__(self):
+        """Use the client as a context manager that stops its threads."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Stop the threads making requests."""
+        self.close()
+
+    def _delay(self, backend: _Backend) -> float:
+        if self.hedge_delay is not None:
+            return self.hedge_delay
+        # Require some measurements before trusting the quantile.
+        if backend.histogram.count < 20:
+            return self.default_hedge_delay
+        return backend.histogram.quantile(self.hedge_quantile)
+
+    def _available(self) -> List[_Backend]:
+        available = [backend for backend in self.backends if backend.breaker.allow()]
+        if not available:
+            raise RuntimeError("The circuits of all repository backends are open.")
+        return available
+
+    def _union(self, method: str) -> FrozenSet:
+        backends = self._available()
+        futures = [self._executor.submit(backend.call, method) for backend in backends]
+        result = set()
+        errors = []
+        for backend, future in zip(backends, futures):
+            try:
+                result.update(future.result())
+            except Exception as error:
+                logger.warning("Backend '%s' failed: %s", backend.name, error)
+                errors.append(error)
+        if len(errors) == len(backends):
+            raise errors[0]
+        return frozenset(result)
+
+    def get_plasmid_ids(self) -> FrozenSet:
+        """Return the union of the plasmid identifiers of all backends."""
+        return self._union("get_plasmid_ids")
+
+    def get_primer_ids(self) -> FrozenSet:
+        """Return the union of the primer identifiers of all backends."""
+        return self._union("get_primer_ids")
+
+    def get_plasmid_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        """
+        Return the name and sequence record for a specific plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier of interest.
+
+        Returns
+        -------
+        (str, Bio.SeqRecord.SeqRecord)
+            The plasmid name and sequence record from the first backend that
+            answers successfully.
+
+        """
+        # Circuits are checked lazily since a half-open circuit grants a trial.
+        queue = (backend for backend in self.backends if backend.breaker.allow())
+        pending = {}
+        errors = []
+        last = None
+
+        def launch() -> bool:
+            nonlocal last
+            backend = next(queue, None)
+            if backend is None:
+                return False
+            executor = self._executor if last is None else self._hedge_executor
+            future = executor.submit(backend.call, "get_plasmid_record", plasmid_id)
+            pending[future] = backend
+            last = backend
+            return True
+
+        if not launch():
+            raise RuntimeError("The circuits of all repository backends are open.")
+        exhausted = False
+        while pending:
+            done, _ = wait(
+                pending,
+                timeout=None if exhausted else self._delay(last),
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                logger.debug(
+                    "Hedging the request for '%s' after '%s'.", plasmid_id, last.name
+                )
+                last.hedged += 1
+                exhausted = not launch()
+                continue
+            # Prefer the backend of higher priority if several answered.
+            for future in sorted(
+                done, key=lambda future: self.backends.index(pending[future])
+            ):
+                backend = pending.pop(future)
+                try:
+                    return future.result()
+                except Exception as error:
+                    logger.debug(
+                        "Backend '%s' did not provide '%s': %s",
+                        backend.name,
+                        plasmid_id,
+                        error,
+                    )
+                    errors.append(error)
+            if not exhausted:
+                exhausted = not launch()
+        # Prefer reporting an actual failure over a missing record.
+        failures = [error for error in errors if not is_miss(error)]
+        raise (failures or errors)[0]
+
+    def statistics(self) -> List[Dict]:
+        """Return the latency, circuit, and hedging statistics per backend."""
+        return [
+            {
+                "name": backend.name,
+                "state": backend.breaker.state,
+                "requests": backend.histogram.count,
+                "mean": backend.histogram.mean,
+                "p50": backend.histogram.quantile(0.5),
+                "p95": backend.histogram.quantile(0.95),
+                "p99": backend.histogram.quantile(0.99),
+                "hedged": backend.hedged,
+            }
+            for backend in self.backends
+        ]
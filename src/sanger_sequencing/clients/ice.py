@@ -17,27 +17,251 @@
 """A basic client for the jbei ICE API."""
 
 
+import logging
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Collection, Dict, FrozenSet, List, Optional, Tuple
+from urllib.parse import quote, urljoin, urlsplit
+
+from Bio.SeqRecord import SeqRecord
+
+from .cache import CacheStatistics, RecordCache
 from .repository_client import RepositoryClient
+from .session import create_session
+from .streaming import parse_genbank
 
 
 __all__ = ("ICEClient",)
 
 
+logger = logging.getLogger(__name__)
+
+
+FILENAME = re.compile(r'filename\*?=(?:UTF-8\'\')?"?([^";]+)"?', re.IGNORECASE)
+
+
 class ICEClient(RepositoryClient):
     """Provide a pythonic interface to the ICE API."""
 
-    def __init__(self):
-        """Initialize the ICE client."""
+    def __init__(
+        self,
+        api: str,
+        token: str,
+        client_id: str,
+        owner: Optional[str] = None,
+        timeout: float = 10.0,
+        cache_size: int = 10_000,
+        cache_ttl: Optional[float] = None,
+        ids_ttl: Optional[float] = 600.0,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        page_size: int = 100,
+        plasmid_source: str = "collections/AVAILABLE",
+        primer_source: Optional[str] = None,
+        plasmid_types: Collection[str] = ("PLASMID",),
+        primer_types: Collection[str] = ("PART",),
+        id_field: str = "partId",
+        **kwargs,
+    ):
+        """
+        Initialize the ICE client.
+
+        Parameters
+        ----------
+        api : str
+            The base ICE REST API URL; typically similar to
+            https://ice.your.domain/rest/.
+        token : str
+            An API key that has read access to plasmids and primers.
+        client_id : str
+            The client identifier the API key was registered with.
+        owner : str, optional
+            The user on whose behalf requests are made if the API key allows
+            it.
+        timeout : float
+            A timeout in seconds for the GET requests.
+        cache_size : int, optional
+            The maximal number of sequence records kept in memory.
+        cache_ttl : float, optional
+            The time in seconds after which cached sequence records expire
+            (default never).
+        ids_ttl : float, optional
+            The time in seconds after which the cached entry listings expire.
+        pool_size : int, optional
+            The number of connections to the API that are kept alive for
+            re-use and, thus, the number of concurrent requests.
+        max_retries : int, optional
+            The maximum number of retries for requests that failed due to rate
+            limiting or server errors.
+        backoff_factor : float, optional
+            The backoff factor in seconds between retries that grows
+            exponentially with each retry.
+        page_size : int, optional
+            The number of entries requested per page when listing entries.
+        plasmid_source : str, optional
+            The collection or folder containing plasmids, for example,
+            'collections/SHARED' or 'folders/42'.
+        primer_source : str, optional
+            The collection or folder containing primers (default the plasmid
+            source).
+        plasmid_types : collection of str, optional
+            The ICE entry types that are considered plasmids.
+        primer_types : collection of str, optional
+            The ICE entry types that are considered primers.
+        id_field : str, optional
+            The entry field used as identifier, i.e., 'partId' or 'id'.
+        kwargs : optional
+            Additional keyword arguments are used to update the default
+            header for making requests to the API.
+
+        """
         super().__init__()
+        self.api = api
+        if not self.api.endswith("/"):
+            self.api += "/"
+        self.token = token
+        self.timeout = timeout
+        self.host = urlsplit(self.api).netloc
+        self.max_concurrency = int(pool_size)
+        self.page_size = int(page_size)
+        self.plasmid_source = plasmid_source
+        self.primer_source = plasmid_source if primer_source is None else primer_source
+        self.plasmid_types = frozenset(plasmid_types)
+        self.primer_types = frozenset(primer_types)
+        self.id_field = id_field
+        self.headers = {
+            "X-ICE-API-Token-Client": client_id,
+            "X-ICE-API-Token": token,
+            "Accept": "application/json",
+        }
+        if owner is not None:
+            self.headers["X-ICE-API-Token-Owner"] = owner
+        self.headers.update(kwargs)
+        self.session = create_session(
+            pool_size=pool_size, max_retries=max_retries, backoff_factor=backoff_factor
+        )
+        self.session.headers.update(self.headers)
+        # Concurrent requests for the same resource share a single fetch.
+        self.record_cache = RecordCache(maxsize=cache_size, ttl=cache_ttl)
+        self.ids_cache = RecordCache(maxsize=2, ttl=ids_ttl)
 
-    def get_plasmid_ids(self):
-        """Return a frozenset of all accessible plasmid identifiers."""
-        raise NotImplementedError("Coming soon.")
+    def cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """Return the usage statistics of the record and listing caches."""
+        return {
+            "records": self.record_cache.statistics(),
+            "ids": self.ids_cache.statistics(),
+        }
+
+    def close(self):
+        """Close all pooled connections to the API."""
+        self.session.close()
+
+    def __enter__(self):
+        """Use the client as a context manager that closes its connections."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Close all pooled connections to the API."""
+        self.close()
 
-    def get_plasmid_record(self, plasmid_id):
-        """Return the name and sequence record for a specific plasmid."""
-        raise NotImplementedError("Coming soon.")
+    def _get_page(self, endpoint: str, offset: int) -> Tuple[List[Dict], int]:
+        response = self.session.get(
+            endpoint,
+            params={
+                "offset": offset,
+                "limit": self.page_size,
+                # A stable order is required for concurrently requested pages.
+                "sort": "created",
+                "asc": "true",
+            },
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        body = response.json()
+        # Collections report a result count, folders an entry count.
+        if "data" in body:
+            return body["data"], body.get("resultCount", 0)
+        return body.get("entries", []), body.get("count", 0)
 
-    def get_primer_ids(self):
+    def _list_entries(self, source: str) -> Tuple[Dict, ...]:
+        """Return all entries of a collection or folder page by page."""
+        endpoint = urljoin(self.api, f"{source}/entries")
+        entries, total = self._get_page(endpoint, 0)
+        # Servers may cap the limit, so step by the size of the first page.
+        step = len(entries)
+        pages = {0: entries}
+        offsets = range(step, total, step) if step else range(0)
+        semaphore = self._host_semaphore()
+
+        def fetch(offset):
+            with semaphore:
+                return self._get_page(endpoint, offset)[0]
+
+        if offsets:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_concurrency, len(offsets))
+            ) as executor:
+                pages.update(zip(offsets, executor.map(fetch, offsets)))
+        # Walk the pages in order and fill any gaps left by short pages.
+        entries = []
+        while len(entries) < total:
+            page = pages.pop(len(entries), None)
+            if page is None:
+                page = fetch(len(entries))
+            if not page:
+                break
+            entries.extend(page)
+        if len(entries) != total:
+            raise RuntimeError(
+                f"Listed {len(entries)} of {total} entries of '{source}'."
+            )
+        logger.debug("Listed %d entries of '%s'.", len(entries), source)
+        return tuple(entries)
+
+    def _get_entry_ids(self, source: str, types: FrozenSet) -> FrozenSet:
+        entries = self.ids_cache.get(source, partial(self._list_entries, source))
+        return frozenset(
+            str(entry[self.id_field])
+            for entry in entries
+            if entry.get("type", "").upper() in types
+        )
+
+    def get_plasmid_ids(self) -> FrozenSet:
+        """Return a frozenset of all accessible plasmid identifiers."""
+        return self._get_entry_ids(self.plasmid_source, self.plasmid_types)
+
+    def get_primer_ids(self) -> FrozenSet:
         """Return a frozenset of all accessible primer identifiers."""
-        raise NotImplementedError("Coming soon.")
+        return self._get_entry_ids(self.primer_source, self.primer_types)
+
+    def _get_sequence_record(self, entry_id: str) -> Tuple[str, SeqRecord]:
+        endpoint = urljoin(
+            self.api, f"file/{quote(entry_id, safe='')}/sequence/genbank"
+        )
+        response = self.session.get(endpoint, timeout=self.timeout)
+        response.raise_for_status()
+        match = FILENAME.search(response.headers.get("Content-Disposition", ""))
+        name = match.group(1) if match is not None else f"{entry_id}.gb"
+        return name, parse_genbank(response.content)
+
+    def get_plasmid_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        """
+        Return the name and sequence record for a specific plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier of interest.
+
+        Returns
+        -------
+        (str, Bio.SeqRecord.SeqRecord)
+            The plasmid name and sequence record if any.
+
+        """
+        plasmid_id = str(plasmid_id)
+        return self.record_cache.get(
+            plasmid_id, partial(self._get_sequence_record, plasmid_id)
+        )
@@ -18,20 +18,35 @@
 
 
 import base64
-from functools import lru_cache
-from io import StringIO
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from operator import itemgetter
-from typing import FrozenSet, Tuple
-from urllib.parse import urljoin
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
 
-import requests
-from Bio import SeqIO
 from Bio.SeqRecord import SeqRecord
 
+from .cache import CacheStatistics, RecordCache
+from .disk_cache import CachedRecord, DiskRecordCache
 from .repository_client import RepositoryClient
+from .session import create_session
+from .streaming import Base64Reader, JSONFieldStream, parse_genbank, read_genbank
 
 
-__all__ = ("LabCollectorClient",)
+__all__ = ("LabCollectorClient", "SequencePayload")
+
+
+logger = logging.getLogger(__name__)
+
+
+class SequencePayload(NamedTuple):
+    """Describe a downloaded GenBank file and its validators."""
+
+    name: str
+    payload: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
 
 
 class LabCollectorClient(RepositoryClient):
@@ -39,6 +54,8 @@ class LabCollectorClient(RepositoryClient):
 
     COUNT_PARAMETERS = {"fields": "count"}
     FIELD_PARAMETERS = {"fields": "Sequence_file_GenBank"}
+    BULK_FIELD_PARAMETERS = {"fields": "count,Sequence_file_GenBank"}
+    CHUNK_SIZE = 64 * 1024
 
     def __init__(
         self,
@@ -46,6 +63,14 @@ class LabCollectorClient(RepositoryClient):
         token: str,
         timeout: float = 10.0,
         cache_size: int = 10_000,
+        cache_ttl: Optional[float] = None,
+        ids_ttl: Optional[float] = 600.0,
+        disk_cache: Optional[DiskRecordCache] = None,
+        pool_size: int = 10,
+        max_retries: int = 3,
+        backoff_factor: float = 0.5,
+        bulk_filter: Optional[str] = None,
+        bulk_size: int = 50,
         **kwargs,
     ):
         """
@@ -63,6 +88,34 @@ class LabCollectorClient(RepositoryClient):
         cache_size : int, optional
             The maximal size of the LRU cache. A trade-off between
             performance for already requested resources and the memory used.
+        cache_ttl : float, optional
+            The time in seconds after which cached sequence records expire
+            (default never).
+        ids_ttl : float, optional
+            The time in seconds after which the cached sets of plasmid and
+            primer identifiers expire.
+        disk_cache : DiskRecordCache, optional
+            A persistent cache for sequence records that is shared between
+            processes. Stored records are revalidated with conditional
+            requests and, if the content is unchanged, not parsed again.
+        pool_size : int, optional
+            The number of connections to the API that are kept alive for
+            re-use.
+        max_retries : int, optional
+            The maximum number of retries for requests that failed due to rate
+            limiting or server errors.
+        backoff_factor : float, optional
+            The backoff factor in seconds between retries that grows
+            exponentially with each retry.
+        bulk_filter : str, optional
+            The name of a query parameter by which the API can filter
+            resources by a comma-separated list of identifiers. If given,
+            many plasmid records are requested in chunks rather than one by
+            one. Not every LabCollector installation supports such a filter,
+            therefore, it is disabled by default.
+        bulk_size : int, optional
+            The number of plasmid records requested at once when a bulk
+            filter is used.
         kwargs : optional
             Additional keyword arguments are used to update the default
             header for making requests to the API.
@@ -74,28 +127,49 @@ class LabCollectorClient(RepositoryClient):
             self.api += "/"
         self.token = token
         self.timeout = timeout
+        self.host = urlsplit(self.api).netloc
+        self.max_concurrency = int(pool_size)
+        self.bulk_filter = bulk_filter
+        self.bulk_size = int(bulk_size)
         self.headers = {
             "X-LC-APP-Auth": token,
             "Accept": "application/json",
             "Cache-Control": "no-cache",
         }
         self.headers.update(kwargs)
+        self.session = create_session(
+            pool_size=pool_size, max_retries=max_retries, backoff_factor=backoff_factor
+        )
+        self.session.headers.update(self.headers)
         self.plasmids_resource = urljoin(self.api, "plasmids")
         self.primers_resource = urljoin(self.api, "primers")
-        # We want the instance methods to be cached rather than the class
-        # methods.
-        self.get_plasmid_ids = lru_cache(maxsize=1)(self.get_plasmid_ids)
-        self.get_plasmid_record = lru_cache(maxsize=int(cache_size))(
-            self.get_plasmid_record
-        )
-        self.get_primer_ids = lru_cache(maxsize=1)(self.get_primer_ids)
+        # Concurrent requests for the same resource share a single fetch.
+        self.record_cache = RecordCache(maxsize=cache_size, ttl=cache_ttl)
+        self.ids_cache = RecordCache(maxsize=2, ttl=ids_ttl)
+        self.disk_cache = disk_cache
+
+    def cache_statistics(self) -> Dict[str, CacheStatistics]:
+        """Return the usage statistics of the record and identifier caches."""
+        return {
+            "records": self.record_cache.statistics(),
+            "ids": self.ids_cache.statistics(),
+        }
+
+    def close(self):
+        """Close all pooled connections to the API."""
+        self.session.close()
+
+    def __enter__(self):
+        """Use the client as a context manager that closes its connections."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Close all pooled connections to the API."""
+        self.close()
 
     def _get_resource_ids(self, endpoint: str) -> FrozenSet:
-        response = requests.get(
-            endpoint,
-            headers=self.headers,
-            params=self.COUNT_PARAMETERS,
-            timeout=self.timeout,
+        response = self.session.get(
+            endpoint, params=self.COUNT_PARAMETERS, timeout=self.timeout
         )
         response.raise_for_status()
         # The counter seems to be the sequential identifier for objects
@@ -105,30 +179,170 @@ class LabCollectorClient(RepositoryClient):
 
     def get_plasmid_ids(self) -> FrozenSet:
         """Return a frozenset of all accessible plasmid identifiers."""
-        return self._get_resource_ids(self.plasmids_resource)
+        return self.ids_cache.get(
+            self.plasmids_resource,
+            partial(self._get_resource_ids, self.plasmids_resource),
+        )
 
     def get_primer_ids(self) -> FrozenSet:
         """Return a frozenset of all accessible primer identifiers."""
-        return self._get_resource_ids(self.primers_resource)
+        return self.ids_cache.get(
+            self.primers_resource,
+            partial(self._get_resource_ids, self.primers_resource),
+        )
+
+    def get_plasmid_versions(self, field: str) -> Dict[str, str]:
+        """
+        Return the value of a field for all accessible plasmids.
+
+        Parameters
+        ----------
+        field : str
+            The name of a field that changes with every modification of a
+            plasmid, for example, a modification date.
+
+        Returns
+        -------
+        dict
+            A mapping from plasmid identifiers to the value of the field.
+
+        """
+        response = self.session.get(
+            self.plasmids_resource,
+            params={"fields": f"count,{field}"},
+            timeout=self.timeout,
+        )
+        response.raise_for_status()
+        return {str(elem["count"]): elem.get(field) for elem in response.json()}
+
+    def download_plasmid(
+        self, plasmid_id: str, validators: Optional[Dict[str, str]] = None
+    ) -> Optional[SequencePayload]:
+        """
+        Return the raw GenBank file of a specific plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier of interest.
+        validators : dict, optional
+            Headers for a conditional request as returned by a previous
+            download, i.e., 'If-None-Match' and 'If-Modified-Since'.
+
+        Returns
+        -------
+        SequencePayload or None
+            The name and content of the GenBank file or ``None`` if it has
+            not changed according to the validators.
+
+        """
+        return self._download_sequence(
+            f"{self.plasmids_resource}/{plasmid_id}", validators
+        )
+
+    def _disk_entry(self, key: str) -> Optional[CachedRecord]:
+        if self.disk_cache is None:
+            return None
+        return self.disk_cache.get(key)
 
     def _get_sequence_record(
         self, endpoint: str, record_id: str
     ) -> Tuple[str, SeqRecord]:
         endpoint += f"/{record_id}"
-        response = requests.get(
+        entry = self._disk_entry(endpoint)
+        if entry is not None and entry.fresh:
+            return entry.name, entry.record
+        if self.disk_cache is None:
+            with self._request_sequence(endpoint) as response:
+                response.raise_for_status()
+                # Decode the GenBank file while it is being downloaded in
+                # order to avoid holding several copies of large constructs
+                # in memory.
+                document = JSONFieldStream(
+                    response.iter_content(self.CHUNK_SIZE), "content"
+                )
+                record = read_genbank(Base64Reader(document.iter_field()))
+                document.consume()
+            return document.fields["name"], record
+        download = self._download_sequence(
+            endpoint, None if entry is None else entry.validators
+        )
+        if download is None:
+            self.disk_cache.touch(endpoint)
+            return entry.name, entry.record
+        return self._store_sequence_record(endpoint, *download, entry=entry)
+
+    def _request_sequence(self, endpoint: str, validators: Optional[Dict] = None):
+        return self.session.get(
             endpoint,
-            headers=self.headers,
             params=self.FIELD_PARAMETERS,
+            headers=validators,
             timeout=self.timeout,
+            stream=True,
+        )
+
+    def _download_sequence(
+        self, endpoint: str, validators: Optional[Dict] = None
+    ) -> Optional[SequencePayload]:
+        with self._request_sequence(endpoint, validators) as response:
+            if validators and response.status_code == 304:
+                return None
+            response.raise_for_status()
+            document = JSONFieldStream(
+                response.iter_content(self.CHUNK_SIZE), "content"
+            )
+            payload = Base64Reader(document.iter_field()).read()
+            document.consume()
+        return SequencePayload(
+            document.fields["name"],
+            payload,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified"),
         )
+
+    def _get_sequence_records(
+        self, endpoint: str, record_ids: List[str]
+    ) -> Dict[str, Tuple[str, SeqRecord]]:
+        params = dict(self.BULK_FIELD_PARAMETERS)
+        params[self.bulk_filter] = ",".join(record_ids)
+        response = self.session.get(endpoint, params=params, timeout=self.timeout)
         response.raise_for_status()
-        data = response.json()[0]
-        name = data["Sequence_file_GenBank"][0]["name"]
-        content = data["Sequence_file_GenBank"][0]["content"]
-        return (
-            name,
-            SeqIO.read(StringIO(base64.b64decode(content).decode("ascii")), "gb"),
+        requested = frozenset(record_ids)
+        records = {}
+        for data in response.json():
+            # The count may be an integer or a string depending on the
+            # installation.
+            record_id = str(data["count"])
+            if record_id in requested:
+                key = f"{endpoint}/{record_id}"
+                content = data["Sequence_file_GenBank"][0]
+                records[record_id] = self._store_sequence_record(
+                    key,
+                    content["name"],
+                    base64.b64decode(content["content"]),
+                    entry=self._disk_entry(key),
+                )
+        return records
+
+    def _store_sequence_record(
+        self,
+        key: str,
+        name: str,
+        payload: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None,
+        entry: Optional[CachedRecord] = None,
+    ) -> Tuple[str, SeqRecord]:
+        if self.disk_cache is None:
+            return name, parse_genbank(payload)
+        if entry is not None and entry.digest == self.disk_cache.hash(payload):
+            # The content is unchanged so we can skip parsing it.
+            self.disk_cache.touch(key, etag=etag, last_modified=last_modified)
+            return name, entry.record
+        cached = self.disk_cache.put(
+            key, name, payload, etag=etag, last_modified=last_modified
         )
+        return name, cached.record
 
     def get_plasmid_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
         """
@@ -145,4 +359,85 @@ class LabCollectorClient(RepositoryClient):
             The plasmid name and sequence record if any.
 
         """
-        return self._get_sequence_record(self.plasmids_resource, plasmid_id)
+        plasmid_id = str(plasmid_id)
+        return self.record_cache.get(
+            plasmid_id,
+            partial(self._get_sequence_record, self.plasmids_resource, plasmid_id),
+        )
+
+    def get_plasmid_records(
+        self, plasmid_ids: Iterable[str], max_workers: Optional[int] = None
+    ) -> Tuple[Dict[str, Tuple[str, SeqRecord]], List[Dict]]:
+        """
+        Return the names and sequence records for many plasmids.
+
+        With a configured bulk filter, the records are requested in chunks.
+        Any records missing from those responses are retrieved one by one.
+
+        Parameters
+        ----------
+        plasmid_ids : iterable
+            The plasmid identifiers of interest.
+        max_workers : int, optional
+            The number of threads used (default the maximum concurrency).
+
+        Returns
+        -------
+        dict
+            A mapping from plasmid identifiers to their name and sequence
+            record for all successfully retrieved plasmids.
+        list
+            List of errors that are themselves dictionaries with the keys
+            'code', 'message', and 'id' for all failed plasmids.
+
+        """
+        if self.bulk_filter is None:
+            return super().get_plasmid_records(plasmid_ids, max_workers)
+        # Resources are addressed by string but results keep the given keys,
+        # like the records returned by the base class.
+        plasmid_ids = list(dict.fromkeys(plasmid_ids))
+        keys = list(dict.fromkeys(str(pid) for pid in plasmid_ids))
+        records = {}
+        for pid in keys:
+            cached = self.record_cache.peek(pid)
+            if cached is not None:
+                records[pid] = cached
+            else:
+                entry = self._disk_entry(f"{self.plasmids_resource}/{pid}")
+                if entry is not None and entry.fresh:
+                    records[pid] = entry.name, entry.record
+                    self.record_cache.put(pid, records[pid])
+        uncached = [pid for pid in keys if pid not in records]
+        chunks = [
+            uncached[i : i + self.bulk_size]
+            for i in range(0, len(uncached), self.bulk_size)
+        ]
+        semaphore = self._host_semaphore()
+
+        def fetch(chunk):
+            with semaphore:
+                return self._get_sequence_records(self.plasmids_resource, chunk)
+
+        if chunks:
+            if max_workers is None:
+                max_workers = self.max_concurrency
+            with ThreadPoolExecutor(
+                max_workers=min(max_workers, len(chunks))
+            ) as executor:
+                futures = [executor.submit(fetch, chunk) for chunk in chunks]
+                for future in futures:
+                    try:
+                        for pid, record in future.result().items():
+                            self.record_cache.put(pid, record)
+                            records[pid] = record
+                    except Exception:
+                        logger.debug("Bulk retrieval failed.", exc_info=True)
+        missing = [pid for pid in plasmid_ids if str(pid) not in records]
+        if missing:
+            logger.debug("Retrieving %d plasmids individually.", len(missing))
+        retrieved, errors = super().get_plasmid_records(missing, max_workers)
+        records.update((str(pid), record) for pid, record in retrieved.items())
+        return (
+            {pid: records[str(pid)] for pid in plasmid_ids if str(pid) in records},
+            errors,
+        )
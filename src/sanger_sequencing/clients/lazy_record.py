@@ -0,0 +1,206 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide sequence records that parse their features on first access."""
+
+
+import io
+import logging
+import re
+from typing import List, Optional, Tuple
+
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqFeature import SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+
+__all__ = ("LazySeqRecord", "parse_lazy_genbank")
+
+
+logger = logging.getLogger(__name__)
+
+
+FEATURES = re.compile(rb"^FEATURES", re.MULTILINE)
+# A feature key and its location, which may continue on following lines.
+LOCATION = re.compile(rb"^ {5}\S+ +(\S[^\n]*(?:\n {21}(?!/)[^\n]*)*)", re.MULTILINE)
+POSITION = re.compile(rb"\d+")
+ORIGIN = re.compile(rb"^ORIGIN", re.MULTILINE)
+CONTIG = re.compile(rb"^CONTIG", re.MULTILINE)
+END = re.compile(rb"^//", re.MULTILINE)
+NON_SEQUENCE = b"0123456789 \t\r\n"
+
+
+def _read(text: bytes) -> SeqRecord:
+    return SeqIO.read(
+        io.TextIOWrapper(io.BytesIO(text), encoding="utf-8", errors="replace"), "gb"
+    )
+
+
+class FeatureTable:
+    """Parse the raw feature table of a GenBank record when called."""
+
+    __slots__ = ("locus", "table")
+
+    def __init__(self, locus: bytes, table: bytes):
+        """
+        Keep the raw feature table.
+
+        Parameters
+        ----------
+        locus : bytes
+            The LOCUS line of the record.
+        table : bytes
+            The FEATURES section of the record.
+
+        """
+        self.locus = locus
+        self.table = table
+
+    def __call__(self) -> List[SeqFeature]:
+        """Parse and return the features."""
+        return _read(self.locus + self.table + b"ORIGIN\n//\n").features
+
+    def bounds(self) -> List[Tuple[int, int]]:
+        """
+        Return the outermost positions of all features without parsing them.
+
+        Locations referring to other records are skipped.
+
+        Returns
+        -------
+        list
+            Pairs of zero-based start and end positions like those of
+            ``Bio.SeqFeature.SeqFeature.location``.
+
+        """
+        result = []
+        for match in LOCATION.finditer(self.table):
+            location = match.group(1)
+            if b":" in location:
+                continue
+            positions = [int(number) for number in POSITION.findall(location)]
+            if positions:
+                result.append((min(positions) - 1, max(positions)))
+        return result
+
+
+class LazySeqRecord(SeqRecord):
+    """
+    Describe a sequence record whose features are parsed on first access.
+
+    The record behaves exactly like a ``Bio.SeqRecord.SeqRecord``. Only the
+    ``features`` attribute is populated from the raw feature table when it is
+    first read.
+
+    """
+
+    def __init__(self, *args, feature_table: Optional[FeatureTable] = None, **kwargs):
+        """
+        Initialize a sequence record.
+
+        Parameters
+        ----------
+        args
+            Positional arguments of ``Bio.SeqRecord.SeqRecord``.
+        feature_table : FeatureTable, optional
+            The source of the features that are parsed on first access.
+        kwargs
+            Keyword arguments of ``Bio.SeqRecord.SeqRecord``.
+
+        """
+        super().__init__(*args, **kwargs)
+        if feature_table is not None:
+            self._feature_table = feature_table
+
+    @property
+    def features_loaded(self) -> bool:
+        """Return whether the features have been parsed."""
+        return self._feature_table is None
+
+    @property
+    def features(self) -> List[SeqFeature]:
+        """Return the features and parse them if necessary."""
+        if self._feature_table is not None:
+            self._features = self._feature_table()
+            self._feature_table = None
+        return self._features
+
+    @features.setter
+    def features(self, value: List[SeqFeature]) -> None:
+        self._features = value
+        self._feature_table = None
+
+    def feature_bounds(self) -> List[Tuple[int, int]]:
+        """Return the start and end of all features without parsing them."""
+        if self._feature_table is not None:
+            return self._feature_table.bounds()
+        return [
+            (int(feature.location.start), int(feature.location.end))
+            for feature in self._features
+            if feature.location is not None
+        ]
+
+
+def parse_lazy_genbank(payload: bytes) -> SeqRecord:
+    """
+    Parse a single GenBank record but defer parsing its features.
+
+    The header is parsed by Biopython and the sequence is extracted directly.
+    Records without an ORIGIN section, for example, CONTIG records, are
+    parsed completely.
+
+    Parameters
+    ----------
+    payload : bytes
+        The content of a GenBank file with a single record.
+
+    Returns
+    -------
+    LazySeqRecord or Bio.SeqRecord.SeqRecord
+        The parsed sequence record.
+
+    """
+    origin = ORIGIN.search(payload)
+    if origin is None or CONTIG.search(payload) is not None:
+        return _read(payload)
+    end = END.search(payload, origin.end())
+    if end is None:
+        return _read(payload)
+    features = FEATURES.search(payload, 0, origin.start())
+    header_end = origin.start() if features is None else features.start()
+    header = _read(payload[:header_end] + b"ORIGIN\n//\n")
+    start = payload.find(b"\n", origin.end()) + 1
+    sequence = payload[start : end.start()].translate(None, NON_SEQUENCE).upper()
+    if len(sequence) != len(header.seq):
+        logger.debug("Sequence length differs from the LOCUS line; parsing fully.")
+        return _read(payload)
+    table = None
+    if features is not None:
+        block = payload[features.start() : origin.start()]
+        # Skip a FEATURES section that consists of its header line only.
+        if block.strip().count(b"\n") > 0:
+            locus = payload[: payload.find(b"\n") + 1]
+            table = FeatureTable(locus, block)
+    return LazySeqRecord(
+        Seq(sequence.decode("ascii")),
+        id=header.id,
+        name=header.name,
+        description=header.description,
+        dbxrefs=header.dbxrefs,
+        annotations=header.annotations,
+        feature_table=table,
+    )
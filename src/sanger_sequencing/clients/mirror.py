@@ -0,0 +1,373 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Mirror a LabCollector plasmid library into a local store."""
+
+
+import json
+import logging
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple, Union
+
+from Bio.SeqRecord import SeqRecord
+
+from .cache import RecordCache
+from .disk_cache import DiskRecordCache
+from .labcollector import LabCollectorClient
+from .repository_client import RepositoryClient
+from .streaming import parse_genbank
+
+
+__all__ = ("MirrorStore", "MirrorClient", "SyncReport", "sync_mirror")
+
+
+logger = logging.getLogger(__name__)
+
+
+class SyncReport(NamedTuple):
+    """Summarize the changes of a mirror synchronization."""
+
+    added: List[str]
+    updated: List[str]
+    unchanged: List[str]
+    removed: List[str]
+    errors: List[Dict]
+
+
+class MirrorStore:
+    """
+    Manage a local copy of GenBank files with a JSON index.
+
+    Files are named by the hash of their content and never modified. The
+    index, which maps plasmid identifiers to files, is replaced atomically.
+    Files that the index no longer references are kept until ``prune`` is
+    called, such that readers of a previous index can still access them.
+
+    """
+
+    INDEX = "index.json"
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Open or create a store in the given directory.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            The directory containing the store.
+
+        """
+        super().__init__()
+        self.directory = Path(directory)
+        self.plasmid_dir = self.directory / "plasmids"
+        self.plasmid_dir.mkdir(parents=True, exist_ok=True)
+        self.plasmids: Dict[str, Dict] = {}
+        self.primers: List[str] = []
+        self.synced: Optional[float] = None
+        self.load()
+
+    def load(self) -> None:
+        """Read the index from disk if it exists."""
+        path = self.directory / self.INDEX
+        if not path.is_file():
+            return
+        with path.open() as file:
+            index = json.load(file)
+        self.plasmids = index["plasmids"]
+        self.primers = index["primers"]
+        self.synced = index["synced"]
+
+    def save(self) -> None:
+        """Write the index to disk."""
+        index = {
+            "synced": self.synced,
+            "plasmids": self.plasmids,
+            "primers": self.primers,
+        }
+        handle, tmp = tempfile.mkstemp(dir=str(self.directory))
+        try:
+            with os.fdopen(handle, "w") as file:
+                json.dump(index, file, indent=1, sort_keys=True)
+            os.replace(tmp, str(self.directory / self.INDEX))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    def prune(self) -> List[str]:
+        """
+        Remove all files that the index no longer references.
+
+        Readers that still use a previous index may fail to find files
+        removed here. Call this only when no such readers remain, for
+        example, between scheduled synchronizations.
+
+        Returns
+        -------
+        list
+            The names of the removed files.
+
+        """
+        referenced = {entry["file"] for entry in self.plasmids.values()}
+        removed = []
+        for path in self.plasmid_dir.glob("*.gb"):
+            if path.name not in referenced:
+                try:
+                    path.unlink()
+                except FileNotFoundError:
+                    continue
+                removed.append(path.name)
+        return removed
+
+    def path(self, plasmid_id: str) -> Path:
+        """Return the path of the GenBank file of a plasmid."""
+        return self.plasmid_dir / self.plasmids[plasmid_id]["file"]
+
+    def write(self, plasmid_id: str, name: str, payload: bytes, **kwargs) -> str:
+        """
+        Store the GenBank file of a plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier.
+        name : str
+            The original file name.
+        payload : bytes
+            The content of the GenBank file.
+        kwargs : optional
+            Further metadata stored in the index, for example, validators.
+
+        Returns
+        -------
+        str
+            The content hash.
+
+        """
+        digest = DiskRecordCache.hash(payload)
+        path = self.plasmid_dir / f"{digest}.gb"
+        if not path.is_file():
+            handle, tmp = tempfile.mkstemp(dir=str(self.plasmid_dir))
+            with os.fdopen(handle, "wb") as file:
+                file.write(payload)
+            os.replace(tmp, str(path))
+        self.plasmids[plasmid_id] = dict(
+            kwargs, name=name, file=path.name, digest=digest, synced=time.time()
+        )
+        return digest
+
+
+def sync_mirror(
+    client: LabCollectorClient,
+    directory: Union[str, Path],
+    modified_field: Optional[str] = None,
+    revalidate: bool = False,
+    max_workers: Optional[int] = None,
+) -> SyncReport:
+    """
+    Synchronize a local mirror with the plasmid library of a LabCollector.
+
+    New plasmids are always downloaded and deleted ones removed. Plasmids
+    already in the mirror are downloaded again only if the value of the
+    modification field has changed or, with revalidation, if a conditional
+    request reports a change.
+
+    Parameters
+    ----------
+    client : LabCollectorClient
+        The client used for all requests.
+    directory : str or pathlib.Path
+        The directory of the mirror.
+    modified_field : str, optional
+        A LabCollector field that changes with every modification of a
+        plasmid, for example, a modification date.
+    revalidate : bool, optional
+        Whether to check all known plasmids for changes with conditional
+        requests.
+    max_workers : int, optional
+        The number of concurrent downloads (default the client's maximum
+        concurrency).
+
+    Returns
+    -------
+    SyncReport
+        The identifiers of added, updated, unchanged, and removed plasmids
+        as well as errors for failed downloads.
+
+    """
+    store = MirrorStore(directory)
+    if modified_field is None:
+        remote = dict.fromkeys(map(str, client.get_plasmid_ids()))
+    else:
+        remote = client.get_plasmid_versions(modified_field)
+    removed = sorted(set(store.plasmids) - set(remote))
+    for plasmid_id in removed:
+        del store.plasmids[plasmid_id]
+    pending = []
+    unchanged = []
+    for plasmid_id, version in remote.items():
+        entry = store.plasmids.get(plasmid_id)
+        if entry is None or (version is not None and entry["modified"] != version):
+            pending.append((plasmid_id, None))
+        elif revalidate:
+            pending.append((plasmid_id, entry))
+        else:
+            unchanged.append(plasmid_id)
+    logger.info(
+        "Synchronizing %d of %d plasmids into '%s'.",
+        len(pending),
+        len(remote),
+        store.directory,
+    )
+    added = []
+    updated = []
+    errors = []
+    semaphore = client._host_semaphore()
+
+    def download(plasmid_id, entry):
+        validators = None
+        if entry is not None:
+            validators = {
+                key: value
+                for key, value in (
+                    ("If-None-Match", entry["etag"]),
+                    ("If-Modified-Since", entry["last_modified"]),
+                )
+                if value
+            }
+        with semaphore:
+            return client.download_plasmid(plasmid_id, validators)
+
+    if max_workers is None:
+        max_workers = client.max_concurrency
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+            futures = [executor.submit(download, *args) for args in pending]
+            for (plasmid_id, entry), future in zip(pending, futures):
+                try:
+                    result = future.result()
+                except Exception as error:
+                    logger.debug("Failed to download '%s'.", plasmid_id, exc_info=True)
+                    errors.append(
+                        {
+                            "code": "retrieval-error",
+                            "message": f"Failed to retrieve the record for plasmid "
+                            f"'{plasmid_id}': {error}",
+                            "id": plasmid_id,
+                        }
+                    )
+                    continue
+                if result is None:
+                    entry["synced"] = time.time()
+                    unchanged.append(plasmid_id)
+                    continue
+                previous = store.plasmids.get(plasmid_id)
+                digest = store.write(
+                    plasmid_id,
+                    result.name,
+                    result.payload,
+                    etag=result.etag,
+                    last_modified=result.last_modified,
+                    modified=remote[plasmid_id],
+                )
+                if previous is None:
+                    added.append(plasmid_id)
+                elif previous["digest"] == digest:
+                    unchanged.append(plasmid_id)
+                else:
+                    updated.append(plasmid_id)
+        store.primers = sorted(map(str, client.get_primer_ids()))
+        store.synced = time.time()
+    finally:
+        # Keep the progress of an interrupted synchronization.
+        store.save()
+    return SyncReport(added, updated, unchanged, removed, errors)
+
+
+class MirrorClient(RepositoryClient):
+    """Serve plasmid records from a local mirror without network requests."""
+
+    def __init__(
+        self, directory: Union[str, Path], cache_size: int = 10_000, lazy: bool = True
+    ):
+        """
+        Initialize a client for a local mirror.
+
+        Parameters
+        ----------
+        directory : str or pathlib.Path
+            The directory of a mirror created by ``sync_mirror``.
+        cache_size : int, optional
+            The maximal number of parsed records kept in memory.
+        lazy : bool, optional
+            Whether to parse the features of records only when they are
+            accessed.
+
+        """
+        super().__init__()
+        self.lazy = lazy
+        self.store = MirrorStore(directory)
+        self.record_cache = RecordCache(maxsize=cache_size)
+
+    def refresh(self) -> None:
+        """Read the index again, for example, after a synchronization."""
+        self.store.load()
+        self.record_cache.clear()
+
+    def get_plasmid_ids(self) -> FrozenSet:
+        """Return a frozenset of all mirrored plasmid identifiers."""
+        return frozenset(self.store.plasmids)
+
+    def get_primer_ids(self) -> FrozenSet:
+        """Return a frozenset of all mirrored primer identifiers."""
+        return frozenset(self.store.primers)
+
+    def _read_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        if plasmid_id not in self.store.plasmids:
+            raise KeyError(f"The plasmid '{plasmid_id}' is not mirrored.")
+        try:
+            payload = self.store.path(plasmid_id).read_bytes()
+        except FileNotFoundError:
+            # The file was pruned after a synchronization replaced it.
+            logger.debug("Reloading the mirror index for '%s'.", plasmid_id)
+            self.store.load()
+            if plasmid_id not in self.store.plasmids:
+                raise KeyError(f"The plasmid '{plasmid_id}' is not mirrored.")
+            payload = self.store.path(plasmid_id).read_bytes()
+        name = self.store.plasmids[plasmid_id]["name"]
+        return name, parse_genbank(payload, lazy=self.lazy)
+
+    def get_plasmid_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        """
+        Return the name and sequence record for a specific plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier of interest.
+
+        Returns
+        -------
+        (str, Bio.SeqRecord.SeqRecord)
+            The plasmid name and sequence record if any.
+
+        """
+        plasmid_id = str(plasmid_id)
+        return self.record_cache.get(plasmid_id, partial(self._read_record, plasmid_id))
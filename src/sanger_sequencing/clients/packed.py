@@ -0,0 +1,506 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Store plasmid libraries as 2-bit packed sequences in memory maps."""
+
+
+import logging
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from .lazy_record import FeatureTable, LazySeqRecord
+from .repository_client import RepositoryClient
+
+
+__all__ = ("PackedEntry", "PackedPlasmidStore", "PackedStoreClient")
+
+
+logger = logging.getLogger(__name__)
+
+
+# Map A, C, G, and T to two bits each. Every other symbol is an exception.
+BASES = b"ACGT"
+ENCODE = np.full(256, 255, dtype=np.uint8)
+ENCODE[np.frombuffer(BASES, dtype=np.uint8)] = np.arange(4, dtype=np.uint8)
+# Each byte decodes to four bases with the first one in the highest bits.
+DECODE = np.frombuffer(BASES, dtype=np.uint8)[
+    (np.arange(256, dtype=np.uint8)[:, None] >> np.array([6, 4, 2, 0])) & 3
+]
+EXCEPTION = np.dtype([("start", "<u4"), ("length", "<u4"), ("base", "u1")])
+LOCUS = re.compile(rb"^LOCUS.*\n", re.MULTILINE)
+FEATURES = re.compile(rb"^FEATURES.*?(?=^ORIGIN|^CONTIG|^//)", re.MULTILINE | re.DOTALL)
+
+
+class PackedEntry(NamedTuple):
+    """Describe the location of one plasmid in a packed store."""
+
+    id: str
+    length: int
+    offset: int
+    exception_start: int
+    exception_count: int
+    feature_offset: int
+    feature_length: int
+    topology: str
+    name: str
+    description: str
+
+
+def _pack(sequence: bytes) -> Tuple[bytes, np.ndarray]:
+    """Pack a sequence into two bits per base and list the exceptions."""
+    codes = np.frombuffer(sequence.upper(), dtype=np.uint8)
+    packed = ENCODE[codes]
+    invalid = packed == 255
+    packed[invalid] = 0
+    padding = -len(packed) % 4
+    quads = np.concatenate([packed, np.zeros(padding, dtype=np.uint8)]).reshape(-1, 4)
+    data = (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+    # Collapse consecutive identical exceptions, such as runs of N, into one.
+    positions = np.flatnonzero(invalid)
+    exceptions = np.empty(0, dtype=EXCEPTION)
+    if len(positions) > 0:
+        breaks = (np.diff(positions) != 1) | (
+            codes[positions[1:]] != codes[positions[:-1]]
+        )
+        starts = positions[np.concatenate([[True], breaks])]
+        ends = positions[np.concatenate([breaks, [True]])] + 1
+        exceptions = np.empty(len(starts), dtype=EXCEPTION)
+        exceptions["start"] = starts
+        exceptions["length"] = ends - starts
+        exceptions["base"] = codes[starts]
+    return data.astype(np.uint8).tobytes(), exceptions
+
+
+def _feature_table(record: SeqRecord) -> bytes:
+    """Return the LOCUS line and the FEATURES section of a record."""
+    if not record.features:
+        return b""
+    record = SeqRecord(
+        record.seq,
+        id=record.id,
+        name=record.name,
+        features=record.features,
+        annotations={"molecule_type": record.annotations.get("molecule_type", "DNA")},
+    )
+    text = record.format("gb").encode("utf-8")
+    return LOCUS.search(text).group() + FEATURES.search(text).group()
+
+
+def _clean(text: str) -> str:
+    """Replace the separators of the index in free text."""
+    return " ".join(str(text).split())
+
+
+def _check_id(identifier: str) -> str:
+    """Reject identifiers that cannot be stored in the index unchanged."""
+    identifier = str(identifier)
+    if any(char in identifier for char in "\t\n\r"):
+        raise ValueError(f"The identifier {identifier!r} contains a tab or line break.")
+    return identifier
+
+
+class PackedPlasmidStore:
+    """
+    Serve plasmid sequences from 2-bit packed, memory-mapped files.
+
+    Every write creates a new generation directory containing four files:
+
+    - ``sequences.2bit`` with four bases per byte,
+    - ``exceptions.bin`` with runs of N or other IUPAC symbols,
+    - ``features.gb`` with the raw GenBank feature table of each plasmid,
+    - ``plasmids.fai``, a tab-separated index of offsets into the others.
+
+    Generations are never modified. The file ``CURRENT`` names the latest
+    complete generation and is replaced atomically, such that readers always
+    open matching files while a new generation is being written. Superseded
+    generations are kept until ``prune`` is called.
+
+    The data files are mapped read-only, such that worker processes share a
+    single copy in the page cache and only decode the plasmids they access.
+    Features are parsed when they are first accessed. Sequences are stored
+    in upper case and only the topology and molecule type annotations are
+    kept.
+
+    """
+
+    CURRENT = "CURRENT"
+    INDEX = "plasmids.fai"
+    SEQUENCES = "sequences.2bit"
+    EXCEPTIONS = "exceptions.bin"
+    FEATURES = "features.gb"
+    PRIMERS = "primers.txt"
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Open a packed store.
+
+        Parameters
+        ----------
+        directory : PathLike
+            The directory written by ``PackedPlasmidStore.write``.
+
+        """
+        self.directory = Path(directory)
+        generation = (self.directory / self.CURRENT).read_text(encoding="utf-8")
+        self.generation = self.directory / generation.strip()
+        self.entries: Dict[str, PackedEntry] = {}
+        with (self.generation / self.INDEX).open(encoding="utf-8") as file:
+            for line in file:
+                fields = line.rstrip("\n").split("\t")
+                entry = PackedEntry(fields[0], *map(int, fields[1:7]), *fields[7:10])
+                self.entries[entry.id] = entry
+        self.primers: List[str] = (
+            (self.generation / self.PRIMERS).read_text(encoding="utf-8").splitlines()
+        )
+        self._sequences = self._map(self.SEQUENCES)
+        self._exceptions = np.frombuffer(self._map(self.EXCEPTIONS), dtype=EXCEPTION)
+        self._features = self._map(self.FEATURES)
+
+    def _map(self, filename: str) -> Union[mmap.mmap, bytes]:
+        """Map a data file read-only."""
+        with (self.generation / filename).open("rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return b""
+            return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    @classmethod
+    def write(
+        cls,
+        directory: Union[str, Path],
+        records: Iterable[Tuple[str, str, SeqRecord]],
+        primer_ids: Iterable[str] = (),
+    ) -> "PackedPlasmidStore":
+        """
+        Pack plasmid records into a new generation of a store.
+
+        Concurrent writers each create their own generation and the last
+        one to finish becomes current.
+
+        Parameters
+        ----------
+        directory : PathLike
+            The directory of the store, which is created if necessary.
+        records : iterable
+            Triples of plasmid identifier, name, and sequence record.
+        primer_ids : iterable, optional
+            The primer identifiers of the library.
+
+        Returns
+        -------
+        PackedPlasmidStore
+            The opened store.
+
+        Raises
+        ------
+        ValueError
+            If an identifier contains a tab or a line break.
+
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        generation = Path(tempfile.mkdtemp(prefix="generation-", dir=str(directory)))
+        try:
+            cls._write_generation(generation, records, primer_ids)
+            handle, tmp = tempfile.mkstemp(dir=str(directory))
+            with os.fdopen(handle, "w", encoding="utf-8") as file:
+                file.write(generation.name)
+            os.replace(tmp, str(directory / cls.CURRENT))
+        except BaseException:
+            shutil.rmtree(str(generation), ignore_errors=True)
+            raise
+        return cls(directory)
+
+    @classmethod
+    def _write_generation(
+        cls,
+        generation: Path,
+        records: Iterable[Tuple[str, str, SeqRecord]],
+        primer_ids: Iterable[str],
+    ) -> None:
+        """Write all files of a new generation."""
+        files = {
+            name: (generation / name).open("wb")
+            for name in (cls.SEQUENCES, cls.EXCEPTIONS, cls.FEATURES, cls.INDEX)
+        }
+        try:
+            num_exceptions = 0
+            for plasmid_id, name, record in records:
+                data, exceptions = _pack(bytes(record.seq))
+                table = _feature_table(record)
+                entry = PackedEntry(
+                    _check_id(plasmid_id),
+                    len(record),
+                    files[cls.SEQUENCES].tell(),
+                    num_exceptions,
+                    len(exceptions),
+                    files[cls.FEATURES].tell(),
+                    len(table),
+                    record.annotations.get("topology", "linear"),
+                    _clean(name),
+                    _clean(record.description),
+                )
+                files[cls.SEQUENCES].write(data)
+                files[cls.EXCEPTIONS].write(exceptions.tobytes())
+                files[cls.FEATURES].write(table)
+                files[cls.INDEX].write(
+                    "\t".join(map(str, entry)).encode("utf-8") + b"\n"
+                )
+                num_exceptions += len(exceptions)
+        finally:
+            for file in files.values():
+                file.close()
+        (generation / cls.PRIMERS).write_text(
+            "\n".join(sorted(_check_id(primer) for primer in primer_ids)),
+            encoding="utf-8",
+        )
+
+    @classmethod
+    def prune(cls, directory: Union[str, Path]) -> List[str]:
+        """
+        Remove all generations of a store except the current one.
+
+        Readers that opened a previous generation keep their memory maps on
+        POSIX systems. Do not call this while a new generation is written.
+
+        Parameters
+        ----------
+        directory : PathLike
+            The directory of the store.
+
+        Returns
+        -------
+        list
+            The names of the removed generations.
+
+        """
+        directory = Path(directory)
+        current = (directory / cls.CURRENT).read_text(encoding="utf-8").strip()
+        removed = []
+        for path in directory.glob("generation-*"):
+            if path.name == current or not path.is_dir():
+                continue
+            try:
+                shutil.rmtree(str(path))
+            except OSError as error:
+                logger.warning("Could not remove '%s': %s", path, error)
+                continue
+            removed.append(path.name)
+        return removed
+
+    @classmethod
+    def from_client(
+        cls,
+        directory: Union[str, Path],
+        client: RepositoryClient,
+        plasmid_ids: Optional[Iterable[str]] = None,
+    ) -> Tuple["PackedPlasmidStore", List[Dict]]:
+        """
+        Pack the plasmids of a repository into a new store.
+
+        Parameters
+        ----------
+        directory : PathLike
+            The directory in which to create the store.
+        client : RepositoryClient
+            The repository from which plasmids are retrieved concurrently.
+        plasmid_ids : iterable, optional
+            The plasmids to pack (default all plasmids of the repository).
+
+        Returns
+        -------
+        PackedPlasmidStore
+            The opened store.
+        list
+            List of errors for all plasmids that could not be retrieved.
+
+        """
+        if plasmid_ids is None:
+            plasmid_ids = sorted(client.get_plasmid_ids())
+        records, errors = client.get_plasmid_records(plasmid_ids)
+        store = cls.write(
+            directory,
+            ((key, name, record) for key, (name, record) in records.items()),
+            client.get_primer_ids(),
+        )
+        return store, errors
+
+    def __len__(self) -> int:
+        """Return the number of plasmids."""
+        return len(self.entries)
+
+    def __contains__(self, plasmid_id: str) -> bool:
+        """Return whether the store contains the plasmid."""
+        return plasmid_id in self.entries
+
+    def sequence(
+        self, plasmid_id: str, start: int = 0, stop: Optional[int] = None
+    ) -> str:
+        """
+        Decode the sequence of a plasmid or a region of it.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier.
+        start : int, optional
+            The first position to decode (default 0).
+        stop : int, optional
+            The position after the last one to decode (default the end).
+
+        Returns
+        -------
+        str
+            The nucleotide sequence.
+
+        """
+        entry = self.entries[plasmid_id]
+        start, stop, _ = slice(start, stop).indices(entry.length)
+        if stop <= start:
+            return ""
+        first = entry.offset + start // 4
+        last = entry.offset + (stop + 3) // 4
+        packed = np.frombuffer(
+            self._sequences, dtype=np.uint8, count=last - first, offset=first
+        )
+        skip = start % 4
+        bases = DECODE[packed].ravel()[skip : skip + stop - start]
+        exceptions = self._exceptions[
+            entry.exception_start : entry.exception_start + entry.exception_count
+        ]
+        if len(exceptions) > 0:
+            bases = bases.copy()
+            ends = exceptions["start"].astype(np.int64) + exceptions["length"]
+            overlap = (exceptions["start"] < stop) & (ends > start)
+            for begin, end, base in zip(
+                exceptions["start"][overlap], ends[overlap], exceptions["base"][overlap]
+            ):
+                bases[max(begin, start) - start : min(end, stop) - start] = base
+        return bases.tobytes().decode("ascii")
+
+    def record(self, plasmid_id: str) -> SeqRecord:
+        """
+        Return the sequence record of a plasmid with lazily parsed features.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier.
+
+        Returns
+        -------
+        LazySeqRecord
+            The sequence record.
+
+        """
+        entry = self.entries[plasmid_id]
+        table = None
+        if entry.feature_length > 0:
+            raw = self._features[
+                entry.feature_offset : entry.feature_offset + entry.feature_length
+            ]
+            newline = raw.index(b"\n") + 1
+            table = FeatureTable(raw[:newline], raw[newline:])
+        return LazySeqRecord(
+            Seq(self.sequence(plasmid_id)),
+            id=entry.id,
+            name=entry.name,
+            description=entry.description,
+            annotations={"molecule_type": "DNA", "topology": entry.topology},
+            feature_table=table,
+        )
+
+    def close(self) -> None:
+        """Release the memory maps."""
+        self._exceptions = np.empty(0, dtype=EXCEPTION)
+        for data in (self._sequences, self._features):
+            if isinstance(data, mmap.mmap):
+                try:
+                    data.close()
+                except BufferError:
+                    logger.debug("Keeping a map of '%s' open.", self.generation)
+
+
+class PackedStoreClient(RepositoryClient):
+    """
+    Serve plasmid records from a packed store without network requests.
+
+    Records are decoded on every request instead of being cached, since a
+    10 kb plasmid decodes in microseconds and the packed data is shared by
+    all processes using the store.
+
+    """
+
+    def __init__(self, directory: Union[str, Path]):
+        """
+        Initialize a client for a packed store.
+
+        Parameters
+        ----------
+        directory : PathLike
+            The directory written by ``PackedPlasmidStore.write``.
+
+        """
+        super().__init__()
+        self.store = PackedPlasmidStore(directory)
+
+    def get_plasmid_ids(self) -> FrozenSet:
+        """Return a frozenset of all stored plasmid identifiers."""
+        return frozenset(self.store.entries)
+
+    def get_primer_ids(self) -> FrozenSet:
+        """Return a frozenset of all stored primer identifiers."""
+        return frozenset(self.store.primers)
+
+    def get_plasmid_record(self, plasmid_id: str) -> Tuple[str, SeqRecord]:
+        """
+        Return the name and sequence record for a specific plasmid.
+
+        Parameters
+        ----------
+        plasmid_id : str
+            The plasmid identifier of interest.
+
+        Returns
+        -------
+        (str, Bio.SeqRecord.SeqRecord)
+            The plasmid name and sequence record.
+
+        """
+        plasmid_id = str(plasmid_id)
+        if plasmid_id not in self.store:
+            raise KeyError(f"The plasmid '{plasmid_id}' is not in the store.")
+        return self.store.entries[plasmid_id].name, self.store.record(plasmid_id)
+
+    def close(self) -> None:
+        """Release the memory maps of the store."""
+        self.store.close()
+
+    def __enter__(self) -> "PackedStoreClient":
+        """Use the client as a context manager that releases its maps."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Release the memory maps of the store."""
+        self.close()
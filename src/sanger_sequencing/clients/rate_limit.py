@@ -0,0 +1,152 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Adapt the number of concurrent requests to the rate limits of an API."""
+
+
+import logging
+import threading
+import time
+from typing import Callable, Optional
+
+
+__all__ = ("AdaptiveLimiter",)
+
+
+logger = logging.getLogger(__name__)
+
+
+class AdaptiveLimiter:
+    """
+    Limit concurrent requests with additive increase, multiplicative decrease.
+
+    Every successful request raises the limit such that it grows by about one
+    per round of requests. A throttled request halves the limit and pauses all
+    requests until the rate limit resets. The limiter is used as a context
+    manager around each request.
+
+    """
+
+    def __init__(
+        self,
+        initial: int = 4,
+        minimum: int = 1,
+        maximum: int = 16,
+        threshold: float = 0.1,
+        timer: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Initialize the limiter.
+
+        Parameters
+        ----------
+        initial : int, optional
+            The initial number of concurrent requests.
+        minimum : int, optional
+            The lower bound of concurrent requests.
+        maximum : int, optional
+            The upper bound of concurrent requests.
+        threshold : float, optional
+            The fraction of remaining requests in the current rate limit
+            window below which the limit is reduced before the server starts
+            throttling.
+        timer : callable, optional
+            A function returning the current time in seconds.
+
+        """
+        super().__init__()
+        self.minimum = int(minimum)
+        self.maximum = int(maximum)
+        self.threshold = threshold
+        self.limit = float(min(max(initial, self.minimum), self.maximum))
+        self.active = 0
+        self.throttled = 0
+        self._paused_until = 0.0
+        self._timer = timer
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        """Wait until another request may be made."""
+        with self._condition:
+            while True:
+                delay = self._paused_until - self._timer()
+                if delay > 0:
+                    self._condition.wait(delay)
+                elif self.active >= int(self.limit):
+                    self._condition.wait()
+                else:
+                    break
+            self.active += 1
+
+    def release(self) -> None:
+        """Mark a request as finished."""
+        with self._condition:
+            self.active -= 1
+            self._condition.notify_all()
+
+    def __enter__(self):
+        """Acquire a slot for a request."""
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        """Release the slot of a request."""
+        self.release()
+
+    def on_success(
+        self, remaining: Optional[int] = None, total: Optional[int] = None
+    ) -> None:
+        """
+        Adapt the limit after a successful request.
+
+        Parameters
+        ----------
+        remaining : int, optional
+            The number of requests remaining in the current rate limit window.
+        total : int, optional
+            The number of requests allowed per rate limit window.
+
+        """
+        with self._condition:
+            if remaining is not None and total and remaining < self.threshold * total:
+                self.limit = max(self.minimum, self.limit * 0.75)
+            else:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def on_throttle(self, delay: float) -> None:
+        """
+        Adapt the limit after a request was rejected due to rate limiting.
+
+        Parameters
+        ----------
+        delay : float
+            The time in seconds until the rate limit resets.
+
+        """
+        with self._condition:
+            self.throttled += 1
+            now = self._timer()
+            # Requests that were in flight when the first one was throttled
+            # do not reduce the limit again.
+            if now >= self._paused_until:
+                self.limit = max(self.minimum, self.limit / 2)
+            self._paused_until = max(self._paused_until, now + delay)
+            logger.debug(
+                "Rate limited; pausing for %.2f s with a limit of %d.",
+                delay,
+                int(self.limit),
+            )
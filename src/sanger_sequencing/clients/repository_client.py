@@ -17,14 +17,41 @@
 """Define an abstract base class defining the interface for clients."""
 
 
+import logging
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from threading import BoundedSemaphore, Lock
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from Bio.SeqRecord import SeqRecord
 
 
 __all__ = ("RepositoryClient",)
 
 
+logger = logging.getLogger(__name__)
+
+
 class RepositoryClient(ABC):
-    """Provide a pythonic abstract base interface."""
+    """
+    Provide a pythonic abstract base interface.
+
+    Attributes
+    ----------
+    host : str or None
+        The host serving the repository. Concurrent requests of all clients
+        for the same host and with the same maximum concurrency share one
+        limit.
+    max_concurrency : int
+        The maximum number of concurrent requests per host. Clients of one
+        host with different limits each keep their own limit.
+
+    """
+
+    host: Optional[str] = None
+    max_concurrency: int = 8
+    _host_semaphores = {}
+    _host_lock = Lock()
 
     @abstractmethod
     def get_plasmid_ids(self):
@@ -40,3 +67,80 @@ class RepositoryClient(ABC):
     def get_primer_ids(self):
         """Return a frozenset of all accessible primer identifiers."""
         raise NotImplementedError("Override this method in the child class.")
+
+    def _host_semaphore(self) -> BoundedSemaphore:
+        """Return the semaphore limiting concurrent requests to the host."""
+        with self._host_lock:
+            if self.host is None:
+                # Without a known host, limit the requests of this client only.
+                if "_semaphore" not in self.__dict__:
+                    self._semaphore = BoundedSemaphore(self.max_concurrency)
+                return self._semaphore
+            key = self.host, self.max_concurrency
+            if key not in self._host_semaphores:
+                if any(host == self.host for host, _ in self._host_semaphores):
+                    logger.warning(
+                        "Clients for host '%s' use different maximum concurrency "
+                        "and do not share a request limit.",
+                        self.host,
+                    )
+                self._host_semaphores[key] = BoundedSemaphore(self.max_concurrency)
+            return self._host_semaphores[key]
+
+    def get_plasmid_records(
+        self, plasmid_ids: Iterable[str], max_workers: Optional[int] = None
+    ) -> Tuple[Dict[str, Tuple[str, SeqRecord]], List[Dict]]:
+        """
+        Return the names and sequence records for many plasmids.
+
+        The records are retrieved concurrently by a bounded thread pool. A
+        failure to retrieve a single record does not affect the others.
+
+        Parameters
+        ----------
+        plasmid_ids : iterable
+            The plasmid identifiers of interest.
+        max_workers : int, optional
+            The number of threads used (default the maximum concurrency).
+
+        Returns
+        -------
+        dict
+            A mapping from plasmid identifiers to their name and sequence
+            record for all successfully retrieved plasmids.
+        list
+            List of errors that are themselves dictionaries with the keys
+            'code', 'message', and 'id' for all failed plasmids.
+
+        """
+        plasmid_ids = list(dict.fromkeys(plasmid_ids))
+        records = {}
+        errors = []
+        if not plasmid_ids:
+            return records, errors
+        semaphore = self._host_semaphore()
+
+        def fetch(plasmid_id):
+            with semaphore:
+                return self.get_plasmid_record(plasmid_id)
+
+        if max_workers is None:
+            max_workers = self.max_concurrency
+        with ThreadPoolExecutor(
+            max_workers=min(max_workers, len(plasmid_ids))
+        ) as executor:
+            futures = [executor.submit(fetch, pid) for pid in plasmid_ids]
+            for plasmid_id, future in zip(plasmid_ids, futures):
+                try:
+                    records[plasmid_id] = future.result()
+                except Exception as error:
+                    logger.debug("Failed to retrieve '%s'.", plasmid_id, exc_info=True)
+                    errors.append(
+                        {
+                            "code": "retrieval-error",
+                            "message": f"Failed to retrieve the record for plasmid "
+                            f"'{plasmid_id}': {error}",
+                            "id": plasmid_id,
+                        }
+                    )
+        return records, errors
@@ -0,0 +1,89 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide pooled HTTP sessions for the repository clients."""
+
+
+from typing import Collection
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+__all__ = ("create_session",)
+
+
+RETRY_STATUS = (429, 500, 502, 503, 504)
+
+
+def create_session(
+    pool_size: int = 10,
+    max_retries: int = 3,
+    backoff_factor: float = 0.5,
+    status_forcelist: Collection[int] = RETRY_STATUS,
+    respect_retry_after: bool = True,
+) -> requests.Session:
+    """
+    Create an HTTP session with a connection pool and automatic retries.
+
+    Connections are kept alive and re-used for all requests to the same host.
+    Failed requests are retried with an exponential backoff and any
+    ``Retry-After`` header sent by the server is respected.
+
+    Parameters
+    ----------
+    pool_size : int, optional
+        The maximum number of connections kept open per host. This should be
+        at least as large as the number of threads using the session.
+    max_retries : int, optional
+        The maximum number of retries per request.
+    backoff_factor : float, optional
+        The backoff factor in seconds. Retries wait for
+        ``backoff_factor * 2 ** (retry - 1)`` seconds.
+    status_forcelist : collection, optional
+        The HTTP status codes that cause a retry (default rate limiting and
+        server errors).
+    respect_retry_after : bool, optional
+        Whether responses with a ``Retry-After`` header are retried after the
+        requested time. Disable this in order to handle rate limiting in the
+        client itself.
+
+    Returns
+    -------
+    requests.Session
+        A session with mounted HTTP and HTTPS adapters.
+
+    """
+    retry = Retry(
+        total=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=frozenset(status_forcelist),
+        respect_retry_after_header=respect_retry_after,
+        # Return the last response such that `raise_for_status` reports the
+        # actual error.
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry
+    )
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(
+        {"Accept-Encoding": "gzip, deflate", "Connection": "keep-alive"}
+    )
+    return session
@@ -0,0 +1,285 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Decode sequence records from streamed API responses."""
+
+
+import binascii
+import io
+import json
+import re
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+from Bio import SeqIO
+from Bio.SeqRecord import SeqRecord
+
+from .lazy_record import parse_lazy_genbank
+
+
+__all__ = ("JSONFieldStream", "Base64Reader", "parse_genbank", "read_genbank")
+
+
+ESCAPES = {
+    ord('"'): b'"',
+    ord("\\"): b"\\",
+    ord("/"): b"/",
+    ord("b"): b"\b",
+    ord("f"): b"\f",
+    ord("n"): b"\n",
+    ord("r"): b"\r",
+    ord("t"): b"\t",
+}
+ESCAPE = re.compile(rb"\\(u[0-9a-fA-F]{4}|.)", re.DOTALL)
+PARTIAL_UNICODE = re.compile(rb"\\u[0-9a-fA-F]{0,3}\Z")
+BACKSLASH = ord("\\")
+WHITESPACE = b" \t\n\r"
+
+
+class JSONFieldStream:
+    """
+    Extract a large string field from a streamed JSON document.
+
+    The document is scanned chunk by chunk. The value of the first
+    occurrence of the streamed field is yielded in unescaped pieces rather
+    than accumulated, while other string values are kept if they belong to
+    one of the captured fields. The scanner does not validate the document.
+
+    """
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        field: str,
+        capture: Iterable[str] = ("name",),
+    ):
+        """
+        Prepare scanning a JSON document.
+
+        Parameters
+        ----------
+        chunks : iterable of bytes
+            The document in consecutive pieces, for example, from
+            ``requests.Response.iter_content``.
+        field : str
+            The key whose string value is streamed.
+        capture : iterable of str, optional
+            Keys whose first string values are collected in ``fields``.
+
+        """
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._field = field.encode("utf-8")
+        self._capture = frozenset(key.encode("utf-8") for key in capture)
+        self._scanner = self._scan()
+        self.fields: Dict[str, str] = {}
+
+    def iter_field(self) -> Iterator[bytes]:
+        """Yield the unescaped value of the streamed field in pieces."""
+        for piece in self._scanner:
+            if piece is None:
+                return
+            yield piece
+
+    def consume(self) -> None:
+        """Scan the remainder of the document to collect all fields."""
+        for _ in self._scanner:
+            pass
+
+    def _scan(self) -> Iterator[Optional[bytes]]:
+        # Pieces of the streamed value are yielded; ``None`` marks its end.
+        in_string = False
+        streaming = False
+        is_value = False
+        streamed = False
+        last = b""
+        key = b""
+        raw = []
+        pending = b""
+        for chunk in self._chunks:
+            data = pending + chunk if pending else chunk
+            pending = b""
+            pos = 0
+            end = len(data)
+            while pos < end:
+                if not in_string:
+                    index = data.find(b'"', pos)
+                    segment = data[pos : end if index < 0 else index].strip(WHITESPACE)
+                    if segment:
+                        last = segment[-1:]
+                    if index < 0:
+                        break
+                    in_string = True
+                    is_value = last == b":"
+                    streaming = is_value and not streamed and key == self._field
+                    raw = []
+                    pos = index + 1
+                    continue
+                # Find the closing quote that is not itself escaped.
+                index = data.find(b'"', pos)
+                while index >= 0 and _trailing_backslashes(data, pos, index) % 2:
+                    index = data.find(b'"', index + 1)
+                if index < 0:
+                    stop = end - _incomplete_escape(data, pos, end)
+                    pending = data[stop:]
+                else:
+                    stop = index
+                if stop > pos:
+                    if streaming:
+                        yield _unescape(data[pos:stop])
+                    else:
+                        raw.append(data[pos:stop])
+                if index < 0:
+                    break
+                in_string = False
+                last = b'"'
+                pos = index + 1
+                if streaming:
+                    streaming = False
+                    streamed = True
+                    yield None
+                elif is_value:
+                    if key in self._capture:
+                        self.fields.setdefault(
+                            key.decode("utf-8"),
+                            json.loads(b'"' + b"".join(raw) + b'"'),
+                        )
+                else:
+                    key = b"".join(raw)
+        if streaming:
+            yield None
+
+
+def _trailing_backslashes(data: bytes, start: int, stop: int) -> int:
+    """Count the consecutive backslashes that precede the stop position."""
+    index = stop
+    while index > start and data[index - 1] == BACKSLASH:
+        index -= 1
+    return stop - index
+
+
+def _incomplete_escape(data: bytes, start: int, stop: int) -> int:
+    """Return the length of an escape sequence cut off at the stop position."""
+    if _trailing_backslashes(data, start, stop) % 2:
+        return 1
+    match = PARTIAL_UNICODE.search(data, max(start, stop - 5), stop)
+    if match is not None and not _trailing_backslashes(data, start, match.start()) % 2:
+        return stop - match.start()
+    return 0
+
+
+def _unescape(raw: bytes) -> bytes:
+    """Resolve the escape sequences of a piece of a JSON string."""
+    if b"\\" not in raw:
+        return raw
+    return ESCAPE.sub(_resolve, raw)
+
+
+def _resolve(match) -> bytes:
+    sequence = match.group(1)
+    if len(sequence) == 1:
+        return ESCAPES[sequence[0]]
+    return chr(int(sequence[1:], 16)).encode("utf-8")
+
+
+class Base64Reader(io.RawIOBase):
+    """Decode base64 encoded chunks on demand as a readable binary stream."""
+
+    def __init__(
+        self,
+        chunks: Iterable[bytes],
+        sink: Optional[Callable[[bytes], None]] = None,
+    ):
+        """
+        Prepare decoding base64 encoded chunks.
+
+        Parameters
+        ----------
+        chunks : iterable of bytes
+            The base64 encoded data in pieces of arbitrary length.
+        sink : callable, optional
+            A function that receives every decoded piece, for example, to
+            compute a hash of the content while it is being read.
+
+        """
+        super().__init__()
+        self._chunks = iter(chunks)
+        self._sink = sink
+        self._rest = b""
+        self._buffer = b""
+        self._offset = 0
+
+    def readable(self) -> bool:
+        """Declare the stream readable."""
+        return True
+
+    def _fill(self) -> bool:
+        """Decode the next chunk and return whether data remain."""
+        while self._offset >= len(self._buffer):
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                if not self._rest:
+                    return False
+                # Let the decoder complain about incomplete input.
+                data, self._rest = self._rest, b""
+            else:
+                data = self._rest + chunk.translate(None, WHITESPACE)
+                cut = len(data) - len(data) % 4
+                data, self._rest = data[:cut], data[cut:]
+            self._buffer = binascii.a2b_base64(data)
+            self._offset = 0
+            if self._sink is not None and self._buffer:
+                self._sink(self._buffer)
+        return True
+
+    def readinto(self, buffer) -> int:
+        """Read decoded bytes into a pre-allocated buffer."""
+        if not self._fill():
+            return 0
+        size = min(len(buffer), len(self._buffer) - self._offset)
+        buffer[:size] = self._buffer[self._offset : self._offset + size]
+        self._offset += size
+        return size
+
+
+def parse_genbank(payload: bytes, lazy: bool = False) -> SeqRecord:
+    """
+    Parse a single GenBank record from its raw bytes.
+
+    Parameters
+    ----------
+    payload : bytes
+        The content of a GenBank file with a single record.
+    lazy : bool, optional
+        Whether to defer parsing the features until they are accessed.
+
+    Returns
+    -------
+    Bio.SeqRecord.SeqRecord
+        The parsed sequence record.
+
+    """
+    if lazy:
+        return parse_lazy_genbank(payload)
+    return read_genbank(io.BytesIO(payload))
+
+
+def read_genbank(stream: io.RawIOBase) -> SeqRecord:
+    """Parse a single GenBank record from a binary stream."""
+    if not isinstance(stream, io.BufferedIOBase):
+        stream = io.BufferedReader(stream, buffer_size=64 * 1024)
+    return SeqIO.read(
+        io.TextIOWrapper(stream, encoding="utf-8", errors="replace"), "gb"
+    )
@@ -45,10 +45,22 @@ class Configuration(metaclass=Singleton):
         62. A typical good Sanger sequencing read has a score of 55.
     output : str or pathlib.Path
         Output directory for alignment files.
+    trim_method : str
+        The method used to trim low quality ends of sample reads; one of
+        'threshold', 'window', or 'mott'.
+    trim_window : int
+        The size of the sliding window used by the 'window' trimming method.
 
     """
 
-    def __init__(self, threshold=50.0, output=mkdtemp(), **kwargs):
+    def __init__(
+        self,
+        threshold=50.0,
+        output=mkdtemp(),
+        trim_method="threshold",
+        trim_window=10,
+        **kwargs,
+    ):
         """
         Initialize the singleton configuration object.
 
@@ -59,6 +71,12 @@ class Configuration(metaclass=Singleton):
             62. A typical good Sanger sequencing read has a score of 55.
         output : str or pathlib.Path, optional
             Output directory for alignment files.
+        trim_method : str, optional
+            The method used to trim low quality ends of sample reads; one of
+            'threshold', 'window', or 'mott'.
+        trim_window : int, optional
+            The size of the sliding window used by the 'window' trimming
+            method.
 
         Other Parameters
         ----------------
@@ -69,3 +87,5 @@ class Configuration(metaclass=Singleton):
         super().__init__(**kwargs)
         self.threshold = threshold
         self.output = output
+        self.trim_method = trim_method
+        self.trim_window = trim_window
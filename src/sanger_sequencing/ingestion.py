@@ -0,0 +1,303 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Analyze very large templates in chunks with constant memory."""
+
+
+import logging
+import typing
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+from Bio.SeqRecord import SeqRecord
+from pandas import DataFrame, concat, read_csv, read_excel
+from pandas.util import hash_pandas_object
+
+from .api import sanger_report
+from .clients.repository_client import RepositoryClient
+from .helpers import log_errors
+from .model import SangerReportInternal
+from .samples import Read
+
+
+__all__ = ("iter_template", "sanger_report_chunks")
+
+
+logger = logging.getLogger(__name__)
+
+
+COLUMNS = ["plasmid", "primer", "sample"]
+
+PlasmidSource = typing.Union[RepositoryClient, typing.Mapping[str, SeqRecord]]
+SampleSource = typing.Union[
+    typing.Mapping[str, typing.Union[SeqRecord, Read]],
+    typing.Callable[
+        [typing.List[str]], typing.Mapping[str, typing.Union[SeqRecord, Read]]
+    ],
+]
+
+
+def iter_template(
+    path: typing.Union[str, Path],
+    chunksize: int = 10000,
+    columns: typing.Optional[typing.List[str]] = None,
+) -> typing.Iterator[DataFrame]:
+    """
+    Read an analysis template in chunks of rows.
+
+    CSV files are read with the chunked parser of pandas and Excel workbooks
+    in the XLSX format are streamed row by row with openpyxl. Other Excel
+    formats cannot be streamed and are read completely before being split.
+
+    Parameters
+    ----------
+    path : PathLike
+        The CSV or Excel file containing the template.
+    chunksize : int, optional
+        The maximum number of rows per chunk (default 10000).
+    columns : list, optional
+        The subset of columns to read (default 'plasmid', 'primer', 'sample').
+
+    Yields
+    ------
+    pandas.DataFrame
+        Consecutive chunks of the template with all values as strings.
+
+    """
+    path = Path(path)
+    if columns is None:
+        columns = COLUMNS
+    suffix = path.suffix.lower()
+    if suffix in (".csv", ".tsv", ".txt"):
+        yield from read_csv(
+            path,
+            sep="\t" if suffix == ".tsv" else ",",
+            usecols=columns,
+            dtype=str,
+            chunksize=chunksize,
+        )
+    elif suffix in (".xlsx", ".xlsm"):
+        yield from _iter_workbook(path, chunksize, columns)
+    else:
+        template = read_excel(path, usecols=columns, dtype=str)
+        for start in range(0, len(template), chunksize):
+            yield template.iloc[start : start + chunksize].copy()
+
+
+def _iter_workbook(
+    path: Path, chunksize: int, columns: typing.List[str]
+) -> typing.Iterator[DataFrame]:
+    """Stream the first sheet of an XLSX workbook in chunks."""
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ImportError(
+            "Reading XLSX templates requires openpyxl. Please install it, for "
+            "example, with `pip install sanger-sequencing[analysis]`."
+        ) from None
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = [str(cell).strip() for cell in next(rows, ())]
+        indices = [header.index(name) for name in columns]
+        buffer = []
+        for row in rows:
+            buffer.append([None if row[i] is None else str(row[i]) for i in indices])
+            if len(buffer) == chunksize:
+                yield DataFrame(buffer, columns=columns)
+                buffer = []
+        if buffer:
+            yield DataFrame(buffer, columns=columns)
+    finally:
+        workbook.close()
+
+
+def sanger_report_chunks(
+    path: typing.Union[str, Path],
+    plasmids: PlasmidSource,
+    samples: SampleSource,
+    chunksize: int = 10000,
+    threshold: typing.Optional[float] = None,
+    output: typing.Optional[typing.Union[str, Path]] = None,
+    trim_method: typing.Optional[str] = None,
+) -> typing.Iterator[SangerReportInternal]:
+    """
+    Analyze a large template chunk by chunk and yield partial reports.
+
+    The template is read twice. The first pass only counts the rows of each
+    plasmid and checks that sample identifiers are unique. The second pass
+    carries the rows of each plasmid over until all of them have been seen.
+    Complete plasmids are then analyzed in batches of about ``chunksize``
+    rows, and their records are resolved only for that batch. Memory
+    therefore stays flat for templates whose rows are grouped by plasmid,
+    which is how plate exports are usually ordered.
+
+    Parameters
+    ----------
+    path : PathLike
+        The CSV or Excel file containing the template.
+    plasmids : RepositoryClient or dict
+        A repository client or a (lazy) mapping from plasmid identifiers to
+        sequence records.
+    samples : dict or callable
+        A (lazy) mapping from sample identifiers to sequence records or
+        compact reads, or a function that returns such a mapping for a list
+        of identifiers.
+    chunksize : int, optional
+        The number of template rows to read and analyze at once (default
+        10000).
+    threshold : float, optional
+        See ``sanger_sequencing.api.sanger_report``.
+    output : PathLike, optional
+        See ``sanger_sequencing.api.sanger_report``.
+    trim_method : {'threshold', 'window', 'mott'}, optional
+        See ``sanger_sequencing.api.sanger_report``.
+
+    Yields
+    ------
+    sanger_sequencing.model.SangerReportInternal
+        A report for each batch of complete plasmids.
+
+    Rows without a plasmid or sample identifier are reported once in the
+    log and skipped, such that they cannot abort the analysis of later
+    batches.
+
+    Raises
+    ------
+    AssertionError
+        If a sample identifier occurs more than once in the template or a
+        batch does not pass validation.
+
+    See Also
+    --------
+    sanger_sequencing.api.sanger_report
+
+    """
+    logger.info("Count the template rows per plasmid.")
+    remaining = Counter()
+    hashes = []
+    blank_rows = []
+    num_rows = 0
+    for chunk in iter_template(path, chunksize, columns=["plasmid", "sample"]):
+        blank = _blank(chunk)
+        blank_rows.extend(np.flatnonzero(blank) + num_rows + 1)
+        num_rows += len(chunk)
+        chunk = chunk.loc[~blank]
+        remaining.update(chunk["plasmid"])
+        # Hashes take far less memory than the sample identifiers themselves.
+        hashes.append(hash_pandas_object(chunk["sample"], index=False).to_numpy())
+    if blank_rows:
+        logger.warning(
+            "Skipping %d template row(s) without a plasmid or sample: %s%s.",
+            len(blank_rows),
+            ", ".join(map(str, blank_rows[:10])),
+            ", ..." if len(blank_rows) > 10 else "",
+        )
+    hashes, counts = np.unique(np.concatenate(hashes), return_counts=True)
+    duplicated = hashes[counts > 1]
+    del hashes, counts
+    if len(duplicated) > 0:
+        names = set()
+        for chunk in iter_template(path, chunksize, columns=["sample"]):
+            mask = hash_pandas_object(chunk["sample"], index=False).isin(duplicated)
+            names.update(chunk.loc[mask.to_numpy(), "sample"].astype(str))
+        raise AssertionError(
+            f"The sample(s) {', '.join(sorted(names))} occur more than once in "
+            f"the template."
+        )
+    pending = None
+    ready = []
+    num_ready = 0
+    for chunk in iter_template(path, chunksize):
+        chunk = chunk.loc[~_blank(chunk)]
+        complete = []
+        for plasmid_id, count in chunk["plasmid"].value_counts(sort=False).items():
+            remaining[plasmid_id] -= count
+            if remaining[plasmid_id] == 0:
+                del remaining[plasmid_id]
+                complete.append(plasmid_id)
+        # Rows of incomplete plasmids are carried over to the next chunk.
+        if pending is not None:
+            chunk = concat([pending, chunk], ignore_index=True)
+        mask = chunk["plasmid"].isin(complete)
+        pending = chunk.loc[~mask]
+        ready.append(chunk.loc[mask])
+        num_ready += int(mask.sum())
+        if num_ready >= chunksize:
+            yield _report(
+                concat(ready, ignore_index=True),
+                plasmids,
+                samples,
+                threshold,
+                output,
+                trim_method,
+            )
+            ready = []
+            num_ready = 0
+    if num_ready > 0:
+        yield _report(
+            concat(ready, ignore_index=True),
+            plasmids,
+            samples,
+            threshold,
+            output,
+            trim_method,
+        )
+
+
+def _blank(chunk: DataFrame) -> np.ndarray:
+    """Identify the rows of a template chunk without a plasmid or sample."""
+    blank = np.zeros(len(chunk), dtype=bool)
+    for column in ("plasmid", "sample"):
+        values = chunk[column]
+        blank |= (values.isna() | (values.astype(str).str.strip() == "")).to_numpy()
+    return blank
+
+
+def _report(
+    template: DataFrame,
+    plasmids: PlasmidSource,
+    samples: SampleSource,
+    threshold: typing.Optional[float],
+    output: typing.Optional[typing.Union[str, Path]],
+    trim_method: typing.Optional[str],
+) -> SangerReportInternal:
+    """Resolve the records of one batch and analyze it."""
+    plasmid_ids = list(template["plasmid"].dropna().unique())
+    sample_ids = list(template["sample"].dropna())
+    logger.info(
+        "Analyze %d plasmid(s) with %d sample(s).", len(plasmid_ids), len(sample_ids)
+    )
+    if isinstance(plasmids, RepositoryClient):
+        records, errors = plasmids.get_plasmid_records(plasmid_ids)
+        log_errors(errors)
+        plasmid_records = {key: record for key, (_, record) in records.items()}
+    else:
+        plasmid_records = {key: plasmids[key] for key in plasmid_ids if key in plasmids}
+    if callable(samples):
+        sample_records = dict(samples(sample_ids))
+    else:
+        sample_records = {key: samples[key] for key in sample_ids if key in samples}
+    return sanger_report(
+        template,
+        plasmid_records,
+        sample_records,
+        threshold=threshold,
+        output=output,
+        trim_method=trim_method,
+    )
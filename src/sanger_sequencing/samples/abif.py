@@ -0,0 +1,306 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Read selected fields of ABIF chromatogram files through a memory map."""
+
+
+import logging
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+
+__all__ = ("ABIFEntry", "ABIFReader", "read_abif")
+
+
+logger = logging.getLogger(__name__)
+
+
+ABI_SUFFIXES = (".ab1", ".abi", ".abif")
+
+HEADER = struct.Struct(">4sH")
+DIRECTORY_ENTRY = struct.Struct(">4sI2H4I")
+# The data of entries with at most four bytes is stored in the offset field.
+INLINE_OFFSET = 20
+TRACE_CHANNELS = (9, 10, 11, 12)
+# Element type codes of the ABIF format and their NumPy data types.
+ELEMENT_TYPES = {
+    1: np.dtype("u1"),
+    2: np.dtype("S1"),
+    3: np.dtype(">u2"),
+    4: np.dtype(">i2"),
+    5: np.dtype(">i4"),
+    7: np.dtype(">f4"),
+    8: np.dtype(">f8"),
+}
+
+
+class ABIFEntry(NamedTuple):
+    """Describe the location of one tagged field of an ABIF file."""
+
+    name: str
+    number: int
+    element_type: int
+    element_size: int
+    count: int
+    size: int
+    offset: int
+
+
+class ABIFReader:
+    """
+    Provide zero-copy access to the fields of an ABIF chromatogram file.
+
+    Only the directory is parsed when the file is opened. Base calls, quality
+    scores, and traces are returned as NumPy views of the memory map and are
+    thus only read from disk when used. The views remain valid after the
+    reader is closed, and the map itself is released once no view refers to
+    it anymore.
+
+    """
+
+    def __init__(self, source: Union[str, Path, bytes], **kwargs):
+        """
+        Open an ABIF file and parse its directory.
+
+        Parameters
+        ----------
+        source : PathLike or bytes
+            The ABIF file, typically with the suffix '.ab1', or its content
+            already in memory, for example, read from an archive.
+
+        Raises
+        ------
+        ValueError
+            If the file is not in the ABIF format.
+
+        """
+        super().__init__(**kwargs)
+        if isinstance(source, (bytes, bytearray, memoryview)):
+            self.path = None
+            self._map = source
+        else:
+            self.path = Path(source)
+            with self.path.open("rb") as file:
+                try:
+                    self._map = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    raise ValueError(f"The file '{self.path}' is empty.") from None
+        try:
+            self.entries = self._parse_directory()
+        except (ValueError, struct.error) as error:
+            self.close()
+            raise ValueError(
+                f"The file '{self.path or '<bytes>'}' is not a valid ABIF file "
+                f"({error})."
+            ) from None
+
+    def _parse_directory(self) -> Dict[Tuple[str, int], ABIFEntry]:
+        """Return the directory entries by tag name and number."""
+        magic, _ = HEADER.unpack_from(self._map, 0)
+        if magic != b"ABIF":
+            raise ValueError(f"it should start with b'ABIF', not {magic!r}")
+        root = DIRECTORY_ENTRY.unpack_from(self._map, HEADER.size)
+        element_size, count, offset = root[3], root[4], root[6]
+        if offset + count * element_size > len(self._map):
+            raise ValueError("the directory exceeds the file size")
+        entries = {}
+        for index in range(count):
+            position = offset + index * element_size
+            name, number, kind, size, num, data_size, data_offset, _ = (
+                DIRECTORY_ENTRY.unpack_from(self._map, position)
+            )
+            if data_size <= 4:
+                data_offset = position + INLINE_OFFSET
+            entry = ABIFEntry(
+                name.decode("latin-1"), number, kind, size, num, data_size, data_offset
+            )
+            entries[entry.name, entry.number] = entry
+        return entries
+
+    def __enter__(self) -> "ABIFReader":
+        """Return the reader itself."""
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        """Close the reader."""
+        self.close()
+
+    def close(self) -> None:
+        """Release the memory map unless views of it are still in use."""
+        if not isinstance(self._map, mmap.mmap):
+            return
+        try:
+            self._map.close()
+        except BufferError:
+            # Views keep the map alive, it is released with the last of them.
+            logger.debug("Keeping the map of '%s' open for its views.", self.path)
+
+    def __contains__(self, key: Tuple[str, int]) -> bool:
+        """Return whether the file contains the tagged field."""
+        return key in self.entries
+
+    def raw(self, name: str, number: int) -> memoryview:
+        """
+        Return the raw bytes of a tagged field without copying them.
+
+        Parameters
+        ----------
+        name : str
+            The four letter tag name, for example, 'PBAS'.
+        number : int
+            The tag number.
+
+        Returns
+        -------
+        memoryview
+            The bytes of the field.
+
+        Raises
+        ------
+        KeyError
+            If the file does not contain the field.
+
+        """
+        entry = self.entries[name, number]
+        if entry.offset + entry.size > len(self._map):
+            raise ValueError(f"The field {name}{number} exceeds the file size.")
+        return memoryview(self._map)[entry.offset : entry.offset + entry.size]
+
+    def array(self, name: str, number: int) -> np.ndarray:
+        """
+        Return a tagged field as a read-only NumPy view.
+
+        Parameters
+        ----------
+        name : str
+            The four letter tag name, for example, 'DATA'.
+        number : int
+            The tag number.
+
+        Returns
+        -------
+        numpy.ndarray
+            The elements of the field with their big-endian data type.
+
+        """
+        entry = self.entries[name, number]
+        dtype = ELEMENT_TYPES.get(entry.element_type, np.dtype("u1"))
+        raw = self.raw(name, number)
+        if dtype.itemsize != entry.element_size:
+            dtype = np.dtype("u1")
+        return np.frombuffer(raw, dtype=dtype)
+
+    def _first(self, name: str, numbers: Tuple[int, ...]) -> Optional[int]:
+        """Return the first of the given tag numbers present in the file."""
+        for number in numbers:
+            if (name, number) in self.entries:
+                return number
+        return None
+
+    @property
+    def base_calls(self) -> np.ndarray:
+        """Return the base calls (PBAS) as a view of ASCII codes."""
+        number = self._first("PBAS", (2, 1))
+        if number is None:
+            return np.empty(0, dtype="u1")
+        return np.frombuffer(self.raw("PBAS", number), dtype="u1")
+
+    @property
+    def quality(self) -> np.ndarray:
+        """Return the Phred quality scores (PCON) of the base calls as a view."""
+        number = self._first("PCON", (2, 1))
+        if number is None:
+            return np.empty(0, dtype="u1")
+        return np.frombuffer(self.raw("PCON", number), dtype="u1")
+
+    @property
+    def peak_locations(self) -> np.ndarray:
+        """Return the trace positions (PLOC) of the base calls as a view."""
+        number = self._first("PLOC", (2, 1))
+        if number is None:
+            return np.empty(0, dtype=">i2")
+        return self.array("PLOC", number)
+
+    @property
+    def base_order(self) -> str:
+        """Return the bases corresponding to the trace channels (FWO_)."""
+        if ("FWO_", 1) not in self.entries:
+            return "GATC"
+        return bytes(self.raw("FWO_", 1)).decode("ascii")
+
+    @property
+    def sample_id(self) -> Optional[str]:
+        """Return the sample name entered before the run (SMPL) if any."""
+        if ("SMPL", 1) not in self.entries:
+            return None
+        raw = bytes(self.raw("SMPL", 1))
+        # The name is a Pascal string prefixed by its length.
+        if self.entries["SMPL", 1].element_type == 18:
+            raw = raw[1 : 1 + raw[0]]
+        return raw.rstrip(b"\0").decode("latin-1")
+
+    def trace(self, base: str) -> np.ndarray:
+        """
+        Return the analyzed trace of one base as a view.
+
+        Parameters
+        ----------
+        base : {'A', 'C', 'G', 'T'}
+            The base whose channel is returned.
+
+        Returns
+        -------
+        numpy.ndarray
+            The signal intensities.
+
+        """
+        channel = TRACE_CHANNELS[self.base_order.index(base.upper())]
+        return self.array("DATA", channel)
+
+
+def read_abif(path: Union[str, Path], sample_id: Optional[str] = None) -> SeqRecord:
+    """
+    Read the base calls and quality scores of an ABIF file into a record.
+
+    Parameters
+    ----------
+    path : PathLike
+        The ABIF file.
+    sample_id : str, optional
+        The record identifier (default the file name without suffix).
+
+    Returns
+    -------
+    Bio.SeqRecord.SeqRecord
+        A sequence record with the annotation 'phred_quality'.
+
+    """
+    path = Path(path)
+    if sample_id is None:
+        sample_id = path.stem
+    with ABIFReader(path) as reader:
+        sequence = reader.base_calls.tobytes().decode("ascii")
+        quality = reader.quality.tolist()
+    record = SeqRecord(Seq(sequence), id=sample_id, name=sample_id, description="")
+    if quality:
+        record.letter_annotations["phred_quality"] = quality
+    return record
@@ -0,0 +1,144 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Stream chromatogram files out of zip and tar archives."""
+
+
+import logging
+import os
+import tarfile
+import zipfile
+from pathlib import Path, PurePosixPath
+from typing import Iterable, Iterator, Optional, Tuple, Union
+
+from .abif import ABI_SUFFIXES
+
+
+__all__ = ("is_archive", "iter_archive_members")
+
+
+logger = logging.getLogger(__name__)
+
+
+MAX_MEMBER_SIZE = 64 << 20
+
+
+def is_archive(path: Union[str, Path]) -> bool:
+    """Return whether the path is a zip or tar archive."""
+    path = Path(path)
+    return path.is_file() and (zipfile.is_zipfile(path) or tarfile.is_tarfile(path))
+
+
+def _match(name: str, wanted: Optional[set], suffixes: set) -> Optional[str]:
+    """Return the sample identifier of a matching member name."""
+    stem, suffix = os.path.splitext(PurePosixPath(name).name)
+    if suffix.lower() not in suffixes or stem.startswith("._"):
+        return None
+    if wanted is not None and stem not in wanted:
+        return None
+    return stem
+
+
+def iter_archive_members(
+    path: Union[str, Path],
+    sample_ids: Optional[Iterable[str]] = None,
+    suffixes: Iterable[str] = ABI_SUFFIXES,
+    max_size: int = MAX_MEMBER_SIZE,
+) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield the content of chromatogram files in an archive one by one.
+
+    Members are read in archive order without extracting them to disk, so
+    only a single member is held in memory at a time. Compressed tar files
+    are decompressed as a stream. A member matches a sample when its file
+    name without the suffix equals the sample identifier.
+
+    Parameters
+    ----------
+    path : PathLike
+        A zip or (compressed) tar archive.
+    sample_ids : iterable, optional
+        The sample identifiers of interest (default all members).
+    suffixes : iterable, optional
+        The case-insensitive file suffixes to consider (default '.ab1',
+        '.abi', '.abif').
+    max_size : int, optional
+        Members larger than this number of bytes are skipped (default 64 MiB).
+
+    Yields
+    ------
+    tuple
+        Pairs of the sample identifier and the content of its member.
+
+    Raises
+    ------
+    ValueError
+        If the file is neither a zip nor a tar archive.
+
+    """
+    path = Path(path)
+    suffixes = {suffix.lower() for suffix in suffixes}
+    wanted = None if sample_ids is None else set(sample_ids)
+    seen = set()
+
+    def accept(name: str, size: int) -> Optional[str]:
+        sample_id = _match(name, wanted, suffixes)
+        if sample_id is None:
+            return None
+        if sample_id in seen:
+            logger.warning(
+                "Ignoring '%s' since sample '%s' was already found.", name, sample_id
+            )
+            return None
+        if size > max_size:
+            logger.warning(
+                "Ignoring '%s' since its size of %d bytes exceeds the limit.",
+                name,
+                size,
+            )
+            return None
+        seen.add(sample_id)
+        return sample_id
+
+    if zipfile.is_zipfile(path):
+        with zipfile.ZipFile(path) as archive:
+            for info in archive.infolist():
+                if info.is_dir():
+                    continue
+                sample_id = accept(info.filename, info.file_size)
+                if sample_id is None:
+                    continue
+                with archive.open(info) as member:
+                    # The declared size of a zip member is not trustworthy.
+                    content = member.read(max_size + 1)
+                if len(content) > max_size:
+                    logger.warning(
+                        "Ignoring '%s' since it exceeds the size limit.", info.filename
+                    )
+                    continue
+                yield sample_id, content
+    elif tarfile.is_tarfile(path):
+        # The stream mode reads compressed archives strictly sequentially.
+        with tarfile.open(path, mode="r|*") as archive:
+            for info in archive:
+                if not info.isfile():
+                    continue
+                sample_id = accept(info.name, info.size)
+                if sample_id is None:
+                    continue
+                yield sample_id, archive.extractfile(info).read()
+    else:
+        raise ValueError(f"The file '{path}' is neither a zip nor a tar archive.")
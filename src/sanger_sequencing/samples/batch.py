@@ -0,0 +1,324 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Hold all reads of a sequencing run in a few contiguous buffers."""
+
+
+import logging
+from collections.abc import Mapping
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from Bio.SeqRecord import SeqRecord
+from pandas import DataFrame
+
+from .loader import SampleCache, load_samples
+from .read import COMPLEMENT, Read
+
+
+__all__ = ("ReadBatch",)
+
+
+logger = logging.getLogger(__name__)
+
+
+COMPLEMENT_TABLE = np.frombuffer(COMPLEMENT, dtype=np.uint8)
+# Map the nucleotides to 0 to 3 and everything else to 4.
+ENCODING_TABLE = np.full(256, 4, dtype=np.uint8)
+for _code, _bases in enumerate(("Aa", "Cc", "Gg", "Tt")):
+    ENCODING_TABLE[np.frombuffer(_bases.encode("ascii"), dtype=np.uint8)] = _code
+GC_TABLE = np.zeros(256, dtype=bool)
+GC_TABLE[np.frombuffer(b"GCgcSs", dtype=np.uint8)] = True
+
+
+class ReadBatch(Mapping):
+    """
+    Store the reads of a run as concatenated base calls and quality scores.
+
+    Read ``i`` occupies ``offsets[i]:offsets[i + 1]`` of both buffers. The
+    batch is a mapping from sample identifiers to ``Read`` views of the
+    buffers, so it can be passed to the analysis wherever a mapping of
+    sample records is expected. Slicing a batch by position returns a batch
+    that shares the buffers.
+
+    Attributes
+    ----------
+    ids : list
+        The sample identifiers in order.
+    bases : numpy.ndarray
+        The ASCII codes of all base calls.
+    qualities : numpy.ndarray
+        The Phred quality scores of all base calls as ``uint8``.
+    offsets : numpy.ndarray
+        The start of each read and the end of the last one.
+
+    """
+
+    def __init__(
+        self,
+        ids: List[str],
+        bases: np.ndarray,
+        qualities: np.ndarray,
+        offsets: np.ndarray,
+        **kwargs,
+    ):
+        """
+        Initialize a batch from its buffers.
+
+        Parameters
+        ----------
+        ids : list
+            The sample identifiers in order.
+        bases : numpy.ndarray
+            The ASCII codes of all base calls.
+        qualities : numpy.ndarray
+            The Phred quality scores of all base calls.
+        offsets : numpy.ndarray
+            The start of each read and the end of the last one.
+
+        """
+        super().__init__(**kwargs)
+        self.ids = list(ids)
+        self.bases = np.asarray(bases, dtype=np.uint8)
+        self.qualities = np.asarray(qualities, dtype=np.uint8)
+        self.offsets = np.asarray(offsets, dtype=np.int64)
+        if len(self.offsets) != len(self.ids) + 1:
+            raise ValueError("There must be one more offset than reads.")
+        if len(self.bases) != len(self.qualities):
+            raise ValueError("There must be one quality score per base call.")
+        self._index = {sample_id: i for i, sample_id in enumerate(self.ids)}
+
+    @classmethod
+    def from_reads(cls, samples: Mapping) -> "ReadBatch":
+        """
+        Concatenate sample sequence records or reads into a batch.
+
+        Parameters
+        ----------
+        samples : dict
+            A mapping from sample identifiers to sequence records with Phred
+            quality annotations or to reads.
+
+        Returns
+        -------
+        ReadBatch
+            All reads in the order of the mapping.
+
+        """
+        ids = list(samples)
+        sequences = []
+        qualities = []
+        for sample_id in ids:
+            sample = samples[sample_id]
+            if isinstance(sample, Read):
+                sequences.append(sample.sequence)
+                qualities.append(sample.quality)
+            else:
+                sequences.append(bytes(sample.seq))
+                qualities.append(sample.letter_annotations["phred_quality"])
+        lengths = np.fromiter((len(seq) for seq in sequences), np.int64, len(ids))
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        bases = np.frombuffer(b"".join(sequences), dtype=np.uint8)
+        if qualities:
+            qualities = np.concatenate(
+                [np.asarray(qual, dtype=np.uint8) for qual in qualities]
+            )
+        return cls(ids, bases, np.asarray(qualities, dtype=np.uint8), offsets)
+
+    @classmethod
+    def from_directory(
+        cls,
+        source: Union[str, Path],
+        sample_ids: Optional[Iterable[str]] = None,
+        max_workers: Optional[int] = None,
+        cache: Optional[SampleCache] = None,
+    ) -> Tuple["ReadBatch", List[Dict]]:
+        """
+        Load the ABI files of a directory or archive into a batch.
+
+        Parameters
+        ----------
+        source : PathLike
+            The directory or archive containing the chromatogram files.
+        sample_ids : iterable, optional
+            The sample identifiers of interest (default all files).
+        max_workers : int, optional
+            The number of processes used for parsing.
+        cache : SampleCache, optional
+            A cache of previously parsed files.
+
+        Returns
+        -------
+        ReadBatch
+            All successfully loaded reads.
+        list
+            List of errors for all missing or unreadable samples.
+
+        See Also
+        --------
+        sanger_sequencing.samples.load_samples
+
+        """
+        reads, errors = load_samples(
+            source, sample_ids, max_workers=max_workers, cache=cache, compact=True
+        )
+        return cls.from_reads(reads), errors
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Return the length of each read."""
+        return np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        """Return the number of reads."""
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the sample identifiers."""
+        return iter(self.ids)
+
+    def __contains__(self, sample_id) -> bool:
+        """Return whether the batch contains the sample."""
+        return sample_id in self._index
+
+    def __getitem__(self, key: Union[str, slice]) -> Union[Read, "ReadBatch"]:
+        """Return a read view by identifier or a batch view by positions."""
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError("Batches can only be sliced contiguously.")
+            stop = max(start, stop)
+            offsets = self.offsets[start : stop + 1]
+            begin, end = offsets[0], offsets[-1]
+            return ReadBatch(
+                self.ids[start:stop],
+                self.bases[begin:end],
+                self.qualities[begin:end],
+                offsets - begin,
+            )
+        i = self._index[key]
+        begin, end = self.offsets[i], self.offsets[i + 1]
+        return Read(key, self.bases[begin:end], self.qualities[begin:end])
+
+    def select(self, sample_ids: Iterable[str]) -> "ReadBatch":
+        """Return a new batch with the given samples in the given order."""
+        ids = list(sample_ids)
+        rows = np.fromiter((self._index[i] for i in ids), np.int64, len(ids))
+        lengths = self.lengths[rows]
+        return ReadBatch(ids, *self._gather(rows, 0, lengths))
+
+    def _gather(
+        self, rows: np.ndarray, starts: np.ndarray, lengths: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Copy regions of the given reads into new buffers."""
+        offsets = np.concatenate([[0], np.cumsum(lengths)])
+        # Index of every kept element in the original buffers.
+        positions = np.repeat(self.offsets[rows] + starts - offsets[:-1], lengths)
+        positions += np.arange(offsets[-1])
+        return self.bases[positions], self.qualities[positions], offsets
+
+    def trim(self, starts, stops) -> "ReadBatch":
+        """
+        Return a new batch with only the given region of each read.
+
+        Parameters
+        ----------
+        starts : array_like
+            The index of the first base call kept per read.
+        stops : array_like
+            The index after the last base call kept per read.
+
+        Returns
+        -------
+        ReadBatch
+            The trimmed reads.
+
+        """
+        starts = np.clip(np.asarray(starts, dtype=np.int64), 0, None)
+        stops = np.minimum(np.asarray(stops, dtype=np.int64), self.lengths)
+        lengths = np.maximum(stops - starts, 0)
+        rows = np.arange(len(self))
+        return ReadBatch(self.ids, *self._gather(rows, starts, lengths))
+
+    def reverse_complement(self) -> "ReadBatch":
+        """Return a new batch with the reverse complement of every read."""
+        lengths = self.lengths
+        ends = np.repeat(self.offsets[1:] - 1, lengths)
+        # Walk each read backwards from its last element.
+        positions = ends - (
+            np.arange(len(self.bases)) - np.repeat(self.offsets[:-1], lengths)
+        )
+        return ReadBatch(
+            self.ids,
+            COMPLEMENT_TABLE[self.bases[positions]],
+            self.qualities[positions],
+            self.offsets.copy(),
+        )
+
+    def encode(self) -> np.ndarray:
+        """Return the base calls encoded as A=0, C=1, G=2, T=3, and other=4."""
+        return ENCODING_TABLE[self.bases]
+
+    def _sums(self, values: np.ndarray) -> np.ndarray:
+        """Sum values per read."""
+        totals = np.concatenate([[0], np.cumsum(values, dtype=np.int64)])
+        return totals[self.offsets[1:]] - totals[self.offsets[:-1]]
+
+    def statistics(self) -> DataFrame:
+        """
+        Compute summary statistics of all reads at once.
+
+        Returns
+        -------
+        pandas.DataFrame
+            A table with one row per read and the columns 'length',
+            'mean_quality', 'median_quality', 'gc_content', and 'ambiguous'.
+            Statistics of empty reads are ``NaN``.
+
+        """
+        lengths = self.lengths
+        starts = self.offsets[:-1]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = self._sums(self.qualities) / lengths
+            gc_content = self._sums(GC_TABLE[self.bases]) / lengths
+        # Sort the qualities within each read to pick the middle elements.
+        # Scores fit into eight bits, so sorting one combined key is enough.
+        keys = np.repeat(np.arange(len(self), dtype=np.int64) << 8, lengths)
+        ordered = (np.sort(keys | self.qualities) & 0xFF).astype(np.uint8)
+        median = np.full(len(self), np.nan)
+        rows = np.flatnonzero(lengths > 0)
+        lower = ordered[starts[rows] + (lengths[rows] - 1) // 2]
+        upper = ordered[starts[rows] + lengths[rows] // 2]
+        median[rows] = (lower.astype(float) + upper) / 2
+        return DataFrame(
+            {
+                "length": lengths,
+                "mean_quality": mean,
+                "median_quality": median,
+                "gc_content": gc_content,
+                "ambiguous": self._sums(self.encode() == 4),
+            },
+            index=self.ids,
+        )
+
+    def to_records(self) -> Dict[str, SeqRecord]:
+        """Return all reads as sequence records."""
+        return {sample_id: self[sample_id].to_record() for sample_id in self.ids}
+
+    def __repr__(self) -> str:
+        """Return a short description of the batch."""
+        return f"ReadBatch(reads={len(self)}, bases={len(self.bases)})"
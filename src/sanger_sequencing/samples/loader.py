@@ -0,0 +1,351 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Load ABI chromatogram files from directories or archives in parallel."""
+
+
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from .abif import ABI_SUFFIXES, ABIFReader
+from .archive import is_archive, iter_archive_members
+from .read import Read
+
+
+__all__ = ("SampleCache", "find_sample_files", "load_samples")
+
+
+logger = logging.getLogger(__name__)
+
+
+BLOCK_SIZE = 1 << 20
+
+
+def _hash_file(path: Path) -> str:
+    """Return the SHA-256 hex digest of a file's content."""
+    digest = hashlib.sha256()
+    with path.open("rb") as file:
+        for block in iter(lambda: file.read(BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _parse_abi(content: Union[str, bytes]) -> Tuple[str, bytes]:
+    """Return only the base calls and Phred quality scores of an ABI file."""
+    with ABIFReader(content) as reader:
+        return reader.base_calls.tobytes().decode("ascii"), reader.quality.tobytes()
+
+
+def _to_record(sample_id: str, sequence: str, quality: bytes) -> SeqRecord:
+    """Create a minimal sequence record for the analysis."""
+    record = SeqRecord(Seq(sequence), id=sample_id, name=sample_id, description="")
+    if quality:
+        record.letter_annotations["phred_quality"] = list(quality)
+    return record
+
+
+def _to_read(sample_id: str, sequence: str, quality: bytes) -> Read:
+    """Create a compact read for the analysis."""
+    return Read(sample_id, sequence, np.frombuffer(quality, dtype=np.uint8))
+
+
+class SampleCache:
+    """
+    Store parsed base calls and quality scores by the hash of their file.
+
+    Unchanged chromatogram files are thus never parsed twice, even when they
+    are renamed or moved.
+
+    """
+
+    def __init__(self, directory: Union[str, Path], **kwargs):
+        """
+        Initialize a cache in the given directory.
+
+        Parameters
+        ----------
+        directory : PathLike
+            The directory in which the parsed samples are stored.
+
+        """
+        super().__init__(**kwargs)
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def _path(self, digest: str) -> Path:
+        """Return the location of a cached sample."""
+        return self.directory / digest[:2] / f"{digest}.pickle"
+
+    def get(self, digest: str) -> Optional[Tuple[str, bytes]]:
+        """
+        Return the cached base calls and quality scores if present.
+
+        Parameters
+        ----------
+        digest : str
+            The SHA-256 hex digest of the chromatogram file.
+
+        Returns
+        -------
+        tuple or None
+            The base calls and quality scores or None.
+
+        """
+        try:
+            with self._path(digest).open("rb") as file:
+                return pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception:
+            logger.debug(
+                "Ignoring the corrupt cache entry '%s'.", digest, exc_info=True
+            )
+            return None
+
+    def put(self, digest: str, sequence: str, quality: bytes) -> None:
+        """
+        Store the base calls and quality scores of a chromatogram file.
+
+        Parameters
+        ----------
+        digest : str
+            The SHA-256 hex digest of the chromatogram file.
+        sequence : str
+            The base calls.
+        quality : bytes
+            The Phred quality score of each base call.
+
+        """
+        path = self._path(digest)
+        path.parent.mkdir(exist_ok=True)
+        handle, tmp = tempfile.mkstemp(dir=str(path.parent))
+        try:
+            with os.fdopen(handle, "wb") as file:
+                pickle.dump((sequence, quality), file, pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp, str(path))
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+
+def find_sample_files(
+    directory: Union[str, Path],
+    sample_ids: Optional[Iterable[str]] = None,
+    suffixes: Iterable[str] = ABI_SUFFIXES,
+) -> Dict[str, Path]:
+    """
+    Discover chromatogram files whose names match sample identifiers.
+
+    The directory is searched recursively and a file matches a sample when
+    its name without the suffix equals the sample identifier.
+
+    Parameters
+    ----------
+    directory : PathLike
+        The directory containing the chromatogram files.
+    sample_ids : iterable, optional
+        The sample identifiers of interest (default all files).
+    suffixes : iterable, optional
+        The case-insensitive file suffixes to consider (default '.ab1',
+        '.abi', '.abif').
+
+    Returns
+    -------
+    dict
+        A mapping from sample identifiers to file paths.
+
+    """
+    suffixes = {suffix.lower() for suffix in suffixes}
+    wanted = None if sample_ids is None else set(sample_ids)
+    files = {}
+    for root, dirs, names in os.walk(str(directory)):
+        dirs.sort()
+        for name in sorted(names):
+            stem, suffix = os.path.splitext(name)
+            if suffix.lower() not in suffixes:
+                continue
+            if wanted is not None and stem not in wanted:
+                continue
+            if stem in files:
+                logger.warning(
+                    "Ignoring '%s' since sample '%s' was already found at '%s'.",
+                    os.path.join(root, name),
+                    stem,
+                    files[stem],
+                )
+                continue
+            files[stem] = Path(root, name)
+    return files
+
+
+def load_samples(
+    source: Union[str, Path],
+    sample_ids: Optional[Iterable[str]] = None,
+    max_workers: Optional[int] = None,
+    cache: Optional[SampleCache] = None,
+    compact: bool = False,
+) -> Tuple[Dict[str, Union[SeqRecord, Read]], List[Dict]]:
+    """
+    Load the sample sequence records from ABI files in a directory or archive.
+
+    Matching files are parsed in a process pool. Only the base calls and the
+    Phred quality scores are kept, which is all that the analysis needs.
+    Members of zip or tar archives are streamed into the pool without being
+    extracted, and only a few of them are buffered at any time.
+
+    Parameters
+    ----------
+    source : PathLike
+        The directory or the zip or (compressed) tar archive containing the
+        chromatogram files.
+    sample_ids : iterable, optional
+        The sample identifiers of interest (default all files).
+    max_workers : int, optional
+        The number of processes used for parsing (default the number of
+        processors).
+    cache : SampleCache, optional
+        A cache of previously parsed files that is also updated.
+    compact : bool, optional
+        Whether to return compact reads instead of sequence records (default
+        False).
+
+    Returns
+    -------
+    dict
+        A mapping from sample identifiers to sequence records or reads for
+        all successfully loaded samples.
+    list
+        List of errors that are themselves dictionaries with the keys 'code',
+        'message', and 'id' for all missing or unreadable samples.
+
+    """
+    if sample_ids is not None:
+        sample_ids = list(dict.fromkeys(sample_ids))
+    if is_archive(source):
+        members = iter_archive_members(source, sample_ids)
+    else:
+        members = (
+            (sample_id, str(path))
+            for sample_id, path in find_sample_files(source, sample_ids).items()
+        )
+    parsed = {}
+    errors = []
+    found = []
+
+    def uncached() -> Iterator[Tuple[str, Union[str, bytes], Optional[str]]]:
+        for sample_id, content in members:
+            found.append(sample_id)
+            digest = None
+            if cache is not None:
+                digest = _hash(content)
+                hit = cache.get(digest)
+                if hit is not None:
+                    parsed[sample_id] = hit
+                    continue
+            yield sample_id, content, digest
+
+    pending = uncached()
+    workers = max_workers or os.cpu_count() or 1
+    first = list(islice(pending, 2))
+    if len(first) < 2 or workers == 1:
+        for sample_id, content, digest in chain(first, pending):
+            _collect(sample_id, _safe_parse_abi(content), digest, parsed, errors, cache)
+    else:
+        # Bound the number of files in flight, since archive members are
+        # held in memory until they are parsed.
+        queue = deque()
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for sample_id, content, digest in chain(first, pending):
+                queue.append(
+                    (sample_id, digest, executor.submit(_safe_parse_abi, content))
+                )
+                if len(queue) >= 2 * workers:
+                    sample_id, digest, future = queue.popleft()
+                    _collect(sample_id, future.result(), digest, parsed, errors, cache)
+            for sample_id, digest, future in queue:
+                _collect(sample_id, future.result(), digest, parsed, errors, cache)
+    logger.info("Loaded %d of %d chromatogram file(s).", len(parsed), len(found))
+    errors[:0] = [
+        {
+            "code": "missing-file",
+            "message": f"No chromatogram file was found for sample '{sample_id}'.",
+            "id": sample_id,
+        }
+        for sample_id in (sample_ids or ())
+        if sample_id not in found
+    ]
+    convert = _to_read if compact else _to_record
+    records = {}
+    for sample_id in found:
+        if sample_id not in parsed:
+            continue
+        try:
+            records[sample_id] = convert(sample_id, *parsed[sample_id])
+        except ValueError as error:
+            # Compact reads require a quality score for every base call.
+            _collect(sample_id, str(error), None, parsed, errors, None)
+    return records, errors
+
+
+def _hash(content: Union[str, bytes]) -> str:
+    """Return the SHA-256 hex digest of a file or of content in memory."""
+    if isinstance(content, str):
+        return _hash_file(Path(content))
+    return hashlib.sha256(content).hexdigest()
+
+
+def _safe_parse_abi(content: Union[str, bytes]) -> Union[Tuple[str, bytes], str]:
+    """Parse an ABI file and return the error message on failure."""
+    try:
+        return _parse_abi(content)
+    except Exception as error:
+        return f"{type(error).__name__}: {error}"
+
+
+def _collect(
+    sample_id: str,
+    result: Union[Tuple[str, bytes], str],
+    digest: Optional[str],
+    parsed: Dict[str, Tuple[str, bytes]],
+    errors: List[Dict],
+    cache: Optional[SampleCache],
+) -> None:
+    """Record a parsing result or its error."""
+    if isinstance(result, str):
+        errors.append(
+            {
+                "code": "invalid-file",
+                "message": f"The chromatogram of sample '{sample_id}' could not "
+                f"be parsed ({result}).",
+                "id": sample_id,
+            }
+        )
+        return
+    parsed[sample_id] = result
+    if cache is not None:
+        cache.put(digest, *result)
@@ -0,0 +1,197 @@
+# Copyright (c) 2018-2020 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     https://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""Provide a compact representation of Sanger sequencing reads."""
+
+
+from typing import Dict, Optional, Union
+
+import numpy as np
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+
+__all__ = ("Read",)
+
+
+COMPLEMENT = bytes.maketrans(
+    b"ACGTUMRWSYKVHDBNacgtumrwsykvhdbn", b"TGCAAKYWSRMBDHVNtgcaakywsrmbdhvn"
+)
+
+
+class Read:
+    """
+    Describe a sample read by its base calls and Phred quality scores only.
+
+    A read holds the identifier, the base calls as bytes, and the quality
+    scores as a ``uint8`` array together with the offsets of the region in
+    use. Slicing a read only moves these offsets and shares the buffers,
+    such that trimming never copies. The attributes used by the analysis
+    (``id``, ``seq``, ``letter_annotations``, ``reverse_complement``, and
+    ``len``) behave like those of a ``Bio.SeqRecord.SeqRecord``, so reads
+    can be passed wherever sample records are expected.
+
+    """
+
+    __slots__ = ("id", "_sequence", "_quality", "start", "stop")
+
+    def __init__(
+        self,
+        id: str,
+        sequence: Union[str, bytes],
+        quality,
+        start: int = 0,
+        stop: Optional[int] = None,
+    ):
+        """
+        Initialize a read.
+
+        Parameters
+        ----------
+        id : str
+            The sample identifier.
+        sequence : str or bytes
+            The base calls.
+        quality : array_like
+            The Phred quality score of each base call.
+        start : int, optional
+            The index of the first base call in use (default 0).
+        stop : int, optional
+            The index after the last base call in use (default all).
+
+        """
+        if isinstance(sequence, str):
+            sequence = sequence.encode("ascii")
+        quality = np.asarray(quality, dtype=np.uint8)
+        if len(quality) != len(sequence):
+            raise ValueError(
+                f"The read '{id}' has {len(quality)} quality scores for "
+                f"{len(sequence)} base calls."
+            )
+        self.id = id
+        self._sequence = sequence
+        self._quality = quality
+        self.start, self.stop, _ = slice(start, stop).indices(len(sequence))
+        self.stop = max(self.start, self.stop)
+
+    @classmethod
+    def from_record(cls, record: SeqRecord) -> "Read":
+        """Create a read from a sequence record with Phred quality scores."""
+        return cls(
+            record.id,
+            bytes(record.seq),
+            record.letter_annotations["phred_quality"],
+        )
+
+    def to_record(self) -> SeqRecord:
+        """Return the region in use as a sequence record."""
+        return SeqRecord(
+            self.seq,
+            id=self.id,
+            name=self.id,
+            description="",
+            letter_annotations={"phred_quality": self.quality.tolist()},
+        )
+
+    @property
+    def name(self) -> str:
+        """Return the sample identifier."""
+        return self.id
+
+    @property
+    def description(self) -> str:
+        """Return an empty description like parsed chromatograms."""
+        return ""
+
+    @property
+    def sequence(self) -> memoryview:
+        """Return the base calls in use as a view."""
+        return memoryview(self._sequence)[self.start : self.stop]
+
+    @property
+    def quality(self) -> np.ndarray:
+        """Return the quality scores in use as a view."""
+        return self._quality[self.start : self.stop]
+
+    @property
+    def seq(self) -> Seq:
+        """Return the base calls in use as a sequence."""
+        return Seq(self.sequence.tobytes())
+
+    @property
+    def letter_annotations(self) -> Dict[str, np.ndarray]:
+        """Return the quality scores in use under the key 'phred_quality'."""
+        return {"phred_quality": self.quality}
+
+    def __len__(self) -> int:
+        """Return the number of base calls in use."""
+        return self.stop - self.start
+
+    def __getitem__(self, index):
+        """Return a base call or a read that shares the buffers for a slice."""
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("Reads can only be sliced contiguously.")
+            return Read(
+                self.id,
+                self._sequence,
+                self._quality,
+                self.start + start,
+                self.start + max(start, stop),
+            )
+        return chr(self.sequence[index])
+
+    def trim(self, start: int, stop: int) -> "Read":
+        """Return the region between two indices of the read in use."""
+        return self[start:stop]
+
+    def reverse_complement(self, id: Optional[str] = None, **kwargs) -> "Read":
+        """
+        Return the reverse complement of the read in use.
+
+        Parameters
+        ----------
+        id : str, optional
+            The identifier of the new read (default the same).
+        kwargs
+            Ignored, for compatibility with ``SeqRecord.reverse_complement``.
+
+        Returns
+        -------
+        Read
+            A read whose quality scores are a reversed view.
+
+        """
+        return Read(
+            self.id if id is None or id is True else id,
+            self.sequence.tobytes().translate(COMPLEMENT)[::-1],
+            self.quality[::-1],
+        )
+
+    def __getstate__(self):
+        """Return the state of the region in use for pickling."""
+        return self.id, self.sequence.tobytes(), self.quality.copy()
+
+    def __setstate__(self, state) -> None:
+        """Restore a pickled read."""
+        self.id, self._sequence, self._quality = state
+        self.start = 0
+        self.stop = len(self._sequence)
+
+    def __repr__(self) -> str:
+        """Return a short description of the read."""
+        return f"Read(id={self.id!r}, length={len(self)})"
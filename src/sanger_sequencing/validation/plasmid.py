@@ -14,18 +14,23 @@
 # limitations under the License.
 
 
-"""Validate a plasmid sequence record."""
+"""Validate plasmid sequence records."""
 
 
-from typing import Iterable
+import logging
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
 
+import numpy as np
 from Bio.SeqRecord import SeqRecord
 
 
-__all__ = ("validate_plasmid",)
+__all__ = ("validate_plasmid", "validate_plasmids")
 
 
-def validate_plasmid(plasmid: SeqRecord, primer_ids: Iterable[str]):
+logger = logging.getLogger(__name__)
+
+
+def validate_plasmid(plasmid: SeqRecord, primer_ids: Iterable[str]) -> List[Dict]:
     """
     Validate that the plasmid sequence record has the required annotations.
 
@@ -43,20 +48,103 @@ def validate_plasmid(plasmid: SeqRecord, primer_ids: Iterable[str]):
         List of errors that are themselves dictionaries with the keys 'code'
         and 'message'.
 
+    See Also
+    --------
+    validate_plasmids
+
+    """
+    return validate_plasmids([(plasmid.id, plasmid)], primer_ids)
+
+
+def validate_plasmids(
+    plasmids: Union[Mapping[str, SeqRecord], Iterable[Tuple[str, SeqRecord]]],
+    primer_ids: Iterable[str],
+) -> List[Dict]:
+    """
+    Validate many plasmid sequence records in one pass.
+
+    All problems are collected rather than stopping at the first one. The
+    bounds of all features are compared as arrays at the end.
+
+    Parameters
+    ----------
+    plasmids : dict or iterable
+        A mapping from plasmid identifiers to sequence records or an iterable
+        of such pairs, for example, a generator that loads the records while
+        they are being validated.
+    primer_ids : iterable
+        The given primer identifiers coming from the analysis template should
+        be annotated in the plasmid sequence records.
+
+    Returns
+    -------
+    list
+        List of errors that are themselves dictionaries with the keys 'code',
+        'message', and 'record'.
+
     """
-    assert len(plasmid) > 0
-    assert hasattr(plasmid, "features")
-    for feat in plasmid.features:
-        assert hasattr(feat, "location")
-        assert hasattr(feat.location, "start")
-        assert hasattr(feat.location.start, "position")
-        assert 0 <= feat.location.start.position <= len(plasmid)
-        assert hasattr(feat.location, "end")
-        assert hasattr(feat.location.end, "position")
-        assert 0 <= feat.location.end.position <= len(plasmid)
-        assert hasattr(feat, "type")
-        assert hasattr(feat, "qualifiers")
-        # assert "label" in feat.qualifiers
+    if isinstance(plasmids, Mapping):
+        plasmids = plasmids.items()
+    errors = []
+    identifiers = []
+    lengths = []
+    owners = []
+    starts = []
+    ends = []
+    for plasmid_id, plasmid in plasmids:
+        if len(plasmid) == 0:
+            errors.append(
+                {
+                    "code": "empty-sequence",
+                    "message": f"Plasmid '{plasmid_id}' has an empty sequence.",
+                    "record": plasmid_id,
+                }
+            )
+        index = len(identifiers)
+        identifiers.append(plasmid_id)
+        lengths.append(len(plasmid))
+        if not getattr(plasmid, "features_loaded", True):
+            # Check the raw locations of unparsed features without parsing.
+            for start, end in plasmid.feature_bounds():
+                owners.append(index)
+                starts.append(start)
+                ends.append(end)
+            continue
+        for number, feat in enumerate(plasmid.features, start=1):
+            location = getattr(feat, "location", None)
+            if (
+                location is None
+                or not hasattr(feat, "type")
+                or not hasattr(feat, "qualifiers")
+            ):
+                errors.append(
+                    {
+                        "code": "invalid-feature",
+                        "message": f"Feature {number} of plasmid '{plasmid_id}' "
+                        f"lacks a location, type, or qualifiers.",
+                        "record": plasmid_id,
+                    }
+                )
+                continue
+            owners.append(index)
+            starts.append(int(location.start))
+            ends.append(int(location.end))
+    owners = np.asarray(owners, dtype=int)
+    starts = np.asarray(starts, dtype=int)
+    ends = np.asarray(ends, dtype=int)
+    limits = np.asarray(lengths, dtype=int)[owners]
+    outside = (starts < 0) | (ends < 0) | (starts > limits) | (ends > limits)
+    for index, start, end in zip(owners[outside], starts[outside], ends[outside]):
+        plasmid_id = identifiers[index]
+        errors.append(
+            {
+                "code": "feature-out-of-bounds",
+                "message": f"A feature of plasmid '{plasmid_id}' spans {start}.."
+                f"{end} outside of its sequence of length {lengths[index]}.",
+                "record": plasmid_id,
+            }
+        )
     # TODO: Test that all given primer identifiers are on the plasmid.
     # for primer_id in primer_ids:
     #     pass
+    return errors
@@ -14,16 +14,19 @@
 # limitations under the License.
 
 
-"""Validate a sample sequence record."""
+"""Validate sample sequence records."""
 
 
+from typing import Dict, Iterable, List, Mapping, Tuple, Union
+
+import numpy as np
 from Bio.SeqRecord import SeqRecord
 
 
-__all__ = ("validate_sample",)
+__all__ = ("validate_sample", "validate_samples")
 
 
-def validate_sample(sample: SeqRecord):
+def validate_sample(sample: SeqRecord) -> List[Dict]:
     """
     Validate that the sample sequence record has Phred quality scores.
 
@@ -38,7 +41,69 @@ def validate_sample(sample: SeqRecord):
         List of errors that are themselves dictionaries with the keys 'code'
         and 'message'.
 
+    See Also
+    --------
+    validate_samples
+
+    """
+    return validate_samples([(sample.id, sample)])
+
+
+def validate_samples(
+    samples: Union[Mapping[str, SeqRecord], Iterable[Tuple[str, SeqRecord]]]
+) -> List[Dict]:
+    """
+    Validate that many sample sequence records have Phred quality scores.
+
+    The presence and length of the scores are compared for all samples at
+    once and all problems are reported.
+
+    Parameters
+    ----------
+    samples : dict or iterable
+        A mapping from sample identifiers to sequence records or an iterable
+        of such pairs, for example, a generator that loads the records while
+        they are being validated.
+
+    Returns
+    -------
+    list
+        List of errors that are themselves dictionaries with the keys 'code',
+        'message', and 'record'.
+
     """
-    assert hasattr(sample, "letter_annotations")
-    assert "phred_quality" in sample.letter_annotations
-    assert len(sample.letter_annotations["phred_quality"]) == len(sample)
+    if isinstance(samples, Mapping):
+        samples = samples.items()
+    identifiers = []
+    lengths = []
+    scores = []
+    for sample_id, sample in samples:
+        identifiers.append(sample_id)
+        lengths.append(len(sample))
+        quality = getattr(sample, "letter_annotations", {}).get("phred_quality")
+        scores.append(-1 if quality is None else len(quality))
+    lengths = np.asarray(lengths, dtype=int)
+    scores = np.asarray(scores, dtype=int)
+    missing = scores < 0
+    mismatch = ~missing & (scores != lengths)
+    errors = []
+    for index in np.flatnonzero(missing | mismatch):
+        sample_id = identifiers[index]
+        if missing[index]:
+            errors.append(
+                {
+                    "code": "missing-quality",
+                    "message": f"Sample '{sample_id}' has no Phred quality scores.",
+                    "record": sample_id,
+                }
+            )
+        else:
+            errors.append(
+                {
+                    "code": "quality-length-mismatch",
+                    "message": f"Sample '{sample_id}' has {scores[index]} Phred "
+                    f"quality scores for {lengths[index]} bases.",
+                    "record": sample_id,
+                }
+            )
+    return errors
@@ -22,9 +22,10 @@ import logging
 from importlib.resources import open_text
 from typing import Dict, List
 
+import numpy as np
 from Bio.SeqRecord import SeqRecord
-from goodtables import validate
-from pandas import DataFrame
+from pandas import NA, DataFrame, Series
+from pandas.api.types import infer_dtype
 
 from . import schemata
 
@@ -38,17 +39,25 @@ with open_text(schemata, "template.json", encoding="utf-8") as file_handle:
     TEMPLATE_SCHEMA = json.load(file_handle)
 
 
-def validate_template(template: DataFrame) -> List[Dict]:
+def validate_template(template: DataFrame, strict: bool = False) -> List[Dict]:
     """
     Validate that the template respects the desired schema.
 
-    Make use of goodtables [1]_ in order to validate the template data frame
-    against the chosen specification.
+    By default, the constraints of the schema (required string columns and
+    unique samples) are checked with vectorized pandas operations. In strict
+    mode, goodtables [1]_ is used instead in order to validate the template
+    data frame against the complete specification. Both produce the same
+    error codes, messages, and order for data rows and for templates that
+    lack columns, with or without one unexpected column. With several
+    unexpected columns, goodtables reports misleading header errors, for
+    example, in column "None", which are not reproduced.
 
     Parameters
     ----------
     template : pandas.DataFrame
         A data frame with three columns: 'plasmid', 'primer', 'sample'.
+    strict : bool, optional
+        Whether to validate the template with goodtables (default False).
 
     Returns
     -------
@@ -63,6 +72,23 @@ def validate_template(template: DataFrame) -> List[Dict]:
     """
     if len(template) == 0:
         return [{"code": "empty", "message": "There must be at least one data row."}]
+    if strict:
+        return _validate_strictly(template)
+    errors = _validate_headers(template)
+    if errors:
+        return errors
+    for column_number, field in enumerate(TEMPLATE_SCHEMA["fields"], start=1):
+        column = template[field["name"]]
+        errors.extend(_validate_column(column, field, column_number))
+    # Report errors row by row like goodtables does.
+    errors.sort(key=lambda err: (err["row-number"], err["column-number"]))
+    return errors
+
+
+def _validate_strictly(template: DataFrame) -> List[Dict]:
+    """Validate the template using goodtables."""
+    from goodtables import validate
+
     # Convert the data frame into a format suitable for goodtables, the keys
     # of the first record are taken as the column headers.
     records = template.to_dict("records")
@@ -72,10 +98,122 @@ def validate_template(template: DataFrame) -> List[Dict]:
         headers=list(records[0]),
         schema=TEMPLATE_SCHEMA,
         order_fields=True,
+        row_limit=len(records),
     )["tables"][0]
     return result.get("errors", [])
 
 
+def _validate_headers(template: DataFrame) -> List[Dict]:
+    """Report missing and unexpected columns."""
+    names = [field["name"] for field in TEMPLATE_SCHEMA["fields"]]
+    errors = [
+        {
+            "code": "extra-header",
+            "message": f"There is an extra header in column {column_number}",
+            "column-number": column_number,
+        }
+        for column_number, name in enumerate(template.columns, start=1)
+        if name not in names
+    ]
+    missing = [name for name in names if name not in template.columns]
+    # Like goodtables, missing columns are numbered after the present ones as
+    # long as there are fewer columns than fields. The others take the place
+    # of unexpected columns and are reported by name without a number.
+    num_unnumbered = len(missing) - max(0, len(names) - len(template.columns))
+    errors.extend(
+        {
+            "code": "missing-header",
+            "message": f'There is a missing header in column "{name}"',
+            "column-number": None,
+        }
+        for name in missing[:num_unnumbered]
+    )
+    errors.extend(
+        {
+            "code": "missing-header",
+            "message": f"There is a missing header in column {column_number}",
+            "column-number": column_number,
+        }
+        for column_number, _ in enumerate(
+            missing[num_unnumbered:], start=len(template.columns) + 1
+        )
+    )
+    # Errors without a column number come first.
+    errors.sort(key=lambda err: err["column-number"] or 0)
+    return errors
+
+
+def _validate_column(column: Series, field: Dict, column_number: int) -> List[Dict]:
+    """Check the values of one column against its field specification."""
+    errors = []
+    constraints = field.get("constraints", {})
+    values = column.to_numpy(dtype=object)
+    rows = np.arange(1, len(values) + 1)
+    if infer_dtype(values, skipna=False) == "string":
+        # The common case: every value is a string.
+        is_string = np.ones(len(values), dtype=bool)
+    else:
+        kinds = column.map(type).to_numpy()
+        is_string = np.fromiter(
+            (issubclass(kind, str) for kind in kinds), dtype=bool, count=len(kinds)
+        )
+        # Like goodtables, only absent values count as missing, not NaN.
+        is_missing = np.isin(kinds, (type(None), type(NA)))
+        for row in rows[is_missing]:
+            errors.append(
+                {
+                    "code": "missing-value",
+                    "message": f"Row {row} has a missing value in column "
+                    f"{column_number}",
+                    "row-number": int(row),
+                    "column-number": column_number,
+                }
+            )
+        is_invalid = ~(is_missing | is_string)
+        for row, value in zip(rows[is_invalid], values[is_invalid]):
+            errors.append(
+                {
+                    "code": "type-or-format-error",
+                    "message": f'The value "{value}" in row {row} and column '
+                    f'{column_number} is not type "{field["type"]}" and format '
+                    f'"default"',
+                    "row-number": int(row),
+                    "column-number": column_number,
+                }
+            )
+    is_empty = is_string & (values == "")
+    if constraints.get("required", False):
+        for row in rows[is_empty]:
+            errors.append(
+                {
+                    "code": "required-constraint",
+                    "message": f"Column {column_number} is a required field, but "
+                    f"row {row} has no value",
+                    "row-number": int(row),
+                    "column-number": column_number,
+                }
+            )
+    if constraints.get("unique", False):
+        is_present = is_string & ~is_empty
+        strings = Series(values[is_present], index=rows[is_present])
+        duplicates = strings[strings.duplicated(keep=False)]
+        # Only the few duplicated values are grouped explicitly.
+        for _, group in duplicates.groupby(duplicates, sort=False):
+            previous = [str(group.index[0])]
+            for row in group.index[1:]:
+                previous.append(str(row))
+                errors.append(
+                    {
+                        "code": "unique-constraint",
+                        "message": f"Rows {', '.join(previous)} has unique "
+                        f"constraint violation in column {column_number}",
+                        "row-number": int(row),
+                        "column-number": column_number,
+                    }
+                )
+    return errors
+
+
 def drop_missing_records(
     template: DataFrame, plasmids: Dict[str, SeqRecord], samples: Dict[str, SeqRecord],
 ) -> DataFrame:
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Verify the precomputed codon maps of coding sequences."""
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqFeature import CompoundLocation, FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.analysis import CodonIndex
+from sanger_sequencing.analysis.codons import translate_codon
+
+
+@pytest.fixture(scope="module")
+def plasmid():
+    #          1234567890123456789012345678
+    sequence = "GGATGAAACCCTAAGGTTAGGGTTTCATGG"
+    return SeqRecord(
+        Seq(sequence),
+        features=[
+            SeqFeature(FeatureLocation(2, 14, strand=1), type="CDS"),
+            SeqFeature(FeatureLocation(2, 14, strand=1), type="misc_feature"),
+            # Reverse complement reads ATGAAACCCTAA.
+            SeqFeature(FeatureLocation(16, 28, strand=-1), type="CDS"),
+            SeqFeature(
+                CompoundLocation(
+                    [
+                        FeatureLocation(2, 5, strand=1),
+                        FeatureLocation(8, 14, strand=1),
+                    ]
+                ),
+                type="CDS",
+            ),
+            # Incomplete last codon.
+            SeqFeature(FeatureLocation(2, 7, strand=1), type="CDS"),
+        ],
+    )
+
+
+@pytest.mark.parametrize(
+    "codon, expected",
+    [
+        ("ATG", "M"),
+        ("GCN", "A"),
+        ("TAA", "STOP"),
+        ("TAR", "STOP"),
+        ("NNN", "UNKNOWN"),
+        ("AT-", "UNKNOWN"),
+    ],
+)
+def test_translate_codon(codon, expected):
+    assert translate_codon(codon) == expected
+
+
+def test_index_only_coding_sequences(plasmid):
+    index = CodonIndex.from_record(plasmid)
+    assert 0 in index
+    assert 1 not in index
+    assert 2 in index
+
+
+@pytest.mark.parametrize(
+    "feature, position, character, expected",
+    [
+        (0, 3, "C", ("ATG", "M", "CTG", "L")),
+        (0, 8, "T", ("AAA", "K", "AAT", "N")),
+        (0, 12, "G", ("TAA", "STOP", "GAA", "E")),
+        (0, 2, "C", None),
+        (0, 15, "C", None),
+        # Position 28 is the first nucleotide of the reverse strand CDS.
+        (2, 28, "G", ("ATG", "M", "CTG", "L")),
+        (2, 17, "A", ("TAA", "STOP", "TAT", "Y")),
+        (3, 11, "G", ("CCC", "P", "CCG", "P")),
+        (3, 7, "C", None),
+        (4, 4, "C", ("ATG", "M", "ACG", "T")),
+        (4, 6, "C", None),
+    ],
+)
+def test_translate(plasmid, feature, position, character, expected):
+    index = CodonIndex.from_record(plasmid)
+    assert index.translate([feature], [position], [character]) == [expected]
+
+
+def test_translate_many(plasmid):
+    index = CodonIndex.from_record(plasmid)
+    result = index.translate([0, 2, 0], [3, 28, float("nan")], ["C", "G", "A"])
+    assert result == [("ATG", "M", "CTG", "L"), ("ATG", "M", "CTG", "L"), None]
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Verify the plasmid feature interval index."""
+
+
+import pytest
+from Bio.SeqFeature import FeatureLocation, SeqFeature
+from numpy.random import RandomState
+
+from sanger_sequencing.analysis import FeatureIndex
+
+
+@pytest.fixture(scope="module")
+def features():
+    rnd = RandomState(1234)
+    starts = rnd.randint(0, 5000, size=300)
+    lengths = rnd.randint(1, 1500, size=300)
+    feats = [
+        SeqFeature(FeatureLocation(int(start), int(start + length)), type="misc")
+        for start, length in zip(starts, lengths)
+    ]
+    # A feature spanning the whole sequence as in most GenBank files.
+    feats.append(SeqFeature(FeatureLocation(0, 6500), type="source"))
+    return feats
+
+
+def brute_force(features, start, end):
+    return [
+        i
+        for i, feat in enumerate(features)
+        if start <= feat.location.end and feat.location.start <= end
+    ]
+
+
+@pytest.mark.parametrize(
+    "start, end", [(0, 0), (1, 3), (250, 252), (4999, 5001), (6500, 6502), (7000, 7002)]
+)
+def test_overlap(features, start, end):
+    index = FeatureIndex(features)
+    assert index.overlap(start, end).tolist() == brute_force(features, start, end)
+
+
+def test_overlap_many(features):
+    index = FeatureIndex(features)
+    starts = list(range(0, 7000, 7))
+    ends = [start + 2 for start in starts]
+    result = index.overlap_many(starts, ends)
+    assert len(result) == len(starts)
+    for hits, start, end in zip(result, starts, ends):
+        assert hits.tolist() == brute_force(features, start, end)
+
+
+def test_overlap_empty():
+    index = FeatureIndex([])
+    assert len(index) == 0
+    assert len(index.overlap(1, 3)) == 0
+
+
+def test_overlap_nan(features):
+    index = FeatureIndex(features)
+    assert len(index.overlap(float("nan"), 3)) == 0
+
+
+def test_overlap_many_random(features):
+    rnd = RandomState(4321)
+    index = FeatureIndex(features)
+    starts = rnd.randint(-100, 7000, size=500).astype(float)
+    ends = starts + rnd.randint(-5, 800, size=500)
+    starts[:3] = float("nan")
+    result = index.overlap_many(starts, ends)
+    assert len(result) == len(starts)
+    for hits, start, end in zip(result, starts, ends):
+        assert hits.tolist() == index.overlap(start, end).tolist()
+
+
+def test_overlap_many_empty():
+    result = FeatureIndex([]).overlap_many([1, 5], [3, 8])
+    assert [len(hits) for hits in result] == [0, 0]
+    assert FeatureIndex([]).overlap_many([], []) == []
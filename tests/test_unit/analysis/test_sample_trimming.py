@@ -15,6 +15,116 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+from numpy import arange, asarray, isnan, median
+from numpy.random import RandomState
+
+from sanger_sequencing.analysis import compare_trim_methods, trim_sample, trim_samples
+from sanger_sequencing.analysis.sample import quality_matrix
+from sanger_sequencing.config import Configuration
+
 
 def test_trim_sample():
     assert False
+
+
+@pytest.fixture(scope="module")
+def samples():
+    rnd = RandomState(42)
+    records = {}
+    for i in range(20):
+        length = rnd.randint(100, 300)
+        quality = rnd.randint(45, 62, size=length)
+        # Noisy ends of varying length.
+        quality[: rnd.randint(0, 20)] = rnd.randint(0, 30)
+        quality[length - rnd.randint(1, 30) :] = rnd.randint(0, 30)
+        records[f"sample{i}"] = SeqRecord(
+            Seq("A" * length),
+            id=f"sample{i}",
+            letter_annotations={"phred_quality": quality.tolist()},
+        )
+    records["bad"] = SeqRecord(
+        Seq("ACGT"), id="bad", letter_annotations={"phred_quality": [10, 50, 10, 10]}
+    )
+    return records
+
+
+def reference_trim(quality, threshold):
+    scores = asarray(quality)
+    mask = scores >= threshold
+    index = arange(len(mask))
+    return index[mask][0], index[mask][-1] + 1, float(median(scores))
+
+
+def test_quality_matrix():
+    flat, offsets, matrix = quality_matrix([[1, 2, 3], [], [4]])
+    assert flat.tolist() == [1, 2, 3, 4]
+    assert offsets.tolist() == [0, 3, 3, 4]
+    assert matrix.shape == (3, 3)
+    assert isnan(matrix[1]).all()
+    assert matrix[2, 0] == 4
+
+
+def test_trim_samples(samples):
+    trims = trim_samples(samples, threshold=50.0)
+    assert set(trims) == set(samples)
+    for sample_id, record in samples.items():
+        trim = trims[sample_id]
+        quality = record.letter_annotations["phred_quality"]
+        start, stop, median_quality = reference_trim(quality, 50.0)
+        if median_quality < 50.0:
+            assert trim.error is not None
+            continue
+        assert trim.error is None
+        assert trim.start == start
+        assert trim.stop == stop
+        assert trim.median == median_quality
+        assert trim.scores.tolist() == quality[start:stop]
+
+
+def test_trim_sample_compatibility(samples):
+    Configuration().threshold = 50.0
+    start, seq, scores, end, _ = trim_sample(samples["sample0"])
+    trim = trim_samples({"sample0": samples["sample0"]})["sample0"]
+    assert start == trim.start
+    assert len(seq) == trim.stop - trim.start
+    assert end == len(samples["sample0"]) - trim.stop
+    with pytest.raises(ValueError):
+        trim_sample(samples["bad"])
+
+
+@pytest.fixture(scope="module")
+def noisy():
+    quality = [10, 60, 10] + [55] * 50 + [10, 10, 60, 10, 10, 10, 60, 10]
+    return {
+        "noisy": SeqRecord(
+            Seq("A" * len(quality)),
+            id="noisy",
+            letter_annotations={"phred_quality": quality},
+        )
+    }
+
+
+@pytest.mark.parametrize(
+    "method, start, stop", [("threshold", 1, 60), ("window", 3, 53), ("mott", 3, 53)]
+)
+def test_trim_methods(noisy, method, start, stop):
+    trim = trim_samples(noisy, threshold=50.0, method=method, window=5)["noisy"]
+    assert trim.error is None
+    assert trim.start == start
+    assert trim.stop == stop
+
+
+def test_unknown_trim_method(noisy):
+    with pytest.raises(ValueError):
+        trim_samples(noisy, threshold=50.0, method="magic")
+
+
+def test_compare_trim_methods(noisy):
+    table = compare_trim_methods(noisy, threshold=50.0, window=5)
+    assert table.loc["noisy", "length"] == 61
+    assert table.loc["noisy", "threshold"] == 59
+    assert table.loc["noisy", "window"] == 50
+    assert table.loc["noisy", "mott"] == 50
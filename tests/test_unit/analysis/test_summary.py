@@ -15,6 +15,162 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqFeature import FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+from numpy import nan
+from pandas import DataFrame
 
-def test_summarize_plasmid_conflicts():
-    assert False
+from sanger_sequencing.analysis import (
+    concatenate_sample_reports,
+    summarize_plasmid_conflicts,
+)
+from sanger_sequencing.model import EffectTypeEnum, SampleReportInternal
+
+
+@pytest.fixture()
+def reports():
+    first = SampleReportInternal(id="a", primer="p1", readLength=3)
+    first.details = DataFrame(
+        {
+            "plasmid_pos": [1.0, 2.0, nan],
+            "sample_pos": [4.0, nan, 5.0],
+            "snp": [False, True, True],
+            "plasmid_chr": ["A", "C", "-"],
+            "sample_chr": ["A", "-", "T"],
+            "quality": [40.0, nan, 60.0],
+        }
+    )
+    second = SampleReportInternal(id="b", primer="p1", readLength=2)
+    second.details = DataFrame(
+        {
+            "plasmid_pos": [3.0, 4.0],
+            "sample_pos": [1.0, 2.0],
+            "snp": [False, True],
+            "plasmid_chr": ["G", "T"],
+            "sample_chr": ["G", "A"],
+            "quality": [30.0, 20.0],
+        }
+    )
+    empty = SampleReportInternal(id="c", primer="p2", readLength=2)
+    return [first, second, empty]
+
+
+@pytest.fixture(scope="module")
+def plasmid():
+    # A forward CDS coding M K P, a spacer, a reverse CDS coding M A W, and a
+    # region without features.
+    record = SeqRecord(
+        Seq("ATGAAACCC" + "GGG" + "CCATGCCAT" + "TTTTTTTTT"),
+        id="pConflict",
+        annotations={"molecule_type": "DNA"},
+    )
+    record.features = [
+        SeqFeature(FeatureLocation(0, 9, 1), type="CDS", qualifiers={"label": ["f"]}),
+        SeqFeature(
+            FeatureLocation(12, 21, -1), type="CDS", qualifiers={"label": ["r"]}
+        ),
+    ]
+    return record
+
+
+@pytest.fixture()
+def conflicts(plasmid):
+    sequence = str(plasmid.seq)
+    # One-based plasmid positions of the conflicts and their sample characters.
+    changes = {5: "T", 8: "-", 17: "A", 25: "G"}
+    rows = []
+    for position, char in enumerate(sequence, start=1):
+        sample_chr = changes.get(position, char)
+        rows.append(
+            {
+                "plasmid_pos": float(position),
+                "sample_pos": nan if sample_chr == "-" else float(position),
+                "snp": position in changes,
+                "plasmid_chr": char,
+                "sample_chr": sample_chr,
+                "quality": 60.0,
+            }
+        )
+    sample = DataFrame(rows)
+    report = SampleReportInternal(id="a", primer="p1", readLength=len(rows))
+    report.details = sample
+    return sample, concatenate_sample_reports([report])
+
+
+def describe(conflict):
+    return (
+        conflict.plasmid_position,
+        [feature.labels for feature in conflict.features_hit],
+        [
+            (effect.type, effect.plasmid_aa, effect.sample_aa)
+            for effect in conflict.effects
+        ],
+    )
+
+
+def test_summarize_plasmid_conflicts(plasmid, conflicts):
+    sample, total = conflicts
+    result = summarize_plasmid_conflicts(sample, total, plasmid, sample_id="a")
+    assert [describe(conflict) for conflict in result] == [
+        # A forward CDS SNP changes AAA to ATA.
+        (5, [["f"]], [(EffectTypeEnum.AA_CHANGE, "K", "I")]),
+        # A deletion within a CDS shifts the frame.
+        (8, [["f"]], [(EffectTypeEnum.FRAME_SHIFT, None, None)]),
+        # A reverse strand SNP changes the coding GCA to GTA.
+        (17, [["r"]], [(EffectTypeEnum.AA_CHANGE, "A", "V")]),
+        # A SNP outside of all features has no effect.
+        (25, [], []),
+    ]
+
+
+def test_summarize_plasmid_conflicts_without_sample_id(plasmid, conflicts):
+    sample, total = conflicts
+    expected = summarize_plasmid_conflicts(sample, total, plasmid, sample_id="a")
+    # The original signature without a sample column or identifier.
+    result = summarize_plasmid_conflicts(sample, total, plasmid)
+    assert [describe(conflict) for conflict in result] == [
+        describe(conflict) for conflict in expected
+    ]
+    assert [conflict.status for conflict in result] == [
+        conflict.status for conflict in expected
+    ]
+    # The sample column of each row is used if present.
+    result = summarize_plasmid_conflicts(sample.assign(sample="a"), total, plasmid)
+    assert [describe(conflict) for conflict in result] == [
+        describe(conflict) for conflict in expected
+    ]
+
+
+def test_concatenate_sample_reports(reports):
+    expected = [rep.details.copy() for rep in reports[:2]]
+    total = concatenate_sample_reports(reports)
+    assert len(total) == 5
+    assert total["sample"].tolist() == ["a", "a", "a", "b", "b"]
+    assert total["primer"].tolist() == ["p1"] * 5
+    assert total["plasmid_pos"].isna().tolist() == [False, False, True, False, False]
+    assert total["sample_pos"].sum() == 12
+    assert bytes(total["sample_chr"].tolist()) == b"A-TGA"
+    assert total["quality"].isna().sum() == 1
+    # The input data frames must not be modified.
+    for rep, df in zip(reports, expected):
+        assert rep.details.equals(df)
+
+
+@pytest.mark.parametrize(
+    "column, dtype",
+    [
+        ("plasmid_pos", "Int32"),
+        ("sample_pos", "Int32"),
+        ("snp", "bool"),
+        ("plasmid_chr", "uint8"),
+        ("sample_chr", "uint8"),
+        ("quality", "UInt8"),
+        ("sample", "category"),
+        ("primer", "category"),
+    ],
+)
+def test_concatenate_sample_reports_dtypes(reports, column, dtype):
+    assert concatenate_sample_reports(reports)[column].dtype == dtype
+    assert concatenate_sample_reports([])[column].dtype == dtype
@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""Provide a local stand-in HTTP server for the client tests."""
+
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+
+class MockServer:
+    """Serve canned responses for registered paths and record all requests."""
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.connections = set()
+        self.lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), MockHandler)
+        self.httpd.mock = self
+        self.url = f"http://127.0.0.1:{self.httpd.server_port}/"
+
+    def add(self, path, *responses):
+        """
+        Register responses for a path.
+
+        Each response is either a tuple ``(status, headers, body)`` or a
+        callable taking the request handler and returning such a tuple. The
+        responses are served in order and the last one is repeated.
+
+        """
+        self.routes[path] = list(responses)
+
+    def add_json(self, path, data, status=200, headers=None):
+        """Register a JSON response for a path."""
+        self.add(path, (status, headers or {}, json.dumps(data).encode("utf-8")))
+
+    def count(self, path):
+        """Return the number of requests made for a path."""
+        return sum(1 for request in self.requests if request["path"] == path)
+
+    def respond(self, handler):
+        parts = urlsplit(handler.path)
+        with self.lock:
+            self.requests.append(
+                {
+                    "method": handler.command,
+                    "path": parts.path,
+                    "query": parse_qs(parts.query),
+                    "headers": dict(handler.headers),
+                }
+            )
+            self.connections.add(handler.client_address)
+            responses = self.routes.get(parts.path)
+            if not responses:
+                return 404, {}, b"Not found."
+            response = responses[0] if len(responses) == 1 else responses.pop(0)
+        if callable(response):
+            response = response(handler)
+        return response
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Delegate requests to the mock server."""
+
+    protocol_version = "HTTP/1.1"
+
+    def _respond(self):
+        length = int(self.headers.get("Content-Length", 0))
+        self.body = self.rfile.read(length) if length else b""
+        status, headers, body = self.server.mock.respond(self)
+        self.send_response(status)
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _respond
+    do_POST = _respond
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture()
+def mock_server():
+    server = MockServer()
+    thread = threading.Thread(target=server.httpd.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.httpd.shutdown()
+    server.httpd.server_close()
@@ -14,24 +14,216 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import base64
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import parse_qs, urlsplit
 
 import pytest
+from requests import ConnectionError
 
 from sanger_sequencing.clients import BenchlingClient
 
 
-@pytest.fixture(scope="module")
-def client():
-    return BenchlingClient()
+TOKEN = "sk_SECRET"
+PREFIX = "/api/v2"
 
 
-def test_get_plasmid_ids(client, mocker):
-    assert False
+def dna_sequence(index):
+    return {
+        "id": f"seq_{index:04d}",
+        "entityRegistryId": f"PLS{index:04d}",
+        "name": f"pSlick{index}",
+        "bases": "atgcatgcatgc",
+        "isCircular": True,
+        "annotations": [
+            {"start": 0, "end": 6, "strand": 1, "name": "cds", "type": "CDS"},
+            {"start": 10, "end": 2, "strand": -1, "name": "ori", "type": ""},
+        ],
+    }
 
 
-def test_get_primer_ids(client, mocker):
-    assert False
+class Tenant:
+    """Simulate a Benchling tenant that enforces a rate limit."""
 
+    def __init__(self, server, count=25, limit=None, window=0.2):
+        self.server = server
+        self.sequences = {s["id"]: s for s in (dna_sequence(i) for i in range(count))}
+        self.limit = limit
+        self.window = window
+        self.window_start = time.monotonic()
+        self.window_count = 0
+        self.throttled = 0
+        self.lock = threading.Lock()
+        server.add(f"{PREFIX}/dna-sequences", self.guard(self.list_sequences))
+        server.add(f"{PREFIX}/dna-sequences:bulk-get", self.guard(self.bulk_get))
+        server.add(f"{PREFIX}/dna-oligos", self.guard(self.list_oligos))
+        for sequence_id in self.sequences:
+            server.add(f"{PREFIX}/dna-sequences/{sequence_id}", self.guard(self.get))
 
-def test_get_plasmid_record(client, mocker):
-    assert False
+    def guard(self, func):
+        def respond(handler):
+            with self.lock:
+                now = time.monotonic()
+                if now - self.window_start >= self.window:
+                    self.window_start = now
+                    self.window_count = 0
+                self.window_count += 1
+                reset = self.window - (now - self.window_start)
+                headers = {}
+                if self.limit is not None:
+                    remaining = max(0, self.limit - self.window_count)
+                    headers = {
+                        "x-rate-limit-limit": str(self.limit),
+                        "x-rate-limit-remaining": str(remaining),
+                        "x-rate-limit-reset": f"{reset:.3f}",
+                    }
+                    if self.window_count > self.limit:
+                        self.throttled += 1
+                        return 429, headers, b'{"error": "rate limited"}'
+            status, body = func(handler, parse_qs(urlsplit(handler.path).query))
+            return status, headers, json.dumps(body).encode("utf-8")
+
+        return respond
+
+    @staticmethod
+    def page(items, key, query):
+        size = int(query["pageSize"][0])
+        start = int(query.get("nextToken", ["0"])[0])
+        body = {key: items[start : start + size]}
+        if start + size < len(items):
+            body["nextToken"] = str(start + size)
+        return 200, body
+
+    def list_sequences(self, handler, query):
+        items = list(self.sequences.values())
+        if "entityRegistryIds.anyOf" in query:
+            wanted = set(query["entityRegistryIds.anyOf"][0].split(","))
+            items = [s for s in items if s["entityRegistryId"] in wanted]
+        return self.page(items, "dnaSequences", query)
+
+    def list_oligos(self, handler, query):
+        items = [{"id": f"seqo_{i}", "entityRegistryId": None} for i in range(3)]
+        return self.page(items, "dnaOligos", query)
+
+    def bulk_get(self, handler, query):
+        ids = query["dnaSequenceIds"][0].split(",")
+        if any(i not in self.sequences for i in ids):
+            return 404, {"error": {"message": "Not found."}}
+        return 200, {"dnaSequences": [self.sequences[i] for i in ids]}
+
+    def get(self, handler, query):
+        return 200, self.sequences[urlsplit(handler.path).path.rsplit("/", 1)[1]]
+
+    def count(self, path):
+        return self.server.count(f"{PREFIX}/{path}")
+
+
+@pytest.fixture()
+def tenant(mock_server):
+    return Tenant(mock_server)
+
+
+@pytest.fixture()
+def client(mock_server):
+    with BenchlingClient(
+        api=f"{mock_server.url}api/v2", token=TOKEN, page_size=10, bulk_size=10
+    ) as client:
+        yield client
+
+
+def test_get_plasmid_ids(tenant, client):
+    ids = client.get_plasmid_ids()
+    assert ids == frozenset(tenant.sequences)
+    # Three pages are requested by following the cursor.
+    assert tenant.count("dna-sequences") == 3
+    assert client.get_plasmid_ids() == ids
+    assert tenant.count("dna-sequences") == 3
+    auth = tenant.server.requests[0]["headers"]["Authorization"]
+    assert auth == "Basic " + base64.b64encode(f"{TOKEN}:".encode()).decode()
+
+
+def test_get_primer_ids(tenant, client):
+    assert client.get_primer_ids() == frozenset(["seqo_0", "seqo_1", "seqo_2"])
+
+
+def test_get_plasmid_record(tenant, client):
+    name, record = client.get_plasmid_record("seq_0001")
+    assert name == "pSlick1"
+    assert str(record.seq) == "ATGCATGCATGC"
+    assert record.annotations["topology"] == "circular"
+    cds, ori = record.features
+    assert cds.type == "CDS"
+    assert (int(cds.location.start), int(cds.location.end)) == (0, 6)
+    assert cds.location.strand == 1
+    # The origin feature wraps around the end of the circular sequence.
+    assert ori.type == "misc_feature"
+    assert len(ori.location) == 4
+    assert ori.location.strand == -1
+    client.get_plasmid_record("seq_0001")
+    assert tenant.count("dna-sequences/seq_0001") == 1
+
+
+def test_get_plasmid_records_bulk(tenant, client):
+    ids = [f"seq_{i:04d}" for i in range(25)]
+    records, errors = client.get_plasmid_records(ids + ["seq_9999"])
+    assert list(records) == ids
+    assert [error["id"] for error in errors] == ["seq_9999"]
+    assert tenant.count("dna-sequences:bulk-get") == 3
+    # Only the chunk with the unknown identifier is retrieved individually.
+    assert tenant.count("dna-sequences/seq_0019") == 0
+    assert tenant.count("dna-sequences/seq_0020") == 1
+
+
+def test_get_plasmid_records_malformed(tenant, client):
+    tenant.sequences["seq_0003"]["annotations"][0]["start"] = None
+    ids = [f"seq_{i:04d}" for i in range(5)]
+    records, errors = client.get_plasmid_records(ids)
+    assert list(records) == ["seq_0000", "seq_0001", "seq_0002", "seq_0004"]
+    assert [(error["code"], error["id"]) for error in errors] == [
+        ("retrieval-error", "seq_0003")
+    ]
+
+
+def test_get_plasmid_records_connection_error(tenant, client, mocker):
+    mocker.patch.object(
+        client, "_fetch_sequences", side_effect=ConnectionError("Connection reset.")
+    )
+    records, errors = client.get_plasmid_records(["seq_0000", "seq_0001"])
+    assert list(records) == ["seq_0000", "seq_0001"]
+    assert errors == []
+    assert tenant.count("dna-sequences/seq_0001") == 1
+
+
+def test_registry_identifiers(tenant, mock_server):
+    with BenchlingClient(
+        api=f"{mock_server.url}api/v2", token=TOKEN, id_field="entityRegistryId"
+    ) as client:
+        assert "PLS0003" in client.get_plasmid_ids()
+        assert client.get_plasmid_record("PLS0003")[0] == "pSlick3"
+        records, errors = client.get_plasmid_records(["PLS0004", "PLS9999"])
+    assert list(records) == ["PLS0004"]
+    assert [error["id"] for error in errors] == ["PLS9999"]
+
+
+def test_unknown_identifier_field():
+    with pytest.raises(ValueError):
+        BenchlingClient(api="https://teapot.com/api/v2", token=TOKEN, id_field="x")
+
+
+def test_rate_limiting(mock_server):
+    tenant = Tenant(mock_server, count=40, limit=8, window=0.1)
+    with BenchlingClient(
+        api=f"{mock_server.url}api/v2",
+        token=TOKEN,
+        initial_concurrency=8,
+        max_retries=20,
+    ) as client:
+        with ThreadPoolExecutor(max_workers=16) as executor:
+            results = list(executor.map(client.get_plasmid_record, tenant.sequences))
+        assert len(results) == 40
+        assert tenant.throttled > 0
+        assert client.limiter.throttled > 0
+        assert client.limiter.limit < 8
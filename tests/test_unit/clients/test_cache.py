@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+
+import pytest
+
+from sanger_sequencing.clients import RecordCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_get_caches_value():
+    cache = RecordCache()
+    calls = []
+    assert cache.get("a", lambda: calls.append(1) or 1) == 1
+    assert cache.get("a", lambda: calls.append(1) or 2) == 1
+    assert len(calls) == 1
+    assert "a" in cache
+    stats = cache.statistics()
+    assert (stats.hits, stats.misses, stats.size) == (1, 1, 1)
+
+
+def test_single_flight():
+    cache = RecordCache()
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return "value"
+
+    results = []
+
+    def worker():
+        results.append(cache.get("key", fetch))
+
+    threads = [threading.Thread(target=worker) for _ in range(10)]
+    threads[0].start()
+    started.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Give the other threads time to join the flight.
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == ["value"] * 10
+    assert len(calls) == 1
+    assert cache.statistics().misses == 1
+
+
+def test_error_is_shared_and_not_cached():
+    cache = RecordCache()
+
+    def fail():
+        raise KeyError("missing")
+
+    with pytest.raises(KeyError):
+        cache.get("a", fail)
+    assert "a" not in cache
+    assert cache.get("a", lambda: 3) == 3
+
+
+def test_expiry():
+    timer = FakeTimer()
+    cache = RecordCache(ttl=10, timer=timer)
+    cache.get("a", lambda: 1)
+    timer.now = 9.0
+    assert cache.get("a", lambda: 2) == 1
+    timer.now = 10.0
+    assert cache.get("a", lambda: 2) == 2
+    assert cache.statistics().expirations == 1
+
+
+def test_eviction():
+    cache = RecordCache(maxsize=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    # Make "a" the most recently used value.
+    assert cache.peek("a") == 1
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert "a" in cache
+    assert cache.statistics().evictions == 1
+
+
+def test_clear():
+    cache = RecordCache()
+    cache.put("a", 1)
+    cache.invalidate("a")
+    assert cache.peek("a", default=0) == 0
+    cache.put("b", 2)
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.statistics() == (0, 0, 0, 0, 0)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients import DirectoryClient
+
+
+def genbank(sequence, name):
+    record = SeqRecord(Seq(sequence), id=name, annotations={"molecule_type": "DNA"})
+    return record.format("gb")
+
+
+@pytest.fixture()
+def library(tmp_path):
+    (tmp_path / "pA.gb").write_text(genbank("ATGC", "pA"))
+    (tmp_path / "pB.gbk").write_text(genbank("GGCC", "pB"))
+    (tmp_path / "many.gb").write_text(genbank("AAAA", "m1") + genbank("TTTT", "m2"))
+    (tmp_path / "notes.txt").write_text("Not a GenBank file.")
+    return tmp_path
+
+
+def test_index(library):
+    client = DirectoryClient(library)
+    assert client.get_plasmid_ids() == frozenset(["pA", "pB", "m1", "m2"])
+    name, record = client.get_plasmid_record("m2")
+    assert name == "many.gb"
+    assert str(record.seq) == "TTTT"
+    assert str(client.get_plasmid_record("pB")[1].seq) == "GGCC"
+    assert client.entry("m1").offset == 0
+    assert client.entry("m2").offset > 0
+    assert (library / ".genbank-index.json").is_file()
+
+
+def test_unknown(library):
+    client = DirectoryClient(library)
+    with pytest.raises(KeyError):
+        client.get_plasmid_record("pZ")
+    records, errors = client.get_plasmid_records(["pA", "pZ"])
+    assert list(records) == ["pA"]
+    assert [error["id"] for error in errors] == ["pZ"]
+
+
+def test_lazy_parsing_and_cache(library, mocker):
+    client = DirectoryClient(library)
+    read = mocker.spy(client, "_read_record")
+    client.get_plasmid_record("pA")
+    client.get_plasmid_record("pA")
+    assert read.call_count == 1
+
+
+def test_persistent_index(library, mocker):
+    DirectoryClient(library)
+    scan = mocker.spy(DirectoryClient, "_scan")
+    client = DirectoryClient(library)
+    assert scan.call_count == 0
+    assert len(client.get_plasmid_ids()) == 4
+
+
+def test_refresh_changed_files(library, mocker):
+    client = DirectoryClient(library)
+    assert str(client.get_plasmid_record("pA")[1].seq) == "ATGC"
+    (library / "pA.gb").write_text(genbank("CCCCCC", "pA"))
+    (library / "pB.gbk").unlink()
+    (library / "pC.gb").write_text(genbank("GG", "pC"))
+    # Touching a file without changing it does not re-index its records.
+    stat = (library / "many.gb").stat()
+    os.utime(library / "many.gb", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+    scan = mocker.spy(DirectoryClient, "_scan")
+    assert client.refresh() == {"pA", "pB", "pC"}
+    assert scan.call_count == 2
+    assert client.get_plasmid_ids() == frozenset(["pA", "pC", "m1", "m2"])
+    assert str(client.get_plasmid_record("pA")[1].seq) == "CCCCCC"
+    assert client.refresh() == set()
+
+
+def test_primer_ids(library, tmp_path_factory):
+    primers = tmp_path_factory.mktemp("primers")
+    (primers / "fw1.gb").write_text(genbank("ATG", "fw1"))
+    assert DirectoryClient(library).get_primer_ids() == frozenset()
+    client = DirectoryClient(library, primer_directory=primers)
+    assert client.get_primer_ids() == frozenset(["fw1"])
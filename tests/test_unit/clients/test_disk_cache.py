@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients import DiskRecordCache
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+def genbank(sequence, name="p1"):
+    record = SeqRecord(Seq(sequence), id=name, annotations={"molecule_type": "DNA"})
+    return record.format("gb").encode("ascii")
+
+
+@pytest.fixture()
+def cache(tmp_path):
+    cache = DiskRecordCache(tmp_path / "cache", timer=FakeTimer())
+    yield cache
+    cache.close()
+
+
+def test_persistence(tmp_path, cache):
+    payload = genbank("ATGCATGC")
+    cache.put("p1", "p1.gb", payload, etag='"abc"')
+    cache.close()
+    other = DiskRecordCache(tmp_path / "cache")
+    entry = other.get("p1")
+    other.close()
+    assert entry.name == "p1.gb"
+    assert str(entry.record.seq) == "ATGCATGC"
+    assert entry.digest == DiskRecordCache.hash(payload)
+    assert entry.validators == {"If-None-Match": '"abc"'}
+    # Without a time to live, records always need to be revalidated.
+    assert not entry.fresh
+
+
+def test_missing(cache):
+    assert cache.get("nope") is None
+    assert cache.raw("nope") is None
+
+
+def test_raw_payload(cache):
+    payload = genbank("ATGC")
+    cache.put("p1", "p1.gb", payload)
+    assert cache.raw("p1") == payload
+
+
+def test_shared_content(cache):
+    payload = genbank("ATGC")
+    cache.put("a", "a.gb", payload)
+    cache.put("b", "b.gb", payload)
+    assert len(cache) == 2
+    cache.invalidate("a")
+    assert cache.get("b") is not None
+    cache.invalidate("b")
+    assert len(cache) == 0
+    assert not any(path.is_file() for path in cache.objects.rglob("*"))
+
+
+def test_replace_removes_old_content(cache):
+    cache.put("p1", "p1.gb", genbank("ATGC"))
+    cache.put("p1", "p1.gb", genbank("GGGG"))
+    assert str(cache.get("p1").record.seq) == "GGGG"
+    assert len(list(cache.objects.rglob("*.gb"))) == 1
+
+
+def test_expiry(tmp_path):
+    timer = FakeTimer()
+    cache = DiskRecordCache(tmp_path, ttl=5, timer=timer)
+    cache.put("p1", "p1.gb", genbank("ATGC"))
+    assert cache.get("p1").fresh
+    timer.now += 10
+    assert not cache.get("p1").fresh
+    cache.touch("p1", last_modified="yesterday")
+    entry = cache.get("p1")
+    assert entry.fresh
+    assert entry.validators == {"If-Modified-Since": "yesterday"}
+    cache.close()
+
+
+def test_eviction(tmp_path):
+    first = genbank("A" * 1000, "p1")
+    cache = DiskRecordCache(tmp_path, timer=FakeTimer())
+    cache.put("p1", "p1.gb", first)
+    size = cache.size()
+    cache.max_size = int(2.5 * size)
+    cache.put("p2", "p2.gb", genbank("C" * 1000, "p2"))
+    # Use the first record such that the second is the least recently used.
+    cache.get("p1")
+    cache.put("p3", "p3.gb", genbank("G" * 1000, "p3"))
+    assert cache.get("p2") is None
+    assert cache.get("p1") is not None
+    assert cache.get("p3") is not None
+    assert cache.size() <= cache.max_size
+    cache.close()
+
+
+def test_corrupt_pickle(cache):
+    entry = cache.put("p1", "p1.gb", genbank("ATGC"))
+    pickled = cache.objects / entry.digest[:2] / f"{entry.digest}.pickle"
+    pickled.write_bytes(b"garbage")
+    assert str(cache.get("p1").record.seq) == "ATGC"
+
+
+def test_raw_missing_files(cache):
+    entry = cache.put("p1", "p1.gb", genbank("ATGC"))
+    (cache.objects / entry.digest[:2] / f"{entry.digest}.gb").unlink()
+    assert cache.raw("p1") is None
+    assert len(cache) == 0
+
+
+def test_concurrent_put_and_invalidate(tmp_path):
+    payload = genbank("ATGC")
+    # Separate instances share the index like separate processes do.
+    first = DiskRecordCache(tmp_path)
+    second = DiskRecordCache(tmp_path)
+
+    def churn(_):
+        first.put("a", "a.gb", payload)
+        first.invalidate("a")
+
+    def store(index):
+        second.put(f"b{index}", "b.gb", payload)
+        return second.raw(f"b{index}")
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        churned = executor.map(churn, range(50))
+        stored = list(executor.map(store, range(50)))
+        list(churned)
+    assert stored == [payload] * 50
+    first.close()
+    second.close()
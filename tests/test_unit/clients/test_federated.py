@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients import CircuitBreaker, FederatedClient, LatencyHistogram
+from sanger_sequencing.clients.repository_client import RepositoryClient
+
+
+class FakeClient(RepositoryClient):
+    """Serve records after a delay or fail."""
+
+    def __init__(self, name, plasmids=(), delay=0.0, error=None):
+        super().__init__()
+        self.name = name
+        self.plasmids = frozenset(plasmids)
+        self.delay = delay
+        self.error = error
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def get_plasmid_ids(self):
+        if self.error is not None:
+            raise self.error
+        return self.plasmids
+
+    def get_primer_ids(self):
+        return frozenset([f"{self.name}-primer"])
+
+    def get_plasmid_record(self, plasmid_id):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        if self.error is not None:
+            raise self.error
+        if plasmid_id not in self.plasmids:
+            raise KeyError(plasmid_id)
+        return self.name, SeqRecord(Seq("ATGC"), id=plasmid_id)
+
+
+def test_primary_answers():
+    primary = FakeClient("primary", ["p1"])
+    secondary = FakeClient("secondary", ["p1"])
+    with FederatedClient([primary, secondary], hedge_delay=0.5) as client:
+        assert client.get_plasmid_record("p1")[0] == "primary"
+    assert secondary.calls == 0
+
+
+def test_hedged_request():
+    primary = FakeClient("primary", ["p1"], delay=0.5)
+    secondary = FakeClient("secondary", ["p1"])
+    with FederatedClient([primary, secondary], hedge_delay=0.05) as client:
+        start = time.monotonic()
+        assert client.get_plasmid_record("p1")[0] == "secondary"
+        assert time.monotonic() - start < 0.4
+        assert client.statistics()[0]["hedged"] == 1
+
+
+def test_hedge_bypasses_saturated_pool():
+    primary = FakeClient("primary", ["p1", "p2"], delay=0.5)
+    secondary = FakeClient("secondary", ["p1", "p2"])
+    with FederatedClient(
+        [primary, secondary], hedge_delay=0.05, max_workers=1
+    ) as client:
+        start = time.monotonic()
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            results = executor.map(client.get_plasmid_record, ["p1", "p2"])
+            names = [name for name, _ in results]
+        assert names == ["secondary", "secondary"]
+        assert time.monotonic() - start < 0.4
+
+
+def test_miss_falls_through():
+    primary = FakeClient("primary", [])
+    secondary = FakeClient("secondary", ["p1"])
+    with FederatedClient([primary, secondary], hedge_delay=10) as client:
+        start = time.monotonic()
+        assert client.get_plasmid_record("p1")[0] == "secondary"
+        assert time.monotonic() - start < 1
+        with pytest.raises(KeyError):
+            client.get_plasmid_record("p2")
+        assert client.statistics()[0]["state"] == "closed"
+
+
+def test_circuit_breaker_skips_failing_backend():
+    primary = FakeClient("primary", ["p1"], error=RuntimeError("down"))
+    secondary = FakeClient("secondary", ["p1"])
+    with FederatedClient(
+        [primary, secondary], failure_threshold=2, reset_timeout=0.2
+    ) as client:
+        for _ in range(4):
+            assert client.get_plasmid_record("p1")[0] == "secondary"
+        assert primary.calls == 2
+        assert client.statistics()[0]["state"] == "open"
+        # After the reset timeout, a trial call closes the circuit again.
+        primary.error = None
+        time.sleep(0.25)
+        assert client.get_plasmid_record("p1")[0] == "primary"
+        assert client.statistics()[0]["state"] == "closed"
+
+
+def test_slow_backend_is_circuit_broken():
+    primary = FakeClient("primary", ["p1"], delay=0.05)
+    secondary = FakeClient("secondary", ["p1"], delay=0.2)
+    with FederatedClient(
+        [primary, secondary], slow_call=0.01, failure_threshold=1, hedge_delay=1
+    ) as client:
+        assert client.get_plasmid_record("p1")[0] == "primary"
+        assert client.get_plasmid_record("p1")[0] == "secondary"
+        assert primary.calls == 1
+
+
+def test_all_failing():
+    primary = FakeClient("primary", ["p1"], error=RuntimeError("down"))
+    with FederatedClient([primary], failure_threshold=1) as client:
+        with pytest.raises(RuntimeError, match="down"):
+            client.get_plasmid_record("p1")
+        with pytest.raises(RuntimeError, match="circuits"):
+            client.get_plasmid_record("p1")
+
+
+def test_union_of_identifiers():
+    first = FakeClient("first", ["p1", "p2"])
+    second = FakeClient("second", ["p2", "p3"])
+    broken = FakeClient("broken", error=RuntimeError("down"))
+    with FederatedClient([first, second, broken]) as client:
+        assert client.get_plasmid_ids() == frozenset(["p1", "p2", "p3"])
+        assert len(client.get_primer_ids()) == 3
+        records, errors = client.get_plasmid_records(["p1", "p3", "p4"])
+    assert set(records) == {"p1", "p3"}
+    assert [error["id"] for error in errors] == ["p4"]
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram()
+    assert histogram.quantile(0.5) is None
+    for latency in [0.01] * 90 + [1.0] * 10:
+        histogram.record(latency)
+    assert 0.01 <= histogram.quantile(0.5) < 0.015
+    assert 1.0 <= histogram.quantile(0.95) < 1.5
+    assert histogram.mean == pytest.approx(0.109)
+
+
+def test_circuit_breaker_states():
+    now = [0.0]
+    breaker = CircuitBreaker(
+        failure_threshold=2, reset_timeout=10, timer=lambda: now[0]
+    )
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    now[0] = 11.0
+    assert breaker.state == "half-open"
+    assert breaker.allow()
+    # Only a single trial is allowed.
+    assert not breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    now[0] = 22.0
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
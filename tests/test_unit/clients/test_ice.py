@@ -14,24 +14,128 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
+from concurrent.futures import ThreadPoolExecutor
 
 import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
 
 from sanger_sequencing.clients import ICEClient
 
 
-@pytest.fixture(scope="module")
-def client():
-    return ICEClient()
+def genbank(sequence, name):
+    record = SeqRecord(Seq(sequence), id=name, annotations={"molecule_type": "DNA"})
+    return record.format("gb").encode("ascii")
 
 
-def test_get_plasmid_ids(client, mocker):
-    assert False
+def entries(start, stop, entry_type="PLASMID"):
+    return [
+        {"id": i, "partId": f"JBx_{i:06d}", "type": entry_type}
+        for i in range(start, stop)
+    ]
 
 
-def test_get_primer_ids(client, mocker):
-    assert False
+@pytest.fixture()
+def client(mock_server):
+    with ICEClient(
+        api=f"{mock_server.url}rest",
+        token="SECRET",
+        client_id="sanger",
+        backoff_factor=0,
+        page_size=10,
+        primer_source="folders/3",
+    ) as client:
+        yield client
 
 
-def test_get_plasmid_record(client, mocker):
-    assert False
+def page_handler(items, key="data", count_key="resultCount", cap=None, total=None):
+    def respond(handler):
+        query = handler.path.split("?", 1)[1]
+        params = dict(part.split("=") for part in query.split("&"))
+        offset = int(params["offset"])
+        limit = min(int(params["limit"]), cap or len(items) + 1)
+        count = len(items) if total is None else total
+        body = {count_key: count, key: items[offset : offset + limit]}
+        return 200, {}, json.dumps(body).encode("utf-8")
+
+    return respond
+
+
+def test_headers(client):
+    assert client.headers["X-ICE-API-Token"] == "SECRET"
+    assert client.headers["X-ICE-API-Token-Client"] == "sanger"
+    assert "X-ICE-API-Token-Owner" not in client.headers
+
+
+def test_get_plasmid_ids(client, mock_server):
+    items = entries(0, 25) + entries(25, 30, "STRAIN")
+    mock_server.add("/rest/collections/AVAILABLE/entries", page_handler(items))
+    expected = frozenset(f"JBx_{i:06d}" for i in range(25))
+    assert client.get_plasmid_ids() == expected
+    assert mock_server.count("/rest/collections/AVAILABLE/entries") == 3
+    # The listing is cached.
+    assert client.get_plasmid_ids() == expected
+    assert mock_server.count("/rest/collections/AVAILABLE/entries") == 3
+    for request in mock_server.requests:
+        assert request["headers"]["X-ICE-API-Token"] == "SECRET"
+
+
+def test_get_primer_ids(client, mock_server):
+    mock_server.add(
+        "/rest/folders/3/entries",
+        page_handler(entries(0, 12, "PART"), key="entries", count_key="count"),
+    )
+    assert len(client.get_primer_ids()) == 12
+    assert mock_server.count("/rest/folders/3/entries") == 2
+
+
+def test_get_plasmid_ids_capped_limit(client, mock_server):
+    mock_server.add(
+        "/rest/collections/AVAILABLE/entries", page_handler(entries(0, 25), cap=4)
+    )
+    assert client.get_plasmid_ids() == frozenset(f"JBx_{i:06d}" for i in range(25))
+    assert mock_server.count("/rest/collections/AVAILABLE/entries") == 7
+
+
+def test_get_plasmid_ids_incomplete(client, mock_server):
+    mock_server.add(
+        "/rest/collections/AVAILABLE/entries", page_handler(entries(0, 25), total=30)
+    )
+    with pytest.raises(RuntimeError, match="Listed 25 of 30"):
+        client.get_plasmid_ids()
+
+
+def test_get_plasmid_record(client, mock_server):
+    mock_server.add(
+        "/rest/file/JBx_000001/sequence/genbank",
+        (
+            200,
+            {"Content-Disposition": 'attachment; filename="pSlick.gb"'},
+            genbank("ATGCATGC", "pSlick"),
+        ),
+    )
+    name, record = client.get_plasmid_record("JBx_000001")
+    assert name == "pSlick.gb"
+    assert str(record.seq) == "ATGCATGC"
+    # Test caching. There must not be another request.
+    assert client.get_plasmid_record("JBx_000001")[0] == name
+    assert mock_server.count("/rest/file/JBx_000001/sequence/genbank") == 1
+
+
+def test_get_plasmid_records(client, mock_server):
+    for i in range(6):
+        mock_server.add(
+            f"/rest/file/{i}/sequence/genbank", (200, {}, genbank("ATGC", f"p{i}"))
+        )
+    records, errors = client.get_plasmid_records([str(i) for i in range(8)])
+    assert sorted(records) == [str(i) for i in range(6)]
+    assert records["3"][0] == "3.gb"
+    assert sorted(error["id"] for error in errors) == ["6", "7"]
+
+
+def test_concurrent_requests_share_fetch(client, mock_server):
+    mock_server.add("/rest/file/7/sequence/genbank", (200, {}, genbank("GG", "p7")))
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        list(executor.map(client.get_plasmid_record, ["7"] * 8))
+    assert mock_server.count("/rest/file/7/sequence/genbank") == 1
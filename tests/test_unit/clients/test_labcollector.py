@@ -15,10 +15,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import base64
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+
 import pytest
+import requests
+from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 
-from sanger_sequencing.clients import LabCollectorClient
+from sanger_sequencing.clients import DiskRecordCache, LabCollectorClient
 
 
 TOKEN = "ABCDEFG"
@@ -85,3 +92,161 @@ def test_get_plasmid_record(client, mocker):
     # Test caching. There must not be another call to _get_sequence_record.
     assert client.get_plasmid_record(plasmid_id) == expected
     assert get.call_count == 1
+
+
+@pytest.fixture()
+def local_client(mock_server):
+    with LabCollectorClient(
+        api=f"{mock_server.url}webservice/v2", token=TOKEN, backoff_factor=0
+    ) as client:
+        yield client
+
+
+def test_retry_on_server_error(mock_server, local_client):
+    mock_server.add(
+        "/webservice/v2/plasmids",
+        (503, {}, b"Unavailable"),
+        (429, {"Retry-After": "0"}, b"Slow down"),
+        (200, {"Content-Type": "application/json"}, b'[{"count": "1"}]'),
+    )
+    assert local_client.get_plasmid_ids() == frozenset(["1"])
+    assert mock_server.count("/webservice/v2/plasmids") == 3
+
+
+def test_give_up_after_retries(mock_server, local_client):
+    mock_server.add("/webservice/v2/primers", (500, {}, b"Broken"))
+    with pytest.raises(requests.HTTPError):
+        local_client.get_primer_ids()
+    assert mock_server.count("/webservice/v2/primers") == 4
+
+
+def test_connection_reuse(mock_server, local_client):
+    mock_server.add_json("/webservice/v2/plasmids", [{"count": "1"}])
+    mock_server.add_json("/webservice/v2/primers", [{"count": "2"}])
+    local_client.get_plasmid_ids()
+    local_client.get_primer_ids()
+    assert len(mock_server.connections) == 1
+    for request in mock_server.requests:
+        assert "gzip" in request["headers"]["Accept-Encoding"]
+        assert request["headers"]["X-LC-APP-Auth"] == TOKEN
+
+
+def genbank_entry(count):
+    record = SeqRecord(
+        Seq("ATGCATGC"), id=f"p{count}", annotations={"molecule_type": "DNA"}
+    )
+    content = base64.b64encode(record.format("gb").encode("ascii")).decode("ascii")
+    return {
+        "count": count,
+        "Sequence_file_GenBank": [{"name": f"p{count}.gb", "content": content}],
+    }
+
+
+def test_get_plasmid_records_bulk(mock_server):
+    mock_server.add_json(
+        "/webservice/v2/plasmids", [genbank_entry("1"), genbank_entry("2")]
+    )
+    mock_server.add_json("/webservice/v2/plasmids/3", [genbank_entry("3")])
+    mock_server.add("/webservice/v2/plasmids/4", (404, {}, b"Not found."))
+    with LabCollectorClient(
+        api=f"{mock_server.url}webservice/v2",
+        token=TOKEN,
+        backoff_factor=0,
+        bulk_filter="filter_count",
+    ) as client:
+        records, errors = client.get_plasmid_records(["1", "2", "3", "4"])
+    assert list(records) == ["1", "2", "3"]
+    assert records["3"][0] == "p3.gb"
+    assert str(records["1"][1].seq) == "ATGCATGC"
+    assert [error["id"] for error in errors] == ["4"]
+    bulk = [r for r in mock_server.requests if r["path"] == "/webservice/v2/plasmids"]
+    assert len(bulk) == 1
+    assert bulk[0]["query"]["filter_count"] == ["1,2,3,4"]
+
+
+def test_get_plasmid_records_bulk_keys(mock_server):
+    mock_server.add_json("/webservice/v2/plasmids", [genbank_entry("1")])
+    mock_server.add_json("/webservice/v2/plasmids/2", [genbank_entry("2")])
+    with LabCollectorClient(
+        api=f"{mock_server.url}webservice/v2",
+        token=TOKEN,
+        backoff_factor=0,
+        bulk_filter="filter_count",
+    ) as client:
+        records, errors = client.get_plasmid_records([1, 2])
+    assert list(records) == [1, 2]
+    assert errors == []
+
+
+def test_record_cache_shared_across_paths(mock_server, local_client):
+    mock_server.add_json("/webservice/v2/plasmids", [genbank_entry("2")])
+    mock_server.add_json("/webservice/v2/plasmids/1", [genbank_entry("1")])
+    local_client.bulk_filter = "filter_count"
+    local_client.get_plasmid_record(1)
+    records, _ = local_client.get_plasmid_records([1, 2])
+    assert list(records) == [1, 2]
+    assert mock_server.count("/webservice/v2/plasmids/1") == 1
+    assert mock_server.requests[-1]["query"]["filter_count"] == ["2"]
+    # A record retrieved in bulk is a cache hit for the single lookup.
+    local_client.get_plasmid_record(2)
+    assert mock_server.count("/webservice/v2/plasmids/2") == 0
+
+
+def test_get_plasmid_records_individually(mock_server, local_client):
+    for count in ("1", "2"):
+        mock_server.add_json(f"/webservice/v2/plasmids/{count}", [genbank_entry(count)])
+    records, errors = local_client.get_plasmid_records(["1", "2"])
+    assert set(records) == {"1", "2"}
+    assert errors == []
+    assert mock_server.count("/webservice/v2/plasmids") == 0
+
+
+def test_concurrent_record_requests(mock_server, local_client):
+    def slow(handler):
+        time.sleep(0.1)
+        return 200, {}, json.dumps([genbank_entry("1")]).encode("utf-8")
+
+    mock_server.add("/webservice/v2/plasmids/1", slow)
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        results = list(executor.map(local_client.get_plasmid_record, ["1"] * 5))
+    assert all(name == "p1.gb" for name, _ in results)
+    assert mock_server.count("/webservice/v2/plasmids/1") == 1
+    stats = local_client.cache_statistics()["records"]
+    assert stats.misses == 1
+    assert stats.hits == 4
+
+
+def test_bulk_uses_cache(mock_server, local_client):
+    mock_server.add_json("/webservice/v2/plasmids", [genbank_entry("2")])
+    mock_server.add_json("/webservice/v2/plasmids/1", [genbank_entry("1")])
+    local_client.bulk_filter = "filter_count"
+    local_client.get_plasmid_record("1")
+    records, errors = local_client.get_plasmid_records(["1", "2"])
+    assert set(records) == {"1", "2"}
+    assert mock_server.count("/webservice/v2/plasmids/1") == 1
+    assert mock_server.requests[-1]["query"]["filter_count"] == ["2"]
+    assert "2" in local_client.record_cache
+
+
+def test_disk_cache_revalidation(mock_server, tmp_path):
+    def respond(handler):
+        if handler.headers.get("If-None-Match") == '"v1"':
+            return 304, {"ETag": '"v1"'}, b""
+        body = json.dumps([genbank_entry("1")]).encode("utf-8")
+        return 200, {"ETag": '"v1"'}, body
+
+    mock_server.add("/webservice/v2/plasmids/1", respond)
+    api = f"{mock_server.url}webservice/v2"
+    for _ in range(2):
+        # A new client simulates a new process sharing the disk cache.
+        disk_cache = DiskRecordCache(tmp_path)
+        with LabCollectorClient(
+            api=api, token=TOKEN, backoff_factor=0, disk_cache=disk_cache
+        ) as client:
+            name, record = client.get_plasmid_record("1")
+        disk_cache.close()
+        assert name == "p1.gb"
+        assert str(record.seq) == "ATGCATGC"
+    first, second = mock_server.requests
+    assert "If-None-Match" not in first["headers"]
+    assert second["headers"]["If-None-Match"] == '"v1"'
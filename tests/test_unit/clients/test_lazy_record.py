@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pickle
+
+import pytest
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqFeature import FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients import LazySeqRecord, parse_genbank, parse_lazy_genbank
+from sanger_sequencing.validation import validate_plasmid
+
+
+@pytest.fixture(scope="module")
+def payload():
+    record = SeqRecord(
+        Seq("ATGAAACCCGGGTTTTAA" * 20),
+        id="pLazy.1",
+        name="pLazy",
+        description="A lazily parsed plasmid.",
+        annotations={"molecule_type": "DNA", "topology": "circular"},
+    )
+    record.features = [
+        SeqFeature(
+            FeatureLocation(0, 18, 1), type="CDS", qualifiers={"label": ["orf"]}
+        ),
+        SeqFeature(
+            FeatureLocation(30, 90, -1), type="misc_feature", qualifiers={"note": ["x"]}
+        ),
+    ]
+    return record.format("gb").encode("ascii")
+
+
+def test_equivalent_to_full_parsing(payload):
+    expected = parse_genbank(payload)
+    record = parse_lazy_genbank(payload)
+    assert isinstance(record, LazySeqRecord)
+    assert isinstance(record, SeqRecord)
+    assert not record.features_loaded
+    assert str(record.seq) == str(expected.seq)
+    assert (record.id, record.name, record.description) == (
+        expected.id,
+        expected.name,
+        expected.description,
+    )
+    assert record.annotations == expected.annotations
+    assert len(record.features) == 2
+    assert record.features_loaded
+    for feature, other in zip(record.features, expected.features):
+        assert feature.type == other.type
+        assert feature.location == other.location
+        assert feature.qualifiers == other.qualifiers
+
+
+def test_slicing_and_reverse_complement(payload):
+    record = parse_lazy_genbank(payload)
+    part = record[:20]
+    assert len(part.features) == 1
+    assert str(record.reverse_complement().seq) == str(
+        parse_genbank(payload).reverse_complement().seq
+    )
+
+
+def test_pickle_keeps_features_lazy(payload):
+    record = pickle.loads(pickle.dumps(parse_lazy_genbank(payload)))
+    assert not record.features_loaded
+    assert len(record.features) == 2
+
+
+def test_assign_features(payload):
+    record = parse_lazy_genbank(payload)
+    record.features = []
+    assert record.features_loaded
+    assert record.features == []
+
+
+def test_without_features():
+    record = SeqRecord(Seq("ATGC"), id="bare", annotations={"molecule_type": "DNA"})
+    lazy = parse_lazy_genbank(record.format("gb").encode("ascii"))
+    assert lazy.features_loaded
+    assert lazy.features == []
+    assert str(lazy.seq) == "ATGC"
+
+
+def test_validation_skips_unparsed_features(payload):
+    record = parse_lazy_genbank(payload)
+    validate_plasmid(record, [])
+    assert not record.features_loaded
+
+
+def test_feature_bounds(payload):
+    record = parse_lazy_genbank(payload)
+    assert record.feature_bounds() == [(0, 18), (30, 90)]
+    assert not record.features_loaded
+    assert record.feature_bounds() == [
+        (int(feature.location.start), int(feature.location.end))
+        for feature in record.features
+    ]
+
+
+def test_validation_of_unparsed_bounds(payload):
+    record = parse_lazy_genbank(payload.replace(b"31..90", b"31..900"))
+    errors = validate_plasmid(record, [])
+    assert [error["code"] for error in errors] == ["feature-out-of-bounds"]
+    assert not record.features_loaded
+
+
+def test_format_round_trip(payload, tmp_path):
+    path = tmp_path / "lazy.gb"
+    SeqIO.write(parse_lazy_genbank(payload), str(path), "gb")
+    assert len(SeqIO.read(str(path), "gb").features) == 2
+
+
+def test_non_ascii_qualifier(payload):
+    payload = payload.replace(b'/note="x"', '/note="5 µg at 37 °C"'.encode("utf-8"))
+    record = parse_lazy_genbank(payload)
+    assert record.features[1].qualifiers["note"] == ["5 µg at 37 °C"]
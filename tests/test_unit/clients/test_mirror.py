@@ -0,0 +1,157 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import base64
+import json
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients import (
+    LabCollectorClient,
+    MirrorClient,
+    MirrorStore,
+    sync_mirror,
+)
+
+
+PREFIX = "/webservice/v2"
+
+
+def genbank_entry(count, sequence="ATGCATGC"):
+    record = SeqRecord(
+        Seq(sequence), id=f"p{count}", annotations={"molecule_type": "DNA"}
+    )
+    content = base64.b64encode(record.format("gb").encode("ascii")).decode("ascii")
+    return [{"Sequence_file_GenBank": [{"name": f"p{count}.gb", "content": content}]}]
+
+
+class Library:
+    """Simulate a LabCollector plasmid library on the mock server."""
+
+    def __init__(self, server):
+        self.server = server
+        self.plasmids = {}
+        server.add(f"{PREFIX}/plasmids", self.listing)
+        server.add_json(f"{PREFIX}/primers", [{"count": "7"}])
+
+    def listing(self, handler):
+        body = [
+            {"count": pid, "date_modif": modified}
+            for pid, (_, modified) in self.plasmids.items()
+        ]
+        return 200, {}, json.dumps(body).encode("utf-8")
+
+    def set(self, pid, sequence, modified="2020-01-01"):
+        self.plasmids[pid] = (sequence, modified)
+        etag = f'"{pid}-{sequence}"'
+
+        def respond(handler):
+            if handler.headers.get("If-None-Match") == etag:
+                return 304, {"ETag": etag}, b""
+            body = json.dumps(genbank_entry(pid, sequence)).encode("utf-8")
+            return 200, {"ETag": etag}, body
+
+        self.server.add(f"{PREFIX}/plasmids/{pid}", respond)
+
+    def downloads(self, pid):
+        return self.server.count(f"{PREFIX}/plasmids/{pid}")
+
+
+@pytest.fixture()
+def library(mock_server):
+    return Library(mock_server)
+
+
+@pytest.fixture()
+def client(mock_server):
+    with LabCollectorClient(
+        api=f"{mock_server.url}webservice/v2", token="ABC", backoff_factor=0, ids_ttl=0
+    ) as client:
+        yield client
+
+
+def test_sync_and_serve(library, client, tmp_path):
+    library.set("1", "ATGC")
+    library.set("2", "GGCC")
+    report = sync_mirror(client, tmp_path)
+    assert sorted(report.added) == ["1", "2"]
+    assert report.errors == []
+    local = MirrorClient(tmp_path)
+    assert local.get_plasmid_ids() == frozenset(["1", "2"])
+    assert local.get_primer_ids() == frozenset(["7"])
+    name, record = local.get_plasmid_record("2")
+    assert name == "p2.gb"
+    assert str(record.seq) == "GGCC"
+    records, errors = local.get_plasmid_records(["1", "3"])
+    assert list(records) == ["1"]
+    assert [error["id"] for error in errors] == ["3"]
+
+
+def test_incremental_sync(library, client, tmp_path):
+    library.set("1", "ATGC")
+    library.set("2", "GGCC")
+    sync_mirror(client, tmp_path, modified_field="date_modif")
+    library.set("2", "TTTT", modified="2020-02-02")
+    library.set("3", "AAAA")
+    del library.plasmids["1"]
+    report = sync_mirror(client, tmp_path, modified_field="date_modif")
+    assert report.added == ["3"]
+    assert report.updated == ["2"]
+    assert report.removed == ["1"]
+    assert library.downloads("2") == 2
+    local = MirrorClient(tmp_path)
+    assert str(local.get_plasmid_record("2")[1].seq) == "TTTT"
+    # Files of removed or replaced plasmids are kept until pruned.
+    assert len(list((tmp_path / "plasmids").glob("*.gb"))) == 4
+    assert len(MirrorStore(tmp_path).prune()) == 2
+    assert len(list((tmp_path / "plasmids").glob("*.gb"))) == 2
+
+
+def test_reader_of_previous_index(library, client, tmp_path):
+    library.set("1", "ATGC")
+    sync_mirror(client, tmp_path)
+    local = MirrorClient(tmp_path)
+    library.set("1", "GGCC", modified="2020-02-02")
+    sync_mirror(client, tmp_path, revalidate=True)
+    # The reader's index still refers to the superseded file.
+    assert str(local.get_plasmid_record("1")[1].seq) == "ATGC"
+    local.record_cache.clear()
+    MirrorStore(tmp_path).prune()
+    assert str(local.get_plasmid_record("1")[1].seq) == "GGCC"
+
+
+def test_revalidation(library, client, tmp_path):
+    library.set("1", "ATGC")
+    sync_mirror(client, tmp_path)
+    assert sync_mirror(client, tmp_path).unchanged == ["1"]
+    assert library.downloads("1") == 1
+    report = sync_mirror(client, tmp_path, revalidate=True)
+    assert report.unchanged == ["1"]
+    assert library.downloads("1") == 2
+    assert library.server.requests[-2]["headers"]["If-None-Match"] == '"1-ATGC"'
+
+
+def test_failed_download(library, client, tmp_path):
+    library.set("1", "ATGC")
+    library.plasmids["2"] = ("GGCC", None)
+    report = sync_mirror(client, tmp_path)
+    assert report.added == ["1"]
+    assert [error["id"] for error in report.errors] == ["2"]
+    # The failed plasmid is retried by the next synchronization.
+    library.set("2", "GGCC")
+    assert sync_mirror(client, tmp_path).added == ["2"]
@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pickle
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqFeature import FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients import PackedPlasmidStore, PackedStoreClient
+from sanger_sequencing.clients.repository_client import RepositoryClient
+
+
+SEQUENCES = {
+    "1": "ATGCATGCAT",
+    "2": "acgtNNNNNNacgtRYacgtKN",
+    "3": "NNNN",
+    "4": "",
+}
+
+
+def make_record(plasmid_id, sequence):
+    record = SeqRecord(
+        Seq(sequence),
+        id=plasmid_id,
+        name=f"p{plasmid_id}",
+        description=f"plasmid {plasmid_id}",
+        annotations={"molecule_type": "DNA", "topology": "circular"},
+    )
+    if len(sequence) > 8:
+        record.features = [
+            SeqFeature(
+                FeatureLocation(2, 8, strand=-1),
+                type="primer_bind",
+                qualifiers={"label": ["primer"]},
+            )
+        ]
+    return record
+
+
+class InMemoryClient(RepositoryClient):
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+
+    def get_plasmid_ids(self):
+        return frozenset(self.records)
+
+    def get_primer_ids(self):
+        return frozenset(["7"])
+
+    def get_plasmid_record(self, plasmid_id):
+        return f"name {plasmid_id}", self.records[plasmid_id]
+
+
+@pytest.fixture()
+def store_path(tmp_path):
+    records = [
+        (key, f"name {key}", make_record(key, sequence))
+        for key, sequence in SEQUENCES.items()
+    ]
+    PackedPlasmidStore.write(tmp_path, records, primer_ids=["7", "8"]).close()
+    return tmp_path
+
+
+@pytest.fixture()
+def store(store_path):
+    store = PackedPlasmidStore(store_path)
+    yield store
+    store.close()
+
+
+def decode(path, plasmid_id):
+    store = PackedPlasmidStore(path)
+    try:
+        return store.sequence(plasmid_id)
+    finally:
+        store.close()
+
+
+def test_round_trip(store):
+    assert len(store) == 4
+    for key, sequence in SEQUENCES.items():
+        assert store.sequence(key) == sequence.upper()
+
+
+def test_exception_runs(store):
+    exceptions = (store.generation / PackedPlasmidStore.EXCEPTIONS).read_bytes()
+    # N×6, R, Y, K, N for plasmid 2 and N×4 for plasmid 3.
+    assert len(exceptions) == 6 * 9
+
+
+@pytest.mark.parametrize(
+    "start, stop", [(0, 1), (3, 7), (5, 14), (4, 8), (13, 22), (9, None), (20, 50)]
+)
+def test_region(store, start, stop):
+    assert store.sequence("2", start, stop) == SEQUENCES["2"].upper()[start:stop]
+
+
+def test_packed_size(store):
+    total = sum(len(sequence) for sequence in SEQUENCES.values())
+    size = (store.generation / PackedPlasmidStore.SEQUENCES).stat().st_size
+    assert size == sum((len(sequence) + 3) // 4 for sequence in SEQUENCES.values())
+    assert size < total / 3
+
+
+def test_lazy_features(store):
+    record = store.record("1")
+    assert not record.features_loaded
+    assert record.annotations["topology"] == "circular"
+    assert record.description == "plasmid 1"
+    original = make_record("1", SEQUENCES["1"]).features
+    assert len(record.features) == 1
+    assert record.features[0].location == original[0].location
+    assert record.features[0].qualifiers["label"] == ["primer"]
+    assert store.record("3").features == []
+
+
+def test_identifiers(tmp_path):
+    record = make_record("p 1", "ATGC")
+    store = PackedPlasmidStore.write(tmp_path, [("p 1", "name", record)])
+    assert store.sequence("p 1") == "ATGC"
+    store.close()
+    with pytest.raises(ValueError, match="tab or line break"):
+        PackedPlasmidStore.write(tmp_path, [("p\t1", "name", record)])
+    # The failed write leaves the current generation in place.
+    assert len(list(tmp_path.glob("generation-*"))) == 1
+
+
+def test_non_ascii_qualifier(tmp_path):
+    record = make_record("1", SEQUENCES["1"])
+    record.features[0].qualifiers["note"] = ["5 µg at 37 °C"]
+    store = PackedPlasmidStore.write(tmp_path, [("1", "name", record)])
+    assert store.record("1").features[0].qualifiers["note"] == ["5 µg at 37 °C"]
+    store.close()
+
+
+def test_rewrite_keeps_open_generation(store_path, store):
+    record = make_record("1", "GGGGCCCC")
+    PackedPlasmidStore.write(store_path, [("1", "name", record)]).close()
+    # The open store still reads the generation it was opened with.
+    assert store.sequence("2") == SEQUENCES["2"].upper()
+    assert decode(store_path, "1") == "GGGGCCCC"
+    assert PackedPlasmidStore.prune(store_path) == [store.generation.name]
+    assert decode(store_path, "1") == "GGGGCCCC"
+
+
+def test_concurrent_writers(tmp_path):
+    def write(sequence):
+        record = make_record("1", sequence)
+        PackedPlasmidStore.write(tmp_path, [("1", "name", record)]).close()
+
+    sequences = ["A" * 4000, "C" * 5000]
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(write, sequences * 5))
+    assert decode(tmp_path, "1") in sequences
+
+
+def test_client(store_path):
+    with PackedStoreClient(store_path) as client:
+        assert client.get_plasmid_ids() == frozenset(SEQUENCES)
+        assert client.get_primer_ids() == frozenset(["7", "8"])
+        name, record = client.get_plasmid_record("2")
+        assert name == "name 2"
+        assert str(record.seq) == SEQUENCES["2"].upper()
+        records, errors = client.get_plasmid_records(["1", "5"])
+        assert list(records) == ["1"]
+        assert [error["id"] for error in errors] == ["5"]
+
+
+def test_from_client(tmp_path):
+    records = {key: make_record(key, SEQUENCES[key]) for key in ("1", "2")}
+    store, errors = PackedPlasmidStore.from_client(
+        tmp_path, InMemoryClient(records), ["1", "2", "3"]
+    )
+    assert [error["id"] for error in errors] == ["3"]
+    assert store.sequence("2") == SEQUENCES["2"].upper()
+    assert store.entries["1"].name == "name 1"
+    assert store.primers == ["7"]
+    store.close()
+
+
+def test_record_pickles(store):
+    record = pickle.loads(pickle.dumps(store.record("1")))
+    assert str(record.seq) == SEQUENCES["1"]
+    assert len(record.features) == 1
+
+
+def test_processes_share_store(store_path):
+    with ProcessPoolExecutor(max_workers=2) as executor:
+        result = list(executor.map(decode, [store_path] * 2, ["1", "2"]))
+    assert result == [SEQUENCES["1"], SEQUENCES["2"].upper()]
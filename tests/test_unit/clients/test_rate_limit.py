@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+
+import pytest
+
+from sanger_sequencing.clients import AdaptiveLimiter
+
+
+class FakeTimer:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_additive_increase():
+    limiter = AdaptiveLimiter(initial=2, maximum=4)
+    for _ in range(2):
+        limiter.on_success()
+    assert limiter.limit == pytest.approx(2.9)
+    for _ in range(100):
+        limiter.on_success()
+    assert limiter.limit == 4
+
+
+def test_decrease_near_exhaustion():
+    limiter = AdaptiveLimiter(initial=8)
+    limiter.on_success(remaining=50, total=100)
+    assert limiter.limit > 8
+    limiter.on_success(remaining=5, total=100)
+    assert limiter.limit < 8
+
+
+def test_throttle_halves_once_per_pause():
+    timer = FakeTimer()
+    limiter = AdaptiveLimiter(initial=8, timer=timer)
+    limiter.on_throttle(1.0)
+    limiter.on_throttle(1.0)
+    assert limiter.limit == 4
+    assert limiter.throttled == 2
+    timer.now = 2.0
+    limiter.on_throttle(1.0)
+    assert limiter.limit == 2
+    for _ in range(5):
+        timer.now += 10.0
+        limiter.on_throttle(1.0)
+    assert limiter.limit == limiter.minimum
+
+
+def test_concurrency_bound():
+    limiter = AdaptiveLimiter(initial=3)
+    lock = threading.Lock()
+    state = {"active": 0, "peak": 0}
+
+    def work():
+        with limiter:
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(0.01)
+            with lock:
+                state["active"] -= 1
+
+    threads = [threading.Thread(target=work) for _ in range(12)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    assert state["peak"] <= 3
+    assert limiter.active == 0
+
+
+def test_pause():
+    limiter = AdaptiveLimiter()
+    limiter.on_throttle(0.05)
+    start = time.monotonic()
+    with limiter:
+        pass
+    assert time.monotonic() - start >= 0.04
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import threading
+import time
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients.repository_client import RepositoryClient
+
+
+class DummyClient(RepositoryClient):
+    """Serve records from memory and track concurrent requests."""
+
+    max_concurrency = 2
+
+    def __init__(self, delay=0.01):
+        super().__init__()
+        self.delay = delay
+        self.active = 0
+        self.peak = 0
+        self.lock = threading.Lock()
+
+    def get_plasmid_ids(self):
+        return frozenset()
+
+    def get_plasmid_record(self, plasmid_id):
+        with self.lock:
+            self.active += 1
+            self.peak = max(self.peak, self.active)
+        time.sleep(self.delay)
+        with self.lock:
+            self.active -= 1
+        if plasmid_id.startswith("bad"):
+            raise KeyError(plasmid_id)
+        return plasmid_id.upper(), SeqRecord(Seq("ATGC"), id=plasmid_id)
+
+    def get_primer_ids(self):
+        return frozenset()
+
+
+def test_get_plasmid_records():
+    client = DummyClient()
+    records, errors = client.get_plasmid_records(["p1", "p2", "p1"])
+    assert list(records) == ["p1", "p2"]
+    assert records["p2"][0] == "P2"
+    assert errors == []
+
+
+def test_get_plasmid_records_partial_failure():
+    client = DummyClient()
+    records, errors = client.get_plasmid_records(["p1", "bad1", "p2"])
+    assert set(records) == {"p1", "p2"}
+    assert len(errors) == 1
+    assert errors[0]["code"] == "retrieval-error"
+    assert errors[0]["id"] == "bad1"
+
+
+@pytest.mark.parametrize("max_workers", [None, 16])
+def test_get_plasmid_records_concurrency_bound(max_workers):
+    client = DummyClient()
+    records, _ = client.get_plasmid_records(
+        [f"p{i}" for i in range(12)], max_workers=max_workers
+    )
+    assert len(records) == 12
+    assert client.peak <= DummyClient.max_concurrency
+
+
+def test_get_plasmid_records_shared_host():
+    first = DummyClient()
+    second = DummyClient()
+    first.host = second.host = "teapot.com"
+    assert first._host_semaphore() is second._host_semaphore()
+    assert DummyClient()._host_semaphore() is not DummyClient()._host_semaphore()
+
+
+def test_host_semaphore_per_limit(caplog):
+    first = DummyClient()
+    second = DummyClient()
+    first.host = second.host = "limits.com"
+    second.max_concurrency = DummyClient.max_concurrency + 1
+    assert first._host_semaphore() is not second._host_semaphore()
+    assert "different maximum concurrency" in caplog.text
+
+
+def test_get_plasmid_records_empty():
+    assert DummyClient().get_plasmid_records([]) == ({}, [])
@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import base64
+import hashlib
+import io
+import json
+import random
+import tracemalloc
+
+import pytest
+from Bio import SeqIO
+from Bio.Seq import Seq
+from Bio.SeqFeature import FeatureLocation, SeqFeature
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.clients import (
+    Base64Reader,
+    JSONFieldStream,
+    parse_genbank,
+    read_genbank,
+)
+
+
+def split(data, size):
+    return [data[i : i + size] for i in range(0, len(data), size)]
+
+
+@pytest.fixture(scope="module")
+def payload():
+    record = SeqRecord(Seq("ATGC" * 500), id="p1", annotations={"molecule_type": "DNA"})
+    return record.format("gb").encode("ascii")
+
+
+@pytest.fixture(scope="module")
+def document(payload):
+    data = [
+        {
+            "id": "C:\\\\temp",
+            "Sequence_file_GenBank": [
+                {
+                    "name": 'p1/"final".gb',
+                    "content": base64.encodebytes(payload).decode("ascii"),
+                }
+            ],
+            "tags": ["content", "name"],
+        }
+    ]
+    # Escape forward slashes as some PHP servers do.
+    return json.dumps(data).replace("/", "\\/").encode("utf-8")
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 5, 64, 1 << 20])
+def test_json_field_stream(document, payload, size):
+    stream = JSONFieldStream(split(document, size), "content")
+    content = b"".join(stream.iter_field())
+    stream.consume()
+    assert base64.decodebytes(content) == payload
+    assert stream.fields == {"name": 'p1/"final".gb'}
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4, 5, 6, 7])
+def test_json_field_stream_escapes(size):
+    document = b'{"content": "a\\u00e9\\/\\\\\\"z", "name": "\\u00e9"}'
+    stream = JSONFieldStream(split(document, size), "content")
+    assert b"".join(stream.iter_field()).decode("utf-8") == 'a\u00e9/\\"z'
+    stream.consume()
+    assert stream.fields["name"] == "\u00e9"
+
+
+def test_json_field_stream_missing():
+    stream = JSONFieldStream([b'[{"name": "a"}]'], "content")
+    assert list(stream.iter_field()) == []
+    assert stream.fields == {"name": "a"}
+
+
+@pytest.mark.parametrize("size", [1, 3, 4, 77, 1 << 20])
+def test_base64_reader(payload, size):
+    digest = hashlib.sha256()
+    encoded = base64.encodebytes(payload)
+    reader = Base64Reader(split(encoded, size), sink=digest.update)
+    assert reader.read() == payload
+    assert digest.hexdigest() == hashlib.sha256(payload).hexdigest()
+
+
+def test_base64_reader_incomplete():
+    with pytest.raises(ValueError):
+        Base64Reader([b"QUJD", b"R"]).read()
+
+
+def test_read_genbank(document, payload):
+    stream = JSONFieldStream(split(document, 100), "content")
+    record = read_genbank(Base64Reader(stream.iter_field()))
+    assert str(record.seq) == "ATGC" * 500
+    assert str(parse_genbank(payload).seq) == "ATGC" * 500
+
+
+def test_read_genbank_non_ascii():
+    record = SeqRecord(Seq("ATGC"), id="p1", annotations={"molecule_type": "DNA"})
+    record.features = [SeqFeature(FeatureLocation(0, 4), type="misc_feature")]
+    note = '\n                     /note="5 µg at 37 °C"'
+    location = "misc_feature    1..4"
+    payload = record.format("gb").replace(location, location + note)
+    parsed = read_genbank(io.BytesIO(payload.encode("utf-8")))
+    assert parsed.features[0].qualifiers["note"] == ["5 µg at 37 °C"]
+    parsed = read_genbank(io.BytesIO(payload.encode("latin-1")))
+    assert str(parsed.seq) == "ATGC"
+
+
+def peak_memory(func):
+    tracemalloc.start()
+    try:
+        result = func()
+        return tracemalloc.get_traced_memory()[1], result
+    finally:
+        tracemalloc.stop()
+
+
+def test_read_genbank_peak_memory():
+    rnd = random.Random(1234)
+    record = SeqRecord(
+        Seq("".join(rnd.choices("ACGT", k=200_000))),
+        id="p1",
+        annotations={"molecule_type": "DNA"},
+    )
+    payload = record.format("gb").encode("ascii")
+    assert len(payload) >= 200_000
+    document = json.dumps(
+        [{"Sequence_file_GenBank": [{"content": base64.encodebytes(payload).decode()}]}]
+    ).encode("utf-8")
+    chunks = split(document, 64 * 1024)
+
+    def buffered():
+        body = json.loads(b"".join(chunks))
+        content = base64.b64decode(body[0]["Sequence_file_GenBank"][0]["content"])
+        return SeqIO.read(io.StringIO(content.decode("ascii")), "gb")
+
+    def streamed():
+        stream = JSONFieldStream(iter(chunks), "content")
+        return read_genbank(Base64Reader(stream.iter_field()))
+
+    old_peak, old = peak_memory(buffered)
+    new_peak, new = peak_memory(streamed)
+    assert str(new.seq) == str(old.seq)
+    assert new_peak < old_peak / 2
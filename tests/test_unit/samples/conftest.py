@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Provide a writer of minimal ABIF chromatogram files."""
+
+
+import struct
+
+import pytest
+
+
+DIRECTORY_ENTRY = ">4sI2H4I"
+
+
+def write_abif(path, sequence, quality, sample_id="sample", traces=None):
+    """Write a minimal ABIF file like those of a 3730 instrument."""
+    if traces is None:
+        traces = [
+            [i % 7 * channel for i in range(4 * len(sequence))]
+            for channel in (1, 2, 3, 4)
+        ]
+    tags = [
+        (b"PBAS", 2, 2, 1, sequence.encode("ascii")),
+        (b"PCON", 2, 2, 1, bytes(quality)),
+        (
+            b"PLOC",
+            2,
+            4,
+            2,
+            struct.pack(f">{len(sequence)}h", *range(2, 4 * len(sequence), 4)),
+        ),
+        (b"FWO_", 1, 2, 1, b"GATC"),
+        (b"SMPL", 1, 18, 1, bytes([len(sample_id)]) + sample_id.encode("ascii")),
+    ]
+    for number, trace in enumerate(traces, start=9):
+        tags.append((b"DATA", number, 4, 2, struct.pack(f">{len(trace)}h", *trace)))
+    entry_size = struct.calcsize(DIRECTORY_ENTRY)
+    data = bytearray()
+    data_start = 128
+    entries = []
+    for name, number, kind, size, payload in tags:
+        count = len(payload) // size
+        if len(payload) <= 4:
+            offset = int.from_bytes(payload.ljust(4, b"\0"), "big")
+        else:
+            offset = data_start + len(data)
+            data += payload
+        entries.append(
+            struct.pack(
+                DIRECTORY_ENTRY,
+                name,
+                number,
+                kind,
+                size,
+                count,
+                len(payload),
+                offset,
+                0,
+            )
+        )
+    directory_offset = data_start + len(data)
+    header = (
+        b"ABIF"
+        + struct.pack(">H", 101)
+        + struct.pack(
+            DIRECTORY_ENTRY,
+            b"tdir",
+            1,
+            1023,
+            entry_size,
+            len(entries),
+            entry_size * len(entries),
+            directory_offset,
+            0,
+        )
+    )
+    with open(path, "wb") as file:
+        file.write(header.ljust(data_start, b"\0"))
+        file.write(data)
+        file.write(b"".join(entries))
+    return path
+
+
+@pytest.fixture(scope="session")
+def abif():
+    """Return the function that writes ABIF files."""
+    return write_abif
@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+import pytest
+from Bio import SeqIO
+
+from sanger_sequencing.samples import ABIFReader, read_abif
+
+
+@pytest.fixture()
+def chromatogram(tmp_path, abif):
+    return abif(tmp_path / "A01.ab1", "ACGTTGCA", [5, 10, 20, 30, 40, 50, 60, 2], "A1")
+
+
+def test_reader_matches_biopython(chromatogram):
+    expected = SeqIO.read(str(chromatogram), "abi")
+    with ABIFReader(chromatogram) as reader:
+        assert reader.base_calls.tobytes().decode() == str(expected.seq)
+        assert reader.quality.tolist() == expected.letter_annotations["phred_quality"]
+        assert reader.sample_id == expected.id
+        assert reader.base_order == "GATC"
+        assert reader.peak_locations.tolist() == list(range(2, 32, 4))
+        raw = expected.annotations["abif_raw"]
+        for base, channel in zip("GATC", (9, 10, 11, 12)):
+            assert reader.trace(base).tolist() == list(raw[f"DATA{channel}"])
+
+
+def test_reader_returns_views(chromatogram):
+    with ABIFReader(chromatogram) as reader:
+        quality = reader.quality
+        trace = reader.trace("a")
+    assert not quality.flags.owndata
+    assert not quality.flags.writeable
+    assert trace.dtype == np.dtype(">i2")
+    # The views remain usable after the reader is closed.
+    assert quality.tolist() == [5, 10, 20, 30, 40, 50, 60, 2]
+
+
+def test_reader_missing_fields(chromatogram):
+    with ABIFReader(chromatogram) as reader:
+        assert ("PBAS", 2) in reader
+        assert ("DATA", 1) not in reader
+        with pytest.raises(KeyError):
+            reader.raw("DATA", 1)
+
+
+@pytest.mark.parametrize(
+    "content, message", [(b"", "empty"), (b"GIF89a" + bytes(40), "not a valid")]
+)
+def test_reader_invalid_file(tmp_path, content, message):
+    path = tmp_path / "invalid.ab1"
+    path.write_bytes(content)
+    with pytest.raises(ValueError, match=message):
+        ABIFReader(path)
+
+
+def test_read_abif(chromatogram):
+    record = read_abif(chromatogram)
+    assert record.id == "A01"
+    assert str(record.seq) == "ACGTTGCA"
+    assert record.letter_annotations["phred_quality"] == [5, 10, 20, 30, 40, 50, 60, 2]
+    assert read_abif(chromatogram, sample_id="x").id == "x"
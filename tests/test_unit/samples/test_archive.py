@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import tarfile
+import zipfile
+
+import pytest
+
+from sanger_sequencing.samples import is_archive, iter_archive_members, load_samples
+
+
+@pytest.fixture()
+def chromatograms(tmp_path, abif):
+    directory = tmp_path / "files"
+    directory.mkdir()
+    return {
+        "plate/A01.ab1": abif(directory / "A01.ab1", "ACGT", [40, 41, 42, 43]),
+        "plate/A02.ab1": abif(directory / "A02.ab1", "GGCCA", [10, 20, 30, 40, 50]),
+        "__MACOSX/plate/._A01.ab1": abif(directory / "._A01.ab1", "A", [1]),
+        "plate/notes.txt": directory / "A01.ab1",
+    }
+
+
+@pytest.fixture(params=["zip", "tar.gz"])
+def archive(request, tmp_path, chromatograms):
+    path = tmp_path / f"results.{request.param}"
+    if request.param == "zip":
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as handle:
+            for name, source in chromatograms.items():
+                handle.write(source, name)
+    else:
+        with tarfile.open(path, "w:gz") as handle:
+            for name, source in chromatograms.items():
+                handle.add(source, name)
+    return path
+
+
+def test_is_archive(archive, chromatograms, tmp_path):
+    assert is_archive(archive)
+    assert not is_archive(chromatograms["plate/A01.ab1"])
+    assert not is_archive(tmp_path)
+
+
+def test_iter_archive_members(archive, chromatograms):
+    members = dict(iter_archive_members(archive))
+    assert sorted(members) == ["A01", "A02"]
+    assert members["A01"] == chromatograms["plate/A01.ab1"].read_bytes()
+    assert list(iter_archive_members(archive, ["A02", "A03"]))[0][0] == "A02"
+
+
+def test_iter_archive_members_size_limit(archive):
+    assert list(iter_archive_members(archive, max_size=10)) == []
+
+
+def test_iter_archive_members_invalid(tmp_path):
+    path = tmp_path / "results.zip"
+    path.write_bytes(b"no archive")
+    with pytest.raises(ValueError, match="neither"):
+        list(iter_archive_members(path))
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_load_samples_from_archive(archive, max_workers):
+    records, errors = load_samples(archive, ["A01", "A02", "B01"], max_workers)
+    assert sorted(records) == ["A01", "A02"]
+    assert str(records["A02"].seq) == "GGCCA"
+    assert records["A01"].letter_annotations["phred_quality"] == [40, 41, 42, 43]
+    assert [(err["code"], err["id"]) for err in errors] == [("missing-file", "B01")]
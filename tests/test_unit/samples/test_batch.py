@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import numpy as np
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+
+from sanger_sequencing.analysis import trim_samples
+from sanger_sequencing.samples import Read, ReadBatch
+from sanger_sequencing.validation import validate_samples
+
+
+@pytest.fixture()
+def records():
+    return {
+        "A01": SeqRecord(
+            Seq("ACGTNACGTA"),
+            letter_annotations={
+                "phred_quality": [5, 10, 50, 55, 60, 60, 55, 50, 10, 5]
+            },
+        ),
+        "A02": SeqRecord(Seq(""), letter_annotations={"phred_quality": []}),
+        "A03": SeqRecord(
+            Seq("GGCCAT"), letter_annotations={"phred_quality": [40, 30, 20, 20, 30, 1]}
+        ),
+    }
+
+
+@pytest.fixture()
+def batch(records):
+    return ReadBatch.from_reads(records)
+
+
+def test_from_reads(batch, records):
+    assert list(batch) == ["A01", "A02", "A03"]
+    assert batch.offsets.tolist() == [0, 10, 10, 16]
+    assert batch.bases.tobytes() == b"ACGTNACGTAGGCCAT"
+    assert batch.qualities.dtype == np.uint8
+    assert batch.lengths.tolist() == [10, 0, 6]
+    assert ReadBatch.from_reads({"x": Read("x", "AC", [1, 2])}).bases.tobytes() == b"AC"
+
+
+def test_mapping_of_read_views(batch, records):
+    read = batch["A03"]
+    assert isinstance(read, Read)
+    assert str(read.seq) == "GGCCAT"
+    assert np.shares_memory(read.quality, batch.qualities)
+    assert "A02" in batch
+    assert "B01" not in batch
+    with pytest.raises(KeyError):
+        batch["B01"]
+
+
+def test_slice_shares_buffers(batch):
+    part = batch[1:]
+    assert list(part) == ["A02", "A03"]
+    assert part.offsets.tolist() == [0, 0, 6]
+    assert np.shares_memory(part.bases, batch.bases)
+    assert str(part["A03"].seq) == "GGCCAT"
+
+
+def test_select(batch):
+    subset = batch.select(["A03", "A01"])
+    assert subset.bases.tobytes() == b"GGCCATACGTNACGTA"
+    assert subset.offsets.tolist() == [0, 6, 16]
+
+
+def test_trim(batch):
+    trimmed = batch.trim([2, 0, 1], [8, 0, 9])
+    assert trimmed.bases.tobytes() == b"GTNACGGCCAT"
+    assert trimmed.qualities.tolist() == [50, 55, 60, 60, 55, 50, 30, 20, 20, 30, 1]
+    assert trimmed.offsets.tolist() == [0, 6, 6, 11]
+
+
+def test_reverse_complement(batch, records):
+    reverse = batch.reverse_complement()
+    for sample_id, record in records.items():
+        expected = record.reverse_complement()
+        assert str(reverse[sample_id].seq) == str(expected.seq)
+        assert (
+            reverse[sample_id].quality.tolist()
+            == expected.letter_annotations["phred_quality"]
+        )
+
+
+def test_encode(batch):
+    assert batch.encode()[:10].tolist() == [0, 1, 2, 3, 4, 0, 1, 2, 3, 0]
+
+
+def test_statistics(batch, records):
+    table = batch.statistics()
+    assert table["length"].tolist() == [10, 0, 6]
+    assert table.loc["A01", "median_quality"] == pytest.approx(50.0)
+    assert table.loc["A03", "median_quality"] == pytest.approx(25.0)
+    assert table.loc["A03", "mean_quality"] == pytest.approx(141 / 6)
+    assert table.loc["A01", "gc_content"] == pytest.approx(0.4)
+    assert table.loc["A01", "ambiguous"] == 1
+    assert np.isnan(table.loc["A02", "median_quality"])
+
+
+def test_analysis_consumes_batch(batch, records):
+    expected = trim_samples(records, threshold=20)
+    trims = trim_samples(batch[:], threshold=20)
+    for sample_id, trim in trims.items():
+        assert (trim.start, trim.stop, trim.error is None) == (
+            expected[sample_id].start,
+            expected[sample_id].stop,
+            expected[sample_id].error is None,
+        )
+    assert validate_samples(batch) == []
+
+
+def test_from_directory(tmp_path, abif):
+    abif(tmp_path / "A01.ab1", "ACGT", [40, 41, 42, 43])
+    abif(tmp_path / "A02.ab1", "TT", [20, 21])
+    batch, errors = ReadBatch.from_directory(tmp_path, ["A01", "A02", "A03"])
+    assert list(batch) == ["A01", "A02"]
+    assert batch.bases.tobytes() == b"ACGTTT"
+    assert [err["id"] for err in errors] == ["A03"]
+    records = batch.to_records()
+    assert records["A02"].letter_annotations["phred_quality"] == [20, 21]
@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pytest
+
+import sanger_sequencing.samples.loader as loader
+from sanger_sequencing.samples import SampleCache, find_sample_files, load_samples
+
+
+@pytest.fixture()
+def plate(tmp_path, abif):
+    (tmp_path / "run").mkdir()
+    abif(tmp_path / "A01.ab1", "ACGT", [40, 41, 42, 43])
+    abif(tmp_path / "A02.AB1", "GGCCA", [10, 20, 30, 40, 50])
+    abif(tmp_path / "run" / "A03.abi", "TTA", [30, 30, 30])
+    (tmp_path / "A04.txt").write_text("not a chromatogram")
+    (tmp_path / "A05.ab1").write_bytes(b"ABIF broken")
+    return tmp_path
+
+
+def test_find_sample_files(plate):
+    files = find_sample_files(plate)
+    assert sorted(files) == ["A01", "A02", "A03", "A05"]
+    assert files["A03"] == plate / "run" / "A03.abi"
+    assert sorted(find_sample_files(plate, ["A01", "A04"])) == ["A01"]
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_load_samples(plate, max_workers):
+    records, errors = load_samples(
+        plate, ["A01", "A02", "A03", "A05", "A06"], max_workers=max_workers
+    )
+    assert sorted(records) == ["A01", "A02", "A03"]
+    assert str(records["A02"].seq) == "GGCCA"
+    assert records["A02"].id == "A02"
+    assert records["A02"].letter_annotations["phred_quality"] == [10, 20, 30, 40, 50]
+    assert records["A02"].annotations == {}
+    assert [(err["code"], err["id"]) for err in errors] == [
+        ("missing-file", "A06"),
+        ("invalid-file", "A05"),
+    ]
+
+
+def test_load_samples_cache(plate, tmp_path, mocker):
+    cache = SampleCache(tmp_path / "cache")
+    first, _ = load_samples(plate, ["A01", "A02"], max_workers=1, cache=cache)
+    parse = mocker.patch.object(loader, "_parse_abi")
+    second, errors = load_samples(plate, ["A01", "A02"], max_workers=1, cache=cache)
+    parse.assert_not_called()
+    assert not errors
+    for sample_id, record in first.items():
+        assert str(second[sample_id].seq) == str(record.seq)
+        assert second[sample_id].letter_annotations == record.letter_annotations
+
+
+def test_cache_is_keyed_by_content(plate, tmp_path, abif):
+    cache = SampleCache(tmp_path / "cache")
+    load_samples(plate, ["A01"], cache=cache)
+    abif(plate / "A01.ab1", "CCCC", [1, 2, 3, 4])
+    records, _ = load_samples(plate, ["A01"], cache=cache)
+    assert str(records["A01"].seq) == "CCCC"
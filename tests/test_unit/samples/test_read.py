@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import pickle
+
+import numpy as np
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+from pandas import DataFrame
+
+import sanger_sequencing.api as api
+from sanger_sequencing.analysis import trim_sample, trim_samples
+from sanger_sequencing.samples import Read, load_samples
+from sanger_sequencing.validation import validate_samples
+
+
+QUALITY = [5, 10, 50, 55, 60, 60, 55, 50, 10, 5]
+
+
+@pytest.fixture()
+def record():
+    return SeqRecord(
+        Seq("ACGTNACGTA"), id="A01", letter_annotations={"phred_quality": QUALITY}
+    )
+
+
+@pytest.fixture()
+def read(record):
+    return Read.from_record(record)
+
+
+def test_read(read):
+    assert read.id == read.name == "A01"
+    assert len(read) == 10
+    assert str(read.seq) == "ACGTNACGTA"
+    assert read.quality.dtype == np.uint8
+    assert read.letter_annotations["phred_quality"].tolist() == QUALITY
+    assert read[1] == "C"
+    assert not hasattr(read, "__dict__")
+
+
+def test_read_length_mismatch():
+    with pytest.raises(ValueError, match="3 quality scores for 4 base calls"):
+        Read("A01", "ACGT", [1, 2, 3])
+
+
+def test_slicing_shares_buffers(read, record):
+    part = read[2:8]
+    assert str(part.seq) == str(record.seq[2:8])
+    assert part.quality.tolist() == QUALITY[2:8]
+    assert np.shares_memory(part.quality, read.quality)
+    nested = part.trim(1, -1)
+    assert (nested.start, nested.stop) == (3, 7)
+    assert str(nested.seq) == "TNAC"
+    assert len(read[8:2]) == 0
+    with pytest.raises(ValueError):
+        read[::2]
+
+
+def test_reverse_complement(read, record):
+    part = read[2:8]
+    reverse = part.reverse_complement()
+    expected = record[2:8].reverse_complement()
+    assert str(reverse.seq) == str(expected.seq)
+    assert reverse.quality.tolist() == expected.letter_annotations["phred_quality"]
+    assert reverse.id == "A01"
+    assert str(Read("x", "acgtRYN", [1] * 7).reverse_complement().seq) == "NRYacgt"
+
+
+def test_record_round_trip(read, record):
+    copy = read[1:].to_record()
+    assert str(copy.seq) == str(record.seq[1:])
+    assert copy.letter_annotations == record[1:].letter_annotations
+
+
+def test_pickle_keeps_region_only(read):
+    copy = pickle.loads(pickle.dumps(read[2:8]))
+    assert (copy.start, copy.stop) == (0, 6)
+    assert str(copy.seq) == "GTNACG"
+    assert copy.quality.tolist() == QUALITY[2:8]
+
+
+def test_analysis_accepts_reads(read, record):
+    expected = trim_samples({"A01": record}, threshold=50)["A01"]
+    trim = trim_samples({"A01": read}, threshold=50)["A01"]
+    assert (trim.start, trim.stop, trim.median) == (
+        expected.start,
+        expected.stop,
+        expected.median,
+    )
+    assert trim.scores.tolist() == expected.scores.tolist()
+    assert validate_samples({"A01": read}) == []
+
+
+def test_trim_sample_returns_view(read):
+    start, trimmed, _, end, _ = trim_sample(read)
+    assert (start, end) == (2, 2)
+    assert isinstance(trimmed, Read)
+    assert np.shares_memory(trimmed.quality, read.quality)
+
+
+def test_sample_report_aligns_trimmed_view(read, mocker):
+    trims = trim_samples({"A01": read}, threshold=50)
+    align = mocker.patch.object(api.analysis, "emboss_alignment")
+    mocker.patch.object(api.analysis, "alignment_to_table", return_value=DataFrame())
+    report = api.sample_report(
+        "A01", read, "primer", "pA", SeqRecord(Seq("ACGT")), trims["A01"]
+    )
+    trimmed = align.call_args[0][1]
+    assert isinstance(trimmed, Read)
+    assert str(trimmed.seq) == "GTNACG"
+    assert (report.trim_start, report.trim_end) == (2, 2)
+
+
+def test_load_compact_samples(tmp_path, abif):
+    abif(tmp_path / "A01.ab1", "ACGT", [40, 41, 42, 43])
+    abif(tmp_path / "A02.ab1", "ACGT", [])
+    reads, errors = load_samples(tmp_path, compact=True)
+    assert isinstance(reads["A01"], Read)
+    assert reads["A01"].quality.tolist() == [40, 41, 42, 43]
+    assert [(err["code"], err["id"]) for err in errors] == [("invalid-file", "A02")]
@@ -0,0 +1,179 @@
+# -*- coding: utf-8 -*-
+
+# Copyright (c) 2018 Novo Nordisk Foundation Center for Biosustainability,
+# Technical University of Denmark.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import sys
+import warnings
+
+import pytest
+from Bio.Seq import Seq
+from Bio.SeqRecord import SeqRecord
+from pandas import DataFrame
+
+import sanger_sequencing.ingestion as ingestion
+from sanger_sequencing.clients.repository_client import RepositoryClient
+
+
+class Repository(RepositoryClient):
+    def __init__(self, records):
+        super().__init__()
+        self.records = records
+        self.requested = []
+
+    def get_plasmid_ids(self):
+        return frozenset(self.records)
+
+    def get_plasmid_record(self, plasmid_id):
+        self.requested.append(plasmid_id)
+        return plasmid_id, self.records[plasmid_id]
+
+    def get_primer_ids(self):
+        return frozenset()
+
+
+@pytest.fixture()
+def template():
+    return DataFrame(
+        {
+            "plasmid": ["p1", "p1", "p2", "p2", "p2", "p3", "p1"],
+            "primer": ["a", "b", "a", "b", "c", "a", "c"],
+            "sample": [f"s{i}" for i in range(7)],
+        }
+    )
+
+
+@pytest.fixture()
+def records():
+    return {f"p{i}": SeqRecord(Seq("ATGC"), id=f"p{i}") for i in range(1, 4)}
+
+
+@pytest.fixture()
+def reports(mocker):
+    return mocker.patch.object(
+        ingestion,
+        "sanger_report",
+        side_effect=lambda template, plasmids, samples, **kwargs: (
+            template,
+            plasmids,
+            samples,
+        ),
+    )
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".tsv", ".xlsx"])
+def test_iter_template(tmp_path, template, suffix):
+    path = tmp_path / f"template{suffix}"
+    if suffix == ".xlsx":
+        template.to_excel(path, index=False)
+    else:
+        template.to_csv(path, sep="\t" if suffix == ".tsv" else ",", index=False)
+    chunks = list(ingestion.iter_template(path, chunksize=3))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert list(chunks[0].columns) == ["plasmid", "primer", "sample"]
+    assert [row for chunk in chunks for row in chunk["sample"]] == list(
+        template["sample"]
+    )
+
+
+def test_iter_template_columns(tmp_path, template):
+    path = tmp_path / "template.csv"
+    template.to_csv(path, index=False)
+    (chunk,) = ingestion.iter_template(path, columns=["plasmid"])
+    assert list(chunk.columns) == ["plasmid"]
+
+
+def test_iter_template_without_openpyxl(tmp_path, template, mocker):
+    path = tmp_path / "template.xlsx"
+    template.to_excel(path, index=False)
+    mocker.patch.dict(sys.modules, {"openpyxl": None})
+    with pytest.raises(ImportError, match="requires openpyxl"):
+        list(ingestion.iter_template(path))
+
+
+def test_iter_template_excel_chunks(tmp_path, template, mocker):
+    mocker.patch.object(ingestion, "read_excel", return_value=template)
+    chunks = list(ingestion.iter_template(tmp_path / "template.xls", chunksize=3))
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        chunks[0]["plasmid"] = chunks[0]["plasmid"].fillna("")
+
+
+def test_sanger_report_chunks(tmp_path, template, records, reports):
+    path = tmp_path / "template.csv"
+    template.to_csv(path, index=False)
+    samples = {sample_id: None for sample_id in template["sample"]}
+    batches = list(ingestion.sanger_report_chunks(path, records, samples, chunksize=3))
+    # Plasmid 'p1' is only complete with the last row.
+    assert [sorted(plasmids) for _, plasmids, _ in batches] == [
+        ["p2", "p3"],
+        ["p1"],
+    ]
+    for sub, plasmids, sample_records in batches:
+        assert set(sub["plasmid"]) == set(plasmids)
+        assert set(sub["sample"]) == set(sample_records)
+    assert len(batches[1][0]) == 3
+
+
+def test_sanger_report_chunks_with_client(tmp_path, template, records, reports):
+    path = tmp_path / "template.csv"
+    template.to_csv(path, index=False)
+    client = Repository(records)
+    requested = []
+
+    def load_samples(sample_ids):
+        requested.append(sample_ids)
+        return {sample_id: None for sample_id in sample_ids}
+
+    batches = list(
+        ingestion.sanger_report_chunks(path, client, load_samples, chunksize=100)
+    )
+    assert len(batches) == 1
+    assert sorted(client.requested) == ["p1", "p2", "p3"]
+    assert sorted(requested[0]) == sorted(template["sample"])
+
+
+def test_sanger_report_chunks_duplicate_samples(tmp_path, template, records, reports):
+    template.loc[6, "sample"] = "s0"
+    path = tmp_path / "template.csv"
+    template.to_csv(path, index=False)
+    with pytest.raises(AssertionError, match="s0"):
+        list(ingestion.sanger_report_chunks(path, records, {}, chunksize=3))
+
+
+def test_sanger_report_chunks_blank_rows(tmp_path, template, records, mocker, caplog):
+    template.loc[2, "plasmid"] = None
+    template.loc[4, "sample"] = " "
+    path = tmp_path / "template.csv"
+    template.to_csv(path, index=False)
+
+    def report(template, plasmids, samples, **kwargs):
+        # Template validation rejects rows without a plasmid or sample.
+        assert template["plasmid"].notna().all()
+        assert (template["sample"].str.strip() != "").all()
+        return template
+
+    mocker.patch.object(ingestion, "sanger_report", side_effect=report)
+    samples = {sample_id: None for sample_id in template["sample"]}
+    batches = list(ingestion.sanger_report_chunks(path, records, samples, chunksize=3))
+    assert sorted(sample for batch in batches for sample in batch["sample"]) == [
+        "s0",
+        "s1",
+        "s3",
+        "s5",
+        "s6",
+    ]
+    assert "Skipping 2 template row(s) without a plasmid or sample: 3, 5." in (
+        caplog.text
+    )
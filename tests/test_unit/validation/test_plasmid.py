@@ -15,11 +15,52 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from Bio.Seq import Seq
+from Bio.SeqFeature import FeatureLocation, SeqFeature
 from Bio.SeqRecord import SeqRecord
 
 import sanger_sequencing.validation as valid
 
 
+def plasmid(identifier, length=40, *locations):
+    record = SeqRecord(Seq("A" * length), id=identifier)
+    record.features = [
+        SeqFeature(FeatureLocation(start, end, 1), type="CDS")
+        for start, end in locations
+    ]
+    return record
+
+
 def test_validate_plasmid():
-    valid.validate_plasmid(SeqRecord("ATGC"), [])
-    assert False
+    assert valid.validate_plasmid(plasmid("pA", 40, (0, 10), (30, 40)), []) == []
+
+
+def test_validate_plasmids():
+    errors = valid.validate_plasmids(
+        {
+            "pA": plasmid("pA", 40, (0, 10)),
+            "pB": plasmid("pB", 20, (5, 30), (0, 10), (25, 35)),
+            "pC": plasmid("pC", 0),
+        },
+        [],
+    )
+    assert [(err["code"], err["record"]) for err in errors] == [
+        ("empty-sequence", "pC"),
+        ("feature-out-of-bounds", "pB"),
+        ("feature-out-of-bounds", "pB"),
+    ]
+
+
+def test_validate_plasmids_from_generator():
+    records = (
+        (identifier, plasmid(identifier, 20, (0, 25))) for identifier in ("pA", "pB")
+    )
+    errors = valid.validate_plasmids(records, [])
+    assert [err["record"] for err in errors] == ["pA", "pB"]
+
+
+def test_validate_plasmid_invalid_feature():
+    record = plasmid("pA", 40)
+    record.features.append(SeqFeature(None, type="CDS"))
+    errors = valid.validate_plasmid(record, [])
+    assert [err["code"] for err in errors] == ["invalid-feature"]
@@ -15,11 +15,44 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+from Bio.Seq import Seq
 from Bio.SeqRecord import SeqRecord
 
 import sanger_sequencing.validation as valid
 
 
+class Read:
+    def __init__(self, sequence, quality):
+        self.seq = sequence
+        self.letter_annotations = {"phred_quality": quality}
+
+    def __len__(self):
+        return len(self.seq)
+
+
 def test_validate_sample():
-    valid.validate_sample(SeqRecord("ATGC"))
-    assert False
+    sample = SeqRecord(
+        Seq("ATGC"), id="a", letter_annotations={"phred_quality": [40] * 4}
+    )
+    assert valid.validate_sample(sample) == []
+
+
+def test_validate_sample_without_quality():
+    errors = valid.validate_sample(SeqRecord(Seq("ATGC"), id="a"))
+    assert errors[0]["code"] == "missing-quality"
+
+
+def test_validate_samples():
+    errors = valid.validate_samples(
+        {
+            "a": Read("ATGC", [40] * 4),
+            "b": Read("ATGC", [40] * 3),
+            "c": SeqRecord(Seq("ATGC")),
+            "d": Read("", []),
+        }
+    )
+    assert [(err["code"], err["record"]) for err in errors] == [
+        ("quality-length-mismatch", "b"),
+        ("missing-quality", "c"),
+    ]
+    assert errors[0]["message"] == "Sample 'b' has 3 Phred quality scores for 4 bases."
@@ -17,9 +17,11 @@
 
 """Verify the validation functions."""
 
+
 from io import StringIO
 
 import pytest
+from numpy import nan
 from pandas import DataFrame, read_csv
 
 import sanger_sequencing.validation as validation
@@ -50,13 +52,106 @@ def test_validate_template(template):
     assert len(errors) == 0
 
 
-def test_validate_empty_template():
-    errors = validation.validate_template(DataFrame())
+@pytest.mark.parametrize("strict", [False, True])
+def test_validate_empty_template(strict):
+    errors = validation.validate_template(DataFrame(), strict=strict)
     assert len(errors) == 1
     assert errors[0]["code"] == "empty"
     assert errors[0]["message"] == "There must be at least one data row."
 
 
+@pytest.mark.parametrize(
+    "data, codes",
+    [
+        (
+            {"sample": ["a", "b"], "plasmid": ["gfp", "rfp"], "primer": ["1", "2"]},
+            [],
+        ),
+        (
+            {"plasmid": ["gfp", "rfp"], "primer": ["1", None], "sample": ["a", "a"]},
+            ["missing-value", "unique-constraint"],
+        ),
+        (
+            {"plasmid": ["gfp", "rfp"], "primer": ["1", "2"], "sample": ["a", ""]},
+            ["required-constraint"],
+        ),
+        ({"plasmid": ["gfp", "rfp"], "sample": ["a", "b"]}, ["missing-header"]),
+        (
+            {"plasmid": ["gfp", "rfp"], "primer": [1.0, nan], "sample": ["a", "b"]},
+            ["type-or-format-error", "type-or-format-error"],
+        ),
+        (
+            {
+                "plasmid": ["gfp", "rfp", "gfp", "rfp"],
+                "primer": ["1", "2", "3", "4"],
+                "sample": ["a", "a", "b", "a"],
+            },
+            ["unique-constraint", "unique-constraint"],
+        ),
+    ],
+)
+def test_validate_template_errors(data, codes):
+    template = DataFrame(data)
+    errors = validation.validate_template(template)
+    assert [err["code"] for err in errors] == codes
+    strict = validation.validate_template(template, strict=True)
+    for err, expected in zip(errors, strict):
+        assert err["message"] == expected["message"]
+        assert err.get("row-number") == expected.get("row-number")
+    assert len(errors) == len(strict)
+
+
+def test_validate_template_unique_rows():
+    template = DataFrame(
+        {
+            "plasmid": ["gfp"] * 4,
+            "primer": ["1"] * 4,
+            "sample": ["a", "a", "b", "a"],
+        }
+    )
+    errors = validation.validate_template(template)
+    assert [err["message"] for err in errors] == [
+        "Rows 1, 2 has unique constraint violation in column 3",
+        "Rows 1, 2, 4 has unique constraint violation in column 3",
+    ]
+
+
+def test_validate_template_extra_header():
+    template = DataFrame(
+        {"plasmid": ["gfp"], "primer": ["1"], "sample": ["a"], "note": ["x"]}
+    )
+    errors = validation.validate_template(template)
+    assert errors == [
+        {
+            "code": "extra-header",
+            "message": "There is an extra header in column 4",
+            "column-number": 4,
+        }
+    ]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        {"plasmid": ["gfp"], "sample": ["a"]},
+        {"sample": ["a"]},
+        {"plasmid": ["gfp"], "sample": ["a"], "note": ["x"]},
+        {"sample": ["a"], "plasmid": ["gfp"], "note": ["x"]},
+    ],
+)
+def test_validate_template_headers_like_goodtables(data):
+    template = DataFrame(data)
+
+    def summary(errors):
+        return [
+            (err["code"], err["message"], err.get("column-number")) for err in errors
+        ]
+
+    errors = validation.validate_template(template)
+    strict = validation.validate_template(template, strict=True)
+    assert summary(errors) == summary(strict)
+
+
 @pytest.mark.parametrize(
     "plasmids, samples, indeces",
     [